@@ -0,0 +1,161 @@
+"""
+Reservation availability: overlap checks and free/busy calendars.
+
+A reservation occupies its unit on the half-open range
+[intended_checkin_date, intended_checkout_date), so a guest can arrive on
+the day another leaves. Two ranges overlap when each one starts before the
+other ends. The composite index reservation_unit_dates_idx on (unit,
+intended_checkin_date, intended_checkout_date) turns a conflict check into
+an index seek on the unit plus a range scan on the check-in date.
+"""
+from datetime import timedelta
+
+from django.db.models import Exists, FilteredRelation, OuterRef, Q
+
+from .models import Reservation, Unit
+
+
+# Reservation statuses that keep a unit busy
+BLOCKING_STATUSES = ('Reserved', 'Hold', 'Assigned', 'Occupied', 'Checked In')
+# A unit with a reservation in one of these is not offered for a new one
+ON_HOLD_STATUSES = ('Reserved', 'Hold')
+CALENDAR_MAX_UNITS = 1000
+CALENDAR_MAX_DAYS = 366
+
+
+def overlap_q(start, end, prefix=''):
+    """Q for reservations overlapping [start, end) and still holding their unit"""
+    return Q(**{
+        f'{prefix}intended_checkin_date__lt': end,
+        f'{prefix}intended_checkout_date__gt': start,
+        f'{prefix}occupancy_status__in': BLOCKING_STATUSES,
+    })
+
+
+def find_conflict(unit_id, start, end, exclude_id=None, lock=False):
+    """
+    The first reservation on the unit that overlaps [start, end), or None.
+    With ``lock`` (inside a transaction) the unit row is locked first, so
+    concurrent bookings of one unit are checked one after another.
+    """
+    if not unit_id or not start or not end:
+        return None
+    if lock:
+        list(Unit.objects.select_for_update().filter(pk=unit_id).values_list('pk'))
+    conflicts = Reservation.objects.filter(overlap_q(start, end), unit_id=unit_id)
+    if exclude_id is not None:
+        conflicts = conflicts.exclude(pk=exclude_id)
+    return conflicts.only('id', 'intended_checkin_date', 'intended_checkout_date').order_by('intended_checkin_date').first()
+
+
+def unit_on_hold(unit_ref='unit_id'):
+    """Exists() for a Reserved / Hold reservation on the unit at ``unit_ref``"""
+    return Exists(Reservation.objects.filter(unit_id=OuterRef(unit_ref), occupancy_status__in=ON_HOLD_STATUSES))
+
+
+def batch_conflicts(bookings):
+    """
+    Overlap check for many bookings at once: one query for existing
+    reservations on the units, plus overlaps between the bookings themselves.
+
+    ``bookings`` is a list of (unit_id, start, end); returns {index: message}.
+    """
+    bookings = [(i, unit_id, start, end) for i, (unit_id, start, end) in enumerate(bookings) if unit_id]
+    if not bookings:
+        return {}
+    existing = {}
+    for unit_id, checkin, checkout in Reservation.objects.filter(
+        overlap_q(min(b[2] for b in bookings), max(b[3] for b in bookings)),
+        unit_id__in={b[1] for b in bookings},
+    ).values_list('unit_id', 'intended_checkin_date', 'intended_checkout_date'):
+        existing.setdefault(unit_id, []).append((checkin, checkout))
+
+    errors, accepted = {}, {}
+    for i, unit_id, start, end in bookings:
+        for checkin, checkout in existing.get(unit_id, ()):
+            if checkin < end and checkout > start:
+                errors[i] = f'Unit is already reserved from {checkin:%m/%d/%Y} to {checkout:%m/%d/%Y}'
+                break
+        else:
+            for j, other_start, other_end in accepted.get(unit_id, ()):
+                if other_start < end and other_end > start:
+                    errors[i] = f'Overlaps row {j + 1} of this batch on the same unit'
+                    break
+            else:
+                accepted.setdefault(unit_id, []).append((i, start, end))
+    return errors
+
+
+def conflict_message(conflict):
+    return (
+        f'Unit is already reserved from {conflict.intended_checkin_date:%m/%d/%Y} '
+        f'to {conflict.intended_checkout_date:%m/%d/%Y}'
+    )
+
+
+def _merge(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def availability_calendar(units, start, end):
+    """
+    Free/busy intervals of ``units`` (a Unit queryset) over [start, end),
+    read with one query that LEFT JOINs only the overlapping reservations.
+
+    Returns a list of {'unit', 'unit_number', 'busy': [{'start', 'end',
+    'reservation', 'status'}], 'free': [{'start', 'end'}]}, with every
+    interval clipped to the range and end dates exclusive.
+    """
+    rows = (
+        units.annotate(window=FilteredRelation('reservations', condition=overlap_q(start, end, 'reservations__')))
+        .order_by('unit_number', 'id', 'window__intended_checkin_date')
+        .values_list(
+            'id', 'unit_number', 'window__id', 'window__occupancy_status',
+            'window__intended_checkin_date', 'window__intended_checkout_date',
+        )
+    )
+
+    calendar, by_unit = [], {}
+    for unit_id, unit_number, reservation_id, status, checkin, checkout in rows:
+        entry = by_unit.get(unit_id)
+        if entry is None:
+            entry = by_unit[unit_id] = {'unit': unit_id, 'unit_number': unit_number, 'busy': []}
+            calendar.append(entry)
+        if reservation_id is not None:
+            entry['busy'].append({
+                'start': max(checkin, start), 'end': min(checkout, end),
+                'reservation': reservation_id, 'status': status,
+            })
+
+    for entry in calendar:
+        free, cursor = [], start
+        for busy_start, busy_end in _merge((b['start'], b['end']) for b in entry['busy']):
+            if busy_start > cursor:
+                free.append({'start': cursor, 'end': busy_start})
+            cursor = max(cursor, busy_end)
+        if cursor < end:
+            free.append({'start': cursor, 'end': end})
+        entry['free'] = free
+    return calendar
+
+
+def calendar_range_ok(start, end):
+    return start < end and end - start <= timedelta(days=CALENDAR_MAX_DAYS)
+
+
+def units_for_calendar(unit_ids=None, filters=None):
+    """Units to show, capped at CALENDAR_MAX_UNITS (applied as a subquery)"""
+    units = Unit.objects.all()
+    if unit_ids:
+        units = units.filter(pk__in=unit_ids)
+    for name, value in (filters or {}).items():
+        if value:
+            units = units.filter(**{name: value})
+    first_page = units.order_by('unit_number', 'id').values('pk')[:CALENDAR_MAX_UNITS]
+    return Unit.objects.filter(pk__in=first_page)
@@ -0,0 +1,171 @@
+"""
+Occupancy-based billing for UnitAllocation contracts.
+
+For a period, each allocation that overlaps it gets one InvoiceLine per
+room type, with these quantities:
+- allocated bed-nights: the allocation's beds times the days its contract
+  overlaps the period;
+- occupied bed-nights: check-in/out stays on the allocation's assignments,
+  intersected with the period in SQL and summed per (allocation, room
+  type) in one grouped query. A stay with no check-out runs to the period
+  end.
+
+A run is processed per company group, each group in its own transaction,
+so groups can be spread over worker threads (run_billing(workers=N)) or
+separate processes (billing_run --group). Amounts use
+HOUSING_BED_NIGHT_RATES ({'A': '120.00', ...}) on the bed-nights chosen by
+HOUSING_BILLING_BASIS ('allocated' or 'occupied'). Lines without a rate
+carry quantities only.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import DateField, DurationField, ExpressionWrapper, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least, TruncDate
+from django.utils import timezone
+
+from utils.db import write_transaction
+
+from .models import BillingRun, CheckInCheckOut, InvoiceLine, UnitAllocation
+from .services import ROOM_TYPES, parse_beds
+
+
+# Revised / Extended allocations stay billable: a revision edits the
+# allocation in place (its old terms live in change history), so there is
+# no replacement allocation billed alongside it.
+BILLABLE_EXCLUDED_STATUSES = ('Cancelled',)
+
+
+def _rates():
+    return {
+        room_type: Decimal(str(rate))
+        for room_type, rate in getattr(settings, 'HOUSING_BED_NIGHT_RATES', {}).items()
+    }
+
+
+def occupied_bed_nights(period_start, period_end, company_group_id=None):
+    """{(allocation_id, room type): occupied bed-nights in [period_start, period_end]}"""
+    period_stop = period_end + timedelta(days=1)
+    stays = CheckInCheckOut.objects.filter(
+        actual_checkin_datetime__isnull=False,
+        actual_checkin_datetime__date__lt=period_stop,
+    ).filter(
+        Q(actual_checkout_datetime__isnull=True) | Q(actual_checkout_datetime__date__gte=period_start)
+    )
+    if company_group_id is not None:
+        stays = stays.filter(reservation__assignment__allocation__company_group_id=company_group_id)
+
+    stay_start = Greatest(TruncDate('actual_checkin_datetime'), Value(period_start, output_field=DateField()))
+    stay_end = Least(
+        Coalesce(TruncDate('actual_checkout_datetime'), Value(period_stop, output_field=DateField())),
+        Value(period_stop, output_field=DateField()),
+    )
+    rows = (
+        stays.order_by()
+        .values('reservation__assignment__allocation_id', 'reservation__assignment__accommodation_type')
+        .annotate(nights=Sum(ExpressionWrapper(stay_end - stay_start, output_field=DurationField())))
+    )
+    return {
+        (row['reservation__assignment__allocation_id'], row['reservation__assignment__accommodation_type']):
+            max(row['nights'].days, 0) if row['nights'] else 0
+        for row in rows
+    }
+
+
+def _overlap_days(start, end, period_start, period_end):
+    """Days in both [start, end] and [period_start, period_end], ends included"""
+    return max((min(end, period_end) - max(start, period_start)).days + 1, 0)
+
+
+def bill_company_group(run, company_group_id):
+    """Write the run's invoice lines for one company group; returns lines written"""
+    allocations = (
+        UnitAllocation.objects.filter(
+            company_group_id=company_group_id,
+            start_date__lte=run.period_end,
+            end_date__gte=run.period_start,
+        )
+        .exclude(allocation_status__in=BILLABLE_EXCLUDED_STATUSES)
+        .only('id', 'company_id', 'company_group_id', 'start_date', 'end_date',
+              'a_rooms_beds', 'b_rooms_beds', 'c_rooms_beds', 'd_rooms_beds')
+    )
+    occupied = occupied_bed_nights(run.period_start, run.period_end, company_group_id)
+    rates = _rates()
+    basis = getattr(settings, 'HOUSING_BILLING_BASIS', 'allocated')
+
+    lines = []
+    for allocation in allocations:
+        days = _overlap_days(allocation.start_date, allocation.end_date, run.period_start, run.period_end)
+        for room_type in ROOM_TYPES:
+            beds = parse_beds(getattr(allocation, f'{room_type.lower()}_rooms_beds'))
+            nights = occupied.get((allocation.pk, room_type), 0)
+            if not beds and not nights:
+                continue
+            line = InvoiceLine(
+                run=run,
+                allocation_id=allocation.pk,
+                company_id=allocation.company_id,
+                company_group_id=allocation.company_group_id,
+                accommodation_type=room_type,
+                beds=beds,
+                allocated_bed_nights=beds * days,
+                occupied_bed_nights=nights,
+                rate=rates.get(room_type),
+            )
+            if line.rate is not None:
+                billed = line.occupied_bed_nights if basis == 'occupied' else line.allocated_bed_nights
+                line.amount = line.rate * billed
+            lines.append(line)
+
+    with write_transaction():
+        InvoiceLine.objects.filter(run=run, company_group_id=company_group_id).delete()
+        InvoiceLine.objects.bulk_create(lines, batch_size=1000)
+    return len(lines)
+
+
+def _bill_in_thread(run, company_group_id):
+    try:
+        return bill_company_group(run, company_group_id)
+    finally:
+        connections.close_all()
+
+
+def run_billing(period_start, period_end, company_group_ids=None, workers=1):
+    """
+    Bill every company group with an allocation overlapping the period (or
+    only ``company_group_ids``), ``workers`` groups at a time.
+    Returns the finished BillingRun.
+    """
+    run = BillingRun.objects.create(
+        period_start=period_start,
+        period_end=period_end,
+        company_group_id=company_group_ids[0] if company_group_ids and len(company_group_ids) == 1 else None,
+    )
+    if company_group_ids is None:
+        company_group_ids = list(
+            UnitAllocation.objects.filter(start_date__lte=period_end, end_date__gte=period_start)
+            .exclude(allocation_status__in=BILLABLE_EXCLUDED_STATUSES)
+            .order_by().values_list('company_group_id', flat=True).distinct()
+        )
+
+    try:
+        if workers > 1 and len(company_group_ids) > 1:
+            close_old_connections()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                counts = list(pool.map(lambda group_id: _bill_in_thread(run, group_id), company_group_ids))
+        else:
+            counts = [bill_company_group(run, group_id) for group_id in company_group_ids]
+    except Exception as e:
+        run.status, run.error = 'failed', str(e)
+        run.finished_at = timezone.now()
+        run.save(update_fields=['status', 'error', 'finished_at'])
+        raise
+
+    run.status = 'done'
+    run.line_count = sum(counts)
+    run.finished_at = timezone.now()
+    run.save(update_fields=['status', 'line_count', 'finished_at'])
+    return run
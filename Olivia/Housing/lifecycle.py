@@ -0,0 +1,167 @@
+"""
+Reservation Lifecycle Sweeper
+Moves lapsed Housing records out of their live statuses so units stop
+looking taken. Run it from the sweep_reservations management command,
+e.g. every five minutes from cron, or with --loop.
+
+- Holds not taken up within HOLD_GRACE_DAYS of their check-in date expire.
+- Reserved / Assigned reservations whose check-out date has passed without
+  a check-in expire (no-shows).
+- Active / Revised / Extended allocations past their end date close.
+
+Units freed by these changes go back to Assigned (reservations) or Vacant
+Ready (allocations), unless another live reservation still holds them or,
+for allocations, the unit is also assigned to another open allocation.
+Each batch is one indexed range query on (status, date) written back with
+bulk_update in its own transaction. Handled rows leave the range, so
+re-running a sweep is safe. Guests still checked in after their check-out
+date are only counted (overstays); they need a real check-out.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from utils.db import write_transaction
+
+from .availability import BLOCKING_STATUSES
+from .models import Reservation, Unit, UnitAllocation, UnitAssignment
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_MAX_SECONDS = 50
+HOLD_GRACE_DAYS = 1
+EXPIRED_STATUS = 'Expired'
+OPEN_ALLOCATION_STATUSES = ('Active', 'Revised', 'Extended')
+
+
+def _locked(queryset, batch_size):
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    return list(queryset.select_for_update(skip_locked=skip_locked, of=('self',)).order_by('id')[:batch_size])
+
+
+def _still_held():
+    return Exists(Reservation.objects.filter(unit_id=OuterRef('pk'), occupancy_status__in=BLOCKING_STATUSES))
+
+
+def _still_allocated():
+    return Exists(UnitAssignment.objects.filter(
+        unit_id=OuterRef('pk'), allocation__allocation_status__in=OPEN_ALLOCATION_STATUSES,
+    ))
+
+
+def _release_units(units, from_statuses, to_status, keep_allocated=False):
+    """
+    Move units in ``from_statuses`` without a live reservation to
+    ``to_status``; with ``keep_allocated``, units assigned to an open
+    allocation stay too. Returns the count.
+    """
+    units = units.filter(occupancy_status__in=from_statuses).exclude(_still_held())
+    if keep_allocated:
+        units = units.exclude(_still_allocated())
+    released = list(units.select_for_update().only('id', 'occupancy_status'))
+    for unit in released:
+        unit.occupancy_status = to_status
+    if released:
+        Unit.objects.bulk_update(released, ['occupancy_status'])
+    return len(released)
+
+
+def _expire_reservations(queryset, batch_size, summary, key):
+    with write_transaction():
+        reservations = _locked(queryset.only('id', 'unit_id', 'occupancy_status'), batch_size)
+        if not reservations:
+            return 0
+        for reservation in reservations:
+            reservation.occupancy_status = EXPIRED_STATUS
+        Reservation.objects.bulk_update(reservations, ['occupancy_status'])
+        # Unit statuses the reservation views set for a booking
+        summary['units_released'] += _release_units(
+            Unit.objects.filter(pk__in={r.unit_id for r in reservations if r.unit_id}),
+            ('Reserved', 'Hold'), 'Assigned',
+        )
+    summary[key] += len(reservations)
+    return len(reservations)
+
+
+def _close_allocations(queryset, batch_size, summary):
+    with write_transaction():
+        allocations = _locked(queryset.only('id', 'allocation_status'), batch_size)
+        if not allocations:
+            return 0
+        for allocation in allocations:
+            allocation.allocation_status = 'Closed'
+        UnitAllocation.objects.bulk_update(allocations, ['allocation_status'])
+        summary['units_released'] += _release_units(
+            Unit.objects.filter(pk__in=UnitAssignment.objects.filter(allocation__in=allocations).values('unit_id')),
+            ('Assigned',), 'Vacant Ready', keep_allocated=True,
+        )
+    summary['allocations_closed'] += len(allocations)
+    return len(allocations)
+
+
+def sweep_reservation_lifecycle(today=None, batch_size=DEFAULT_BATCH_SIZE, max_seconds=DEFAULT_MAX_SECONDS,
+                                hold_grace_days=HOLD_GRACE_DAYS):
+    """
+    Expire lapsed holds and no-show reservations and close ended allocations.
+
+    Args:
+        today: Reference date (defaults to today)
+        batch_size: Rows handled per transaction
+        max_seconds: Stop starting new batches after this long
+        hold_grace_days: Days after the check-in date a hold is kept
+
+    Returns:
+        Dict with holds_expired / reservations_expired / allocations_closed /
+        units_released / overstays / batches counts and timed_out
+    """
+    today = today or timezone.localdate()
+    summary = {
+        'holds_expired': 0, 'reservations_expired': 0, 'allocations_closed': 0,
+        'units_released': 0, 'overstays': 0, 'batches': 0, 'timed_out': False,
+    }
+    started = time.monotonic()
+
+    phases = [
+        lambda: _expire_reservations(
+            Reservation.objects.filter(
+                occupancy_status='Hold', intended_checkin_date__lt=today - timedelta(days=hold_grace_days)
+            ),
+            batch_size, summary, 'holds_expired',
+        ),
+        lambda: _expire_reservations(
+            Reservation.objects.filter(occupancy_status__in=('Reserved', 'Assigned'), intended_checkout_date__lt=today),
+            batch_size, summary, 'reservations_expired',
+        ),
+        lambda: _close_allocations(
+            UnitAllocation.objects.filter(allocation_status__in=OPEN_ALLOCATION_STATUSES, end_date__lt=today),
+            batch_size, summary,
+        ),
+    ]
+    for phase in phases:
+        while True:
+            if time.monotonic() - started >= max_seconds:
+                summary['timed_out'] = True
+                break
+            handled = phase()
+            if handled:
+                summary['batches'] += 1
+            if handled < batch_size:
+                break
+        if summary['timed_out']:
+            break
+
+    summary['overstays'] = Reservation.objects.filter(
+        occupancy_status__in=('Occupied', 'Checked In'), intended_checkout_date__lt=today
+    ).count()
+    logger.info(
+        'Reservation sweep: %(holds_expired)d holds and %(reservations_expired)d reservations expired, '
+        '%(allocations_closed)d allocations closed, %(units_released)d units released, '
+        '%(overstays)d overstays', summary,
+    )
+    return summary
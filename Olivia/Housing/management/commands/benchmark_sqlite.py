@@ -0,0 +1,115 @@
+"""
+Management command to measure concurrent SQLite write throughput.
+Run with: python manage.py benchmark_sqlite
+      or: python manage.py benchmark_sqlite --workers 16 --transactions 100 --rows 50
+
+Each worker thread repeats an import-style transaction on a scratch
+database file: read the existing rows for a batch of keys, then insert or
+update them. The workload runs twice:
+- default: rollback journal, deferred BEGIN, the driver's 5s busy timeout
+  (Django's defaults);
+- tuned: settings.SQLITE_PRAGMAS plus BEGIN IMMEDIATE, as applied by
+  utils.db.
+
+The project database is not touched.
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+def _connect(path, pragmas):
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    for name, value in pragmas.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+
+def _worker(path, pragmas, begin, transactions, rows, key_space, stats, lock):
+    conn = _connect(path, pragmas)
+    rng = random.Random()
+    committed = errors = 0
+    for _ in range(transactions):
+        keys = rng.sample(range(key_space), rows)
+        try:
+            conn.execute(begin)
+            placeholders = ','.join('?' * len(keys))
+            existing = {
+                key for (key,) in
+                conn.execute(f'SELECT unit_number FROM unit WHERE unit_number IN ({placeholders})', keys)
+            }
+            conn.executemany(
+                'UPDATE unit SET occupancy_status = ?, modified = ? WHERE unit_number = ?',
+                [('Occupied', time.time(), key) for key in keys if key in existing],
+            )
+            conn.executemany(
+                'INSERT INTO unit (unit_number, occupancy_status, modified) VALUES (?, ?, ?)',
+                [(key, 'Vacant Ready', time.time()) for key in keys if key not in existing],
+            )
+            conn.execute('COMMIT')
+            committed += 1
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            if 'locked' not in str(e) and 'busy' not in str(e):
+                raise
+            errors += 1
+    conn.close()
+    with lock:
+        stats['committed'] += committed
+        stats['errors'] += errors
+
+
+def run_workload(pragmas, begin, workers, transactions, rows):
+    """Returns {'committed', 'errors', 'seconds'} for one run on a fresh file"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sqlite3')
+        setup = _connect(path, pragmas)
+        setup.execute(
+            'CREATE TABLE unit (id INTEGER PRIMARY KEY, unit_number INTEGER UNIQUE, '
+            'occupancy_status TEXT, modified REAL)'
+        )
+        setup.close()
+
+        stats, lock = {'committed': 0, 'errors': 0}, threading.Lock()
+        key_space = max(rows * workers * 4, 1000)
+        threads = [
+            threading.Thread(target=_worker, args=(path, pragmas, begin, transactions, rows, key_space, stats, lock))
+            for _ in range(workers)
+        ]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats['seconds'] = time.monotonic() - started
+    return stats
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent write throughput and lock errors for default and tuned SQLite settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent writer threads')
+        parser.add_argument('--transactions', type=int, default=50, help='Transactions per worker')
+        parser.add_argument('--rows', type=int, default=50, help='Rows written per transaction')
+
+    def handle(self, *args, **options):
+        workers, transactions, rows = options['workers'], options['transactions'], options['rows']
+        modes = [
+            ('default', {}, 'BEGIN'),
+            ('tuned', getattr(settings, 'SQLITE_PRAGMAS', {}), 'BEGIN IMMEDIATE'),
+        ]
+        self.stdout.write(f'{workers} workers x {transactions} transactions x {rows} rows')
+        for name, pragmas, begin in modes:
+            stats = run_workload(pragmas, begin, workers, transactions, rows)
+            self.stdout.write(self.style.SUCCESS(
+                f'{name:>8}: {stats["committed"]} committed, {stats["errors"]} lock errors, '
+                f'{stats["seconds"]:.2f}s, {stats["committed"] / stats["seconds"]:.0f} tx/s'
+            ))
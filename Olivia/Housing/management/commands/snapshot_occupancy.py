@@ -0,0 +1,26 @@
+"""
+Management command to record the daily occupancy snapshot.
+Run with: python manage.py snapshot_occupancy  (nightly from cron)
+      or: python manage.py snapshot_occupancy --date 2025-01-31
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Housing.reporting import take_occupancy_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Write the OccupancySnapshot rows for a day from current unit statuses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Day to record the snapshot under (YYYY-MM-DD); defaults to today')
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options['date']) if options['date'] else None
+        except ValueError:
+            raise CommandError('Dates must be YYYY-MM-DD')
+
+        written = take_occupancy_snapshot(day)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} occupancy snapshot row(s)'))
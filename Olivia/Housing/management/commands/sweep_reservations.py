@@ -0,0 +1,50 @@
+"""
+Management command to expire lapsed holds / no-show reservations and close ended allocations.
+Run with: python manage.py sweep_reservations  (e.g. every five minutes from cron)
+      or: python manage.py sweep_reservations --loop --interval 300
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from Housing.lifecycle import DEFAULT_BATCH_SIZE, DEFAULT_MAX_SECONDS, HOLD_GRACE_DAYS, sweep_reservation_lifecycle
+
+
+class Command(BaseCommand):
+    help = 'Expire lapsed holds and no-show reservations and close ended allocations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Rows handled per transaction')
+        parser.add_argument('--max-seconds', type=float, default=DEFAULT_MAX_SECONDS,
+                            help='Stop starting new batches after this many seconds')
+        parser.add_argument('--hold-grace-days', type=int, default=HOLD_GRACE_DAYS,
+                            help='Days after the check-in date before a hold expires')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep sweeping until interrupted')
+        parser.add_argument('--interval', type=float, default=300,
+                            help='Seconds between sweeps with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            summary = sweep_reservation_lifecycle(
+                batch_size=options['batch_size'],
+                max_seconds=options['max_seconds'],
+                hold_grace_days=options['hold_grace_days'],
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"Expired {summary['holds_expired']} hold(s) and {summary['reservations_expired']} reservation(s), "
+                f"closed {summary['allocations_closed']} allocation(s), released {summary['units_released']} unit(s) "
+                f"in {summary['batches']} batch(es)"
+                + (' (time budget reached)' if summary['timed_out'] else '')
+            ))
+            if summary['overstays']:
+                self.stdout.write(self.style.WARNING(
+                    f"{summary['overstays']} guest(s) still checked in past their check-out date"
+                ))
+            if not options['loop']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
@@ -0,0 +1,141 @@
+"""
+Unit-matching engine: proposes vacant units for an allocation's A/B/C/D beds.
+
+All Vacant Ready units not held by an open allocation are read with one
+query into a VacancyIndex that groups them by room type and location
+(zone > area > block > building > floor). For each room type still short
+of beds, the engine walks down the hierarchy and picks the tightest
+location that holds all of them. Locations where the company already has
+units win ties. When no single location is big enough, it takes whole
+locations, largest first, and recurses into the remainder. The result is a
+proposal only. Commit it by posting its unit ids to the bulk assignment
+endpoint.
+"""
+from collections import defaultdict
+
+from django.db.models import Exists, OuterRef
+
+from .lifecycle import OPEN_ALLOCATION_STATUSES
+from .models import Unit, UnitAllocation, UnitAssignment
+from .services import ROOM_TYPES, remaining_capacity, unit_room_type
+
+
+LOCATION_LEVELS = ('zone', 'area', 'block', 'building', 'floor')
+
+
+class _Group:
+    """Vacant units of one room type under one location prefix"""
+    __slots__ = ('units', 'children')
+
+    def __init__(self):
+        self.units = []
+        self.children = {}
+
+
+class VacancyIndex:
+    """Vacant units grouped by room type, then by location hierarchy"""
+
+    def __init__(self, units):
+        self.roots = defaultdict(_Group)
+        for unit in units:
+            room_type = unit_room_type(unit)
+            if room_type is None:
+                continue
+            group = self.roots[room_type]
+            group.units.append(unit.pk)
+            for level in LOCATION_LEVELS:
+                group = group.children.setdefault(getattr(unit, level) or '', _Group())
+                group.units.append(unit.pk)
+
+    @classmethod
+    def load(cls, exclude_allocation=None):
+        units = Unit.objects.filter(occupancy_status='Vacant Ready').exclude(Exists(
+            UnitAssignment.objects.filter(unit_id=OuterRef('pk'), allocation__allocation_status__in=OPEN_ALLOCATION_STATUSES)
+        ))
+        if exclude_allocation is not None:
+            units = units.exclude(assignments__allocation=exclude_allocation)
+        units = units.only('id', 'current_type', 'accomodation_type', *LOCATION_LEVELS).order_by(
+            *LOCATION_LEVELS, 'unit_number', 'bed_number'
+        )
+        return cls(units)
+
+    def available(self, room_type):
+        group = self.roots.get(room_type)
+        return len(group.units) if group else 0
+
+    def take(self, room_type, count, preferred=()):
+        """
+        Pick up to ``count`` unit ids of ``room_type``, kept together by location.
+        ``preferred`` holds location paths (tuples) to favour on ties.
+        """
+        group = self.roots.get(room_type)
+        if group is None or count <= 0:
+            return []
+        return self._take(group, (), count, set(preferred))
+
+    def _take(self, group, path, count, preferred):
+        if count >= len(group.units) or not group.children:
+            return group.units[:count]
+
+        children = [(path + (key,), child) for key, child in group.children.items()]
+        fitting = [item for item in children if len(item[1].units) >= count]
+        if fitting:
+            # Tightest fit, preferring locations the company already uses
+            child_path, child = min(
+                fitting, key=lambda item: (item[0] not in preferred, len(item[1].units), item[0])
+            )
+            return self._take(child, child_path, count, preferred)
+
+        picked = []
+        for child_path, child in sorted(
+            children, key=lambda item: (item[0] not in preferred, -len(item[1].units), item[0])
+        ):
+            if count <= 0:
+                break
+            chunk = self._take(child, child_path, count, preferred)
+            picked.extend(chunk)
+            count -= len(chunk)
+        return picked
+
+
+def company_locations(company_id):
+    """Location paths (at every level) where the company already has assigned units"""
+    paths = set()
+    rows = Unit.objects.filter(assignments__allocation__company_id=company_id).values_list(*LOCATION_LEVELS).distinct()
+    for row in rows:
+        row = tuple(value or '' for value in row)
+        for depth in range(1, len(row) + 1):
+            paths.add(row[:depth])
+    return paths
+
+
+def propose_units(allocation, index=None):
+    """
+    Propose units for the allocation's remaining A/B/C/D beds.
+
+    Returns:
+        {'allocation_id', 'units': {type: [unit ids]}, 'unit_ids': [...],
+         'shortfall': {type: beds that could not be matched}}
+    """
+    if not isinstance(allocation, UnitAllocation):
+        allocation = UnitAllocation.objects.get(pk=allocation)
+    remaining = remaining_capacity(allocation)
+    if index is None:
+        index = VacancyIndex.load(exclude_allocation=allocation)
+    preferred = company_locations(allocation.company_id)
+
+    proposal, shortfall = {}, {}
+    for room_type in ROOM_TYPES:
+        needed = remaining[room_type]
+        if needed <= 0:
+            continue
+        proposal[room_type] = index.take(room_type, needed, preferred)
+        if len(proposal[room_type]) < needed:
+            shortfall[room_type] = needed - len(proposal[room_type])
+
+    return {
+        'allocation_id': allocation.pk,
+        'units': proposal,
+        'unit_ids': [unit_id for unit_ids in proposal.values() for unit_id in unit_ids],
+        'shortfall': shortfall,
+    }
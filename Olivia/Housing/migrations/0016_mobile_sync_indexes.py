@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Housing', '0015_alter_reservation_occupancy_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='checkincheckout',
+            index=models.Index(fields=['modified_date'], name='checkin_modified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['modified_date'], name='reservation_modified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['modified_date'], name='unit_modified_idx'),
+        ),
+    ]
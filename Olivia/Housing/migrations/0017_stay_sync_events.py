@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Housing', '0016_mobile_sync_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaySyncEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=64, unique=True)),
+                ('device_id', models.CharField(blank=True, max_length=100)),
+                ('event_type', models.CharField(choices=[('checkin', 'Check-In'), ('checkout', 'Check-Out')], max_length=10)),
+                ('occurred_at', models.DateTimeField()),
+                ('result', models.CharField(choices=[('applied', 'Applied'), ('rejected', 'Rejected')], max_length=10)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('checkin', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sync_events', to='Housing.checkincheckout')),
+                ('received_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stay_sync_events', to=settings.AUTH_USER_MODEL)),
+                ('reservation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sync_events', to='Housing.reservation')),
+            ],
+            options={
+                'verbose_name': 'Stay Sync Event',
+                'verbose_name_plural': 'Stay Sync Events',
+                'ordering': ['-received_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Housing', '0017_stay_sync_events'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['unit', 'intended_checkin_date', 'intended_checkout_date'], name='reservation_unit_dates_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Housing', '0018_reservation_unit_dates_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reservation',
+            name='occupancy_status',
+            field=models.CharField(choices=[('Reserved', 'Reserved'), ('Hold', 'Hold'), ('Assigned', 'Assigned'), ('Occupied', 'Occupied'), ('Checked In', 'Checked In'), ('Checked Out', 'Checked Out'), ('Expired', 'Expired')], default='Reserved', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['occupancy_status', 'intended_checkin_date'], name='reservation_status_in_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['occupancy_status', 'intended_checkout_date'], name='reservation_status_out_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unitallocation',
+            index=models.Index(fields=['allocation_status', 'end_date'], name='allocation_status_end_idx'),
+        ),
+    ]
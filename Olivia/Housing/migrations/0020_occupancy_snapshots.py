@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Housing', '0019_lifecycle_sweep'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccupancySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('accommodation_type', models.CharField(blank=True, max_length=100)),
+                ('zone', models.CharField(blank=True, max_length=100)),
+                ('total', models.IntegerField(default=0)),
+                ('occupied', models.IntegerField(default=0)),
+                ('reserved', models.IntegerField(default=0)),
+                ('vacant', models.IntegerField(default=0)),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occupancy_snapshots', to='Housing.usercompany')),
+            ],
+            options={
+                'verbose_name': 'Occupancy Snapshot',
+                'verbose_name_plural': 'Occupancy Snapshots',
+                'ordering': ['-date', 'company_id', 'accommodation_type', 'zone'],
+                'indexes': [models.Index(fields=['date', 'company'], name='occupancy_date_company_idx')],
+            },
+        ),
+    ]
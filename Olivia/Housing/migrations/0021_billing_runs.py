@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:10
+
+import django.db.models.deletion
+import utils.audit
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Housing', '0020_occupancy_snapshots'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(auto_now_add=True, null=True)),
+                ('modified_date', models.DateTimeField(auto_now=True, null=True)),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField(help_text='Inclusive')),
+                ('status', models.CharField(choices=[('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='running', max_length=10)),
+                ('line_count', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('company_group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='billing_runs', to='Housing.companygroup')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_created', to=settings.AUTH_USER_MODEL)),
+                ('modified_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_modified', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Billing Run',
+                'verbose_name_plural': 'Billing Runs',
+                'ordering': ['-created_date'],
+            },
+            bases=(utils.audit.AuditMixin, models.Model),
+        ),
+        migrations.CreateModel(
+            name='InvoiceLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('accommodation_type', models.CharField(max_length=1)),
+                ('beds', models.IntegerField(default=0)),
+                ('allocated_bed_nights', models.IntegerField(default=0)),
+                ('occupied_bed_nights', models.IntegerField(default=0)),
+                ('rate', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True)),
+                ('allocation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invoice_lines', to='Housing.unitallocation')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invoice_lines', to='Housing.usercompany')),
+                ('company_group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invoice_lines', to='Housing.companygroup')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='Housing.billingrun')),
+            ],
+            options={
+                'verbose_name': 'Invoice Line',
+                'verbose_name_plural': 'Invoice Lines',
+                'ordering': ['run', 'company_group', 'company', 'allocation', 'accommodation_type'],
+                'unique_together': {('run', 'allocation', 'accommodation_type')},
+            },
+        ),
+    ]
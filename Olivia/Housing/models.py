@@ -3,16 +3,20 @@ from django.contrib.auth.models import User
 from django.utils import timezone
 from django_countries.fields import CountryField  
 
+from utils.audit import AuditManager, AuditMixin
+
 # ====================================================================
 # Auditing Mixin (Recommended for cleaner code)
 # ====================================================================
-class AuditModel(models.Model):
-    """Abstract base class for auditing fields."""
+class AuditModel(AuditMixin, models.Model):
+    """Abstract base class for auditing fields (filled from the request user, see utils.audit)."""
     created_date = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='%(class)s_created')
     modified_date = models.DateTimeField(auto_now=True, null=True, blank=True)
     modified_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='%(class)s_modified')
 
+    objects = AuditManager()
+
     class Meta:
         abstract = True
 
@@ -66,7 +70,7 @@ class UserCompany(AuditModel): # Inherits AuditModel
     phone = models.CharField(max_length=20, blank=True, verbose_name="Phone")
 
     # *** FINAL FIX: Explicitly assign the default manager ***
-    objects = models.Manager() 
+    objects = AuditManager()
 
     class Meta:
         verbose_name = "User Company"
@@ -152,6 +156,12 @@ class Unit(AuditModel): # CHANGED: Inherit AuditModel instead of models.Model
     occupancy_status = models.CharField(max_length=100, choices=OCCUPANCY_STATUS_CHOICES, blank=True, null=True)
     room_physical_status = models.CharField(max_length=100, choices=ROOM_PHYSICAL_STATUS_CHOICES, blank=True, null=True)
 
+    history_fields = ('occupancy_status',)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['modified_date'], name='unit_modified_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         """Auto-generate unit_location from Area - Block - Building - Floor"""
@@ -232,6 +242,11 @@ class UnitAllocation(AuditModel):
     allocation_status = models.CharField(max_length=20, choices=ALLOCATION_STATUS_CHOICES, default='Active')
     security_deposit = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     advance_payment = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    history_fields = (
+        'a_rooms_beds', 'b_rooms_beds', 'c_rooms_beds', 'd_rooms_beds', 'total_rooms_beds',
+        'start_date', 'end_date',
+    )
     
     def calculate_total_rooms_beds(self):
         """Calculate total rooms and beds from A/B/C/D entries"""
@@ -254,6 +269,9 @@ class UnitAllocation(AuditModel):
         ordering = ['-created_date']
         verbose_name = "Unit Allocation"
         verbose_name_plural = "Unit Allocations"
+        indexes = [
+            models.Index(fields=['allocation_status', 'end_date'], name='allocation_status_end_idx'),
+        ]
     
     def __str__(self):
         return f"{self.uua_number} - {self.company.company_name}"
@@ -291,6 +309,7 @@ class Reservation(AuditModel):
         ('Occupied', 'Occupied'),
         ('Checked In', 'Checked In'),
         ('Checked Out', 'Checked Out'),
+        ('Expired', 'Expired'),
     ]
     
     # From Assignment
@@ -323,6 +342,10 @@ class Reservation(AuditModel):
     
     occupancy_status = models.CharField(max_length=20, choices=OCCUPANCY_STATUS_CHOICES, default='Reserved')
     remarks = models.TextField(blank=True)
+
+    history_fields = (
+        'intended_checkin_date', 'intended_checkout_date', 'start_date', 'end_date', 'occupancy_status',
+    )
     
     def calculate_duration(self):
         """Calculate duration in days between intended check-in and check-out"""
@@ -339,6 +362,14 @@ class Reservation(AuditModel):
         ordering = ['-created_date']
         verbose_name = "Reservation"
         verbose_name_plural = "Reservations"
+        indexes = [
+            models.Index(fields=['modified_date'], name='reservation_modified_idx'),
+            # Overlap checks: seek on unit, range-scan check-in (see Housing.availability)
+            models.Index(fields=['unit', 'intended_checkin_date', 'intended_checkout_date'], name='reservation_unit_dates_idx'),
+            # Lifecycle sweeper ranges (see Housing.lifecycle)
+            models.Index(fields=['occupancy_status', 'intended_checkin_date'], name='reservation_status_in_idx'),
+            models.Index(fields=['occupancy_status', 'intended_checkout_date'], name='reservation_status_out_idx'),
+        ]
     
     def __str__(self):
         return f"{self.housing_user.username} - {self.unit.unit_number if self.unit else 'No Unit'}"
@@ -369,6 +400,123 @@ class CheckInCheckOut(AuditModel):
         ordering = ['-created_date']
         verbose_name = "Check-In/Check-Out"
         verbose_name_plural = "Check-Ins/Check-Outs"
+        indexes = [
+            models.Index(fields=['modified_date'], name='checkin_modified_idx'),
+        ]
     
     def __str__(self):
         return f"{self.reservation.housing_user.username} - Check-In/Out"
+
+
+class StaySyncEvent(models.Model):
+    """
+    A check-in/check-out event uploaded by an offline mobile device.
+    The client-generated idempotency key makes replaying a batch safe:
+    known keys return the stored outcome instead of being applied again.
+    """
+    EVENT_TYPE_CHOICES = [
+        ('checkin', 'Check-In'),
+        ('checkout', 'Check-Out'),
+    ]
+    RESULT_CHOICES = [
+        ('applied', 'Applied'),
+        ('rejected', 'Rejected'),
+    ]
+
+    idempotency_key = models.CharField(max_length=64, unique=True)
+    device_id = models.CharField(max_length=100, blank=True)
+    event_type = models.CharField(max_length=10, choices=EVENT_TYPE_CHOICES)
+    reservation = models.ForeignKey(Reservation, on_delete=models.SET_NULL, null=True, blank=True, related_name='sync_events')
+    checkin = models.ForeignKey(CheckInCheckOut, on_delete=models.SET_NULL, null=True, blank=True, related_name='sync_events')
+    occurred_at = models.DateTimeField()
+    result = models.CharField(max_length=10, choices=RESULT_CHOICES)
+    error = models.CharField(max_length=255, blank=True)
+    received_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='stay_sync_events')
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-received_at']
+        verbose_name = "Stay Sync Event"
+        verbose_name_plural = "Stay Sync Events"
+
+    def __str__(self):
+        return f"{self.get_event_type_display()} {self.idempotency_key} ({self.result})"
+
+
+class OccupancySnapshot(models.Model):
+    """
+    Beds per (date, company, accommodation type, zone) as they stood when the
+    nightly snapshot_occupancy job ran. Reports read only this table, so
+    they never replay check-in/check-out history. Units not assigned to an
+    open allocation are counted under company None.
+    """
+    date = models.DateField()
+    company = models.ForeignKey(UserCompany, on_delete=models.SET_NULL, null=True, blank=True, related_name='occupancy_snapshots')
+    accommodation_type = models.CharField(max_length=100, blank=True)
+    zone = models.CharField(max_length=100, blank=True)
+
+    total = models.IntegerField(default=0)
+    occupied = models.IntegerField(default=0)
+    reserved = models.IntegerField(default=0)
+    vacant = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date', 'company_id', 'accommodation_type', 'zone']
+        verbose_name = "Occupancy Snapshot"
+        verbose_name_plural = "Occupancy Snapshots"
+        indexes = [
+            models.Index(fields=['date', 'company'], name='occupancy_date_company_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.company_id or '-'} {self.accommodation_type}/{self.zone}: {self.occupied}/{self.total}"
+
+
+class BillingRun(AuditModel):
+    """One billing run for a period, over all company groups or one of them"""
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    period_start = models.DateField()
+    period_end = models.DateField(help_text="Inclusive")
+    company_group = models.ForeignKey(CompanyGroup, on_delete=models.SET_NULL, null=True, blank=True, related_name='billing_runs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    line_count = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_date']
+        verbose_name = "Billing Run"
+        verbose_name_plural = "Billing Runs"
+
+    def __str__(self):
+        return f"{self.period_start} - {self.period_end} ({self.status})"
+
+
+class InvoiceLine(models.Model):
+    """Allocated and occupied bed-nights of one allocation room type in a billing run"""
+    run = models.ForeignKey(BillingRun, on_delete=models.CASCADE, related_name='lines')
+    allocation = models.ForeignKey(UnitAllocation, on_delete=models.CASCADE, related_name='invoice_lines')
+    company = models.ForeignKey(UserCompany, on_delete=models.CASCADE, related_name='invoice_lines')
+    company_group = models.ForeignKey(CompanyGroup, on_delete=models.CASCADE, related_name='invoice_lines')
+    accommodation_type = models.CharField(max_length=1)
+
+    beds = models.IntegerField(default=0)
+    allocated_bed_nights = models.IntegerField(default=0)
+    occupied_bed_nights = models.IntegerField(default=0)
+    # From HOUSING_BED_NIGHT_RATES; empty when no rate is configured for the type
+    rate = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        ordering = ['run', 'company_group', 'company', 'allocation', 'accommodation_type']
+        unique_together = ('run', 'allocation', 'accommodation_type')
+        verbose_name = "Invoice Line"
+        verbose_name_plural = "Invoice Lines"
+
+    def __str__(self):
+        return f"{self.allocation_id}/{self.accommodation_type}: {self.occupied_bed_nights} bed-nights"
@@ -0,0 +1,455 @@
+"""
+Shared Housing business rules used by both the HTML views and the mobile API.
+"""
+from django.db.models import Count
+
+from utils.db import write_transaction
+
+from .availability import BLOCKING_STATUSES, batch_conflicts, unit_on_hold
+from .models import CheckInCheckOut, HousingUser, Reservation, StaySyncEvent, Unit, UnitAllocation, UnitAssignment
+
+
+ROOM_TYPES = ('A', 'B', 'C', 'D')
+# Unit fields a bulk assignment can select on
+UNIT_FILTER_FIELDS = ('zone', 'area', 'block', 'building', 'floor', 'accomodation_type', 'current_type')
+# Keeps a company's units together when filling an allocation from a filter
+UNIT_LOCATION_ORDER = ('zone', 'area', 'block', 'building', 'floor', 'unit_number', 'bed_number')
+ASSIGN_BATCH_SIZE = 500
+
+
+# Reservation / unit occupancy implied by a check-in/check-out record
+CHECKED_IN_STATUSES = ('Occupied', 'Occupied')
+CHECKED_OUT_STATUSES = ('Checked Out', 'Vacant Dirty')
+UNKNOWN_RESERVATION = 'Unknown reservation'
+
+
+def stay_statuses(checked_in, checked_out):
+    """Return (reservation status, unit status) for a check-in/out, or None if neither is set"""
+    if checked_out:
+        return CHECKED_OUT_STATUSES
+    if checked_in:
+        return CHECKED_IN_STATUSES
+    return None
+
+
+def apply_stay_status(reservation, checked_in, checked_out):
+    """Move the reservation and its unit to the status implied by a check-in/out"""
+    statuses = stay_statuses(checked_in, checked_out)
+    if statuses is None:
+        return
+    reservation_status, unit_status = statuses
+    reservation.occupancy_status = reservation_status
+    reservation.save()
+    if reservation.unit:
+        reservation.unit.occupancy_status = unit_status
+        reservation.unit.save()
+
+
+def _apply_stay_changes(events):
+    """
+    Apply check-in/check-out events in ``at`` order; call inside a transaction.
+
+    ``events`` are dicts with ``type`` ('checkin'/'checkout'),
+    ``reservation_id``, ``at`` (aware datetime) and optional ``remarks``.
+    Records are written with bulk_create / bulk_update, and reservation and
+    unit statuses with one bulk_update each (audited, with history).
+
+    Returns [(event, record or None, error)] in application order.
+    """
+    reservation_ids = {event['reservation_id'] for event in events}
+    reservations = {
+        reservation.pk: reservation
+        for reservation in Reservation.objects.select_for_update(of=('self',))
+        .select_related('unit').filter(pk__in=reservation_ids)
+    }
+    open_records = {}
+    for record in CheckInCheckOut.objects.filter(
+        reservation_id__in=list(reservations),
+        actual_checkin_datetime__isnull=False,
+        actual_checkout_datetime__isnull=True,
+    ).order_by('reservation_id', '-actual_checkin_datetime'):
+        open_records.setdefault(record.reservation_id, record)
+
+    new_records, closed_records = [], {}
+    touched_reservations, units = {}, {}
+    applied = []
+
+    def reject(event, error):
+        applied.append((event, None, error))
+
+    for event in sorted(events, key=lambda e: e['at']):
+        reservation = reservations.get(event['reservation_id'])
+        if reservation is None:
+            reject(event, UNKNOWN_RESERVATION)
+            continue
+        record = open_records.get(reservation.pk)
+        remarks = event.get('remarks') or ''
+
+        if event['type'] == 'checkin':
+            if record is not None:
+                reject(event, 'Guest is already checked in')
+                continue
+            record = CheckInCheckOut(reservation=reservation, actual_checkin_datetime=event['at'], remarks=remarks)
+            new_records.append(record)
+            open_records[reservation.pk] = record
+            checked_in, checked_out = event['at'], None
+        else:
+            if record is None:
+                record = CheckInCheckOut(reservation=reservation, remarks=remarks)
+                new_records.append(record)
+            elif event['at'] < record.actual_checkin_datetime:
+                reject(event, 'Check-out is before check-in')
+                continue
+            else:
+                open_records.pop(reservation.pk)
+                if record.pk:
+                    closed_records[record.pk] = record
+                if remarks:
+                    record.remarks = remarks
+            record.actual_checkout_datetime = event['at']
+            if record.actual_checkin_datetime:
+                record.actual_stay_duration = record.calculate_actual_duration()
+            checked_in, checked_out = record.actual_checkin_datetime, event['at']
+
+        reservation_status, unit_status = stay_statuses(checked_in, checked_out)
+        reservation.occupancy_status = reservation_status
+        touched_reservations[reservation.pk] = reservation
+        if reservation.unit:
+            reservation.unit.occupancy_status = unit_status
+            units[reservation.unit.pk] = reservation.unit
+        applied.append((event, record, ''))
+
+    if new_records:
+        CheckInCheckOut.objects.bulk_create(new_records, batch_size=ASSIGN_BATCH_SIZE)
+    if closed_records:
+        CheckInCheckOut.objects.bulk_update(
+            list(closed_records.values()), ['actual_checkout_datetime', 'actual_stay_duration', 'remarks'],
+            batch_size=ASSIGN_BATCH_SIZE,
+        )
+    if touched_reservations:
+        Reservation.objects.bulk_update(list(touched_reservations.values()), ['occupancy_status'], batch_size=ASSIGN_BATCH_SIZE)
+    if units:
+        Unit.objects.bulk_update(list(units.values()), ['occupancy_status'], batch_size=ASSIGN_BATCH_SIZE)
+    return applied
+
+
+def apply_stay_events(events, device_id='', user=None):
+    """
+    Apply a batch of offline check-in/check-out events in one transaction.
+
+    ``events`` are dicts as for _apply_stay_changes plus ``key`` (idempotency
+    key). Keys seen before return their stored outcome, so a replayed batch
+    only costs one lookup.
+
+    Returns:
+        {key: {'result': 'applied'|'rejected', 'checkin_id', 'error', 'duplicate'}}
+    """
+    outcomes = {}
+    for key, result, checkin_id, error in StaySyncEvent.objects.filter(
+        idempotency_key__in=[event['key'] for event in events]
+    ).values_list('idempotency_key', 'result', 'checkin_id', 'error'):
+        outcomes[key] = {'result': result, 'checkin_id': checkin_id, 'error': error, 'duplicate': True}
+
+    fresh = {}
+    for event in events:
+        if event['key'] not in outcomes:
+            fresh.setdefault(event['key'], event)
+    if not fresh:
+        return outcomes
+
+    with write_transaction():
+        applied = _apply_stay_changes(list(fresh.values()))
+        StaySyncEvent.objects.bulk_create([
+            StaySyncEvent(
+                idempotency_key=event['key'],
+                device_id=device_id,
+                event_type=event['type'],
+                reservation_id=event['reservation_id'] if error != UNKNOWN_RESERVATION else None,
+                checkin=record,
+                occurred_at=event['at'],
+                result='applied' if record is not None else 'rejected',
+                error=error,
+                received_by=user,
+            )
+            for event, record, error in applied
+        ])
+
+    for event, record, error in applied:
+        outcomes[event['key']] = {
+            'result': 'applied' if record is not None else 'rejected',
+            'checkin_id': record.pk if record is not None else None,
+            'error': error,
+            'duplicate': False,
+        }
+    return outcomes
+
+
+def bulk_check_in_out(items):
+    """
+    Check many reservations in or out at once (group arrivals / departures),
+    in one transaction. ``items`` are dicts as for _apply_stay_changes.
+
+    Returns one {'reservation', 'result', 'checkin_id', 'error'} per item, in input order.
+    """
+    events = [dict(item, index=index) for index, item in enumerate(items)]
+    with write_transaction():
+        applied = _apply_stay_changes(events)
+    results = [None] * len(events)
+    for event, record, error in applied:
+        results[event['index']] = {
+            'reservation': event['reservation_id'],
+            'result': 'applied' if record is not None else 'rejected',
+            'checkin_id': record.pk if record is not None else None,
+            'error': error,
+        }
+    return results
+
+
+# =======================================================
+# UNIT ASSIGNMENT
+# =======================================================
+
+class AssignmentError(Exception):
+    """A bulk assignment that cannot be applied as requested"""
+
+
+def parse_beds(rooms_beds):
+    """Bed count of an allocation "rooms/beds" value ("2/4" -> 4)"""
+    try:
+        return int(rooms_beds.split('/')[1])
+    except (AttributeError, IndexError, ValueError):
+        return 0
+
+
+def unit_room_type(unit):
+    """A/B/C/D room type of a unit: its current type, else the letter of its accommodation type"""
+    if unit.current_type in ROOM_TYPES:
+        return unit.current_type
+    letter = (unit.accomodation_type or '')[:1]
+    return letter if letter in ROOM_TYPES else None
+
+
+def remaining_capacity(allocation):
+    """Beds not yet assigned per room type, e.g. {'A': 4, 'B': 0, ...}"""
+    remaining = {room_type: parse_beds(getattr(allocation, f'{room_type.lower()}_rooms_beds')) for room_type in ROOM_TYPES}
+    assigned = (
+        UnitAssignment.objects.filter(allocation=allocation).order_by()
+        .values('accommodation_type').annotate(count=Count('id')).values_list('accommodation_type', 'count')
+    )
+    for room_type, count in assigned:
+        if room_type in remaining:
+            remaining[room_type] -= count
+    return remaining
+
+
+def assign_units(allocation_id, unit_ids=None, filters=None, accommodation_type=None):
+    """
+    Assign many Vacant Ready units to an allocation in one transaction.
+
+    Units are either listed in ``unit_ids`` (all must be Vacant Ready and fit
+    the remaining capacity, or nothing is assigned) or selected with
+    ``filters`` on UNIT_FILTER_FIELDS, in which case each room type is filled
+    up to its remaining capacity, in location order. A unit is assigned as
+    ``accommodation_type`` when given, otherwise as its own type (unit_room_type).
+
+    Returns:
+        {'created': n, 'unit_ids': [...], 'remaining': {type: beds}, 'fully_assigned': bool}
+    """
+    if accommodation_type is not None and accommodation_type not in ROOM_TYPES:
+        raise AssignmentError(f'Unknown accommodation type {accommodation_type!r}')
+
+    with write_transaction():
+        # Locking the allocation serializes concurrent assignments to it
+        allocation = UnitAllocation.objects.select_for_update().get(pk=allocation_id)
+        remaining = remaining_capacity(allocation)
+
+        units = (
+            Unit.objects.select_for_update()
+            .filter(occupancy_status='Vacant Ready')
+            .exclude(assignments__allocation=allocation)
+            .only('id', 'unit_number', 'current_type', 'accomodation_type', 'occupancy_status')
+        )
+        by_type = {room_type: [] for room_type in ROOM_TYPES}
+
+        if unit_ids is not None:
+            unit_ids = set(unit_ids)
+            units = list(units.filter(pk__in=unit_ids))
+            unavailable = unit_ids - {unit.pk for unit in units}
+            if unavailable:
+                raise AssignmentError(f'Units not available for assignment: {sorted(unavailable)}')
+            for unit in units:
+                room_type = accommodation_type or unit_room_type(unit)
+                if room_type not in by_type:
+                    raise AssignmentError(f'Unit {unit.unit_number} has no accommodation type')
+                by_type[room_type].append(unit)
+            for room_type, chosen in by_type.items():
+                if len(chosen) > remaining[room_type]:
+                    raise AssignmentError(
+                        f'{len(chosen)} {room_type} type units requested but only '
+                        f'{max(remaining[room_type], 0)} {room_type} type beds remain in this allocation'
+                    )
+        else:
+            filters = {name: value for name, value in (filters or {}).items() if value}
+            unknown = set(filters) - set(UNIT_FILTER_FIELDS)
+            if unknown:
+                raise AssignmentError(f'Unknown unit filters: {sorted(unknown)}')
+            units = units.filter(**filters)
+            if accommodation_type is not None and remaining[accommodation_type] <= 0:
+                units = units.none()
+            for unit in units.order_by(*UNIT_LOCATION_ORDER):
+                room_type = accommodation_type or unit_room_type(unit)
+                if room_type in by_type and len(by_type[room_type]) < remaining[room_type]:
+                    by_type[room_type].append(unit)
+
+        assignments, chosen = [], []
+        for room_type, units_of_type in by_type.items():
+            for unit in units_of_type:
+                assignments.append(UnitAssignment(allocation=allocation, unit=unit, accommodation_type=room_type))
+                unit.occupancy_status = 'Assigned'
+                chosen.append(unit)
+            remaining[room_type] -= len(units_of_type)
+        if not assignments:
+            raise AssignmentError('No vacant units match the request')
+
+        UnitAssignment.objects.bulk_create(assignments, batch_size=ASSIGN_BATCH_SIZE)
+        Unit.objects.bulk_update(chosen, ['occupancy_status'], batch_size=ASSIGN_BATCH_SIZE)
+        allocation.save(update_fields=['modified_date'])
+
+    return {
+        'created': len(assignments),
+        'unit_ids': [unit.pk for unit in chosen],
+        'remaining': remaining,
+        'fully_assigned': all(beds <= 0 for beds in remaining.values()),
+    }
+
+
+# =======================================================
+# RESERVATIONS
+# =======================================================
+
+class ReservationError(Exception):
+    """Reservations that cannot be created as requested; ``errors`` maps row index to message"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(f'Row {index + 1}: {message}' for index, message in sorted(errors.items())))
+
+
+def unit_location_code(unit):
+    return '-'.join(filter(None, [unit.zone, unit.area, unit.block, unit.building, unit.floor]))
+
+
+def assignments_for_reservation():
+    """Assignments joined with everything a reservation snapshots (one query)"""
+    return UnitAssignment.objects.select_related('allocation', 'unit')
+
+
+def fill_reservation_snapshot(reservation, assignment, housing_user):
+    """Copy the assignment / allocation / unit and housing-user fields a reservation keeps"""
+    allocation, unit = assignment.allocation, assignment.unit
+    reservation.assignment = assignment
+    reservation.allocation_type = allocation.allocation_type
+    reservation.uua_number = allocation.uua_number
+    reservation.company_group_id = allocation.company_group_id
+    reservation.company_id = allocation.company_id
+    reservation.start_date = allocation.start_date
+    reservation.end_date = allocation.end_date
+    reservation.accomodation_type = unit.accomodation_type or ''
+    reservation.unit = unit
+    reservation.unit_location_code = unit_location_code(unit)
+
+    reservation.housing_user = housing_user
+    reservation.govt_id_number = housing_user.government_id or ''
+    reservation.id_type = housing_user.id_type or ''
+    reservation.neom_id = housing_user.neom_id or ''
+    reservation.dob = housing_user.dob
+    reservation.mobile_number = housing_user.mobile or ''
+    reservation.email = housing_user.email or ''
+    reservation.nationality = housing_user.nationality or ''
+    reservation.religion = housing_user.religion or ''
+
+
+def create_reservations(rows, allocation_id=None):
+    """
+    Create reservations in one transaction, all or nothing.
+
+    Each row is a dict with ``housing_user_id``, ``intended_checkin_date``,
+    ``intended_checkout_date`` and optional ``assignment_id``,
+    ``occupancy_status`` (default Reserved) and ``remarks``. Rows without an
+    assignment take the next free assignment of ``allocation_id``, in unit
+    location order. Snapshot fields come from the database, never from the
+    client. Units move to Reserved / Hold with one bulk update.
+
+    Raises ReservationError listing every rejected row.
+    """
+    errors = {}
+    # Auto-picked assignments are filled in below; leave the caller's dicts alone
+    rows = [dict(row) for row in rows]
+    with write_transaction():
+        assignment_ids = {row['assignment_id'] for row in rows if row.get('assignment_id')}
+        assignments = assignments_for_reservation().in_bulk(assignment_ids)
+        users = HousingUser.objects.in_bulk({row['housing_user_id'] for row in rows if row.get('housing_user_id')})
+
+        unassigned = [index for index, row in enumerate(rows) if not row.get('assignment_id')]
+        if unassigned and allocation_id:
+            free = list(
+                assignments_for_reservation()
+                .filter(allocation_id=allocation_id, unit__occupancy_status='Assigned')
+                .filter(~unit_on_hold('unit_id'))
+                .exclude(pk__in=assignment_ids)
+                .order_by(*(f'unit__{name}' for name in UNIT_LOCATION_ORDER))[:len(unassigned)]
+            )
+            for index, assignment in zip(unassigned, free):
+                rows[index]['assignment_id'] = assignment.pk
+                assignments[assignment.pk] = assignment
+
+        reservations = []
+        for index, row in enumerate(rows):
+            assignment = assignments.get(row.get('assignment_id'))
+            housing_user = users.get(row.get('housing_user_id'))
+            checkin, checkout = row.get('intended_checkin_date'), row.get('intended_checkout_date')
+            status = row.get('occupancy_status') or 'Reserved'
+            if assignment is None:
+                errors[index] = 'No free unit assignment' if not row.get('assignment_id') else 'Unit assignment not found'
+            elif housing_user is None:
+                errors[index] = 'Housing user not found'
+            elif not checkin or not checkout or checkout < checkin:
+                errors[index] = 'Check-out date must not be before check-in date'
+            elif status not in dict(Reservation.OCCUPANCY_STATUS_CHOICES):
+                errors[index] = f'Unknown occupancy status {status!r}'
+            if index in errors:
+                reservations.append(None)
+                continue
+            reservation = Reservation(
+                intended_checkin_date=checkin,
+                intended_checkout_date=checkout,
+                occupancy_status=status,
+                remarks=row.get('remarks') or '',
+            )
+            fill_reservation_snapshot(reservation, assignment, housing_user)
+            reservation.intended_stay_duration = reservation.calculate_duration()
+            reservations.append(reservation)
+
+        # Lock the units, then check them against existing reservations and each other
+        unit_ids = {r.unit_id for r in reservations if r is not None}
+        units = Unit.objects.select_for_update().only('id', 'occupancy_status').in_bulk(unit_ids)
+        blocking = [
+            (r.unit_id, r.intended_checkin_date, r.intended_checkout_date)
+            if r is not None and r.occupancy_status in BLOCKING_STATUSES else (None, None, None)
+            for r in reservations
+        ]
+        for index, message in batch_conflicts(blocking).items():
+            errors.setdefault(index, message)
+        if errors:
+            raise ReservationError(errors)
+
+        Reservation.objects.bulk_create(reservations, batch_size=ASSIGN_BATCH_SIZE)
+        changed = {}
+        for reservation in reservations:
+            unit = units.get(reservation.unit_id)
+            if unit is not None and reservation.occupancy_status in ('Reserved', 'Hold'):
+                unit.occupancy_status = reservation.occupancy_status
+                changed[unit.pk] = unit
+        if changed:
+            Unit.objects.bulk_update(list(changed.values()), ['occupancy_status'], batch_size=ASSIGN_BATCH_SIZE)
+    return reservations
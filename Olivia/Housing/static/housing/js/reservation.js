@@ -53,6 +53,122 @@ function getSelectedReservationIds() {
     }).get();
 }
 
+// =======================================================
+// Dropdown Options (loaded on demand, searchable)
+// =======================================================
+
+const OPTION_SOURCES = {
+    assignment: {
+        url: '/housing/reservation/options/assignments/',
+        placeholder: 'Select Unit...',
+        option: a => $('<option>').val(a.id).text(a.unit).attr({
+            'data-unit': a.unit,
+            'data-unit-id': a.unit_id,
+            'data-uua': a.uua,
+            'data-company': a.company,
+            'data-company-id': a.company_id,
+            'data-group': a.group,
+            'data-group-id': a.group_id,
+            'data-allocation-type': a.allocation_type,
+            'data-start-date': a.start_date,
+            'data-end-date': a.end_date,
+            'data-accom-type': a.accom_type,
+            'data-location-code': a.location_code,
+        }),
+    },
+    unitNumber: {
+        url: '/housing/reservation/options/units/',
+        placeholder: 'Select Unit...',
+        option: u => $('<option>').val(u.id).text(u.label),
+    },
+    housingUser: {
+        url: '/housing/reservation/options/users/',
+        placeholder: 'Select User...',
+        option: u => $('<option>').val(u.id).text(u.username).attr({
+            'data-neomid': u.neomid,
+            'data-govid': u.govid,
+            'data-idtype': u.idtype,
+            'data-dob': u.dob,
+            'data-mobile': u.mobile,
+            'data-email': u.email,
+            'data-nationality': u.nationality,
+            'data-religion': u.religion,
+            'data-company': u.company,
+            'data-group': u.group,
+        }),
+    },
+};
+
+function loadOptions(name, query = '') {
+    const source = OPTION_SOURCES[name];
+    const $select = $('#' + name);
+    return $.getJSON(source.url, { q: query }).then(function (data) {
+        const current = $select.val();
+        const $current = current ? $select.find('option:selected').detach() : null;
+        $select.empty().append($('<option>').val('').text(source.placeholder));
+        data.results.forEach(item => {
+            if (String(item.id) !== current) $select.append(source.option(item));
+        });
+        // Keep the chosen value even when the search no longer matches it
+        if ($current) $select.append($current).val(current);
+        if (data.has_more) {
+            $select.append($('<option disabled>').text('More results - refine the search'));
+        }
+    });
+}
+
+function ensureOption(name, id) {
+    // The edited reservation's current values may no longer be eligible
+    const $select = $('#' + name);
+    if (!id || $select.find(`option[value="${id}"]`).length) {
+        return $.Deferred().resolve().promise();
+    }
+    return $.getJSON(OPTION_SOURCES[name].url, { id: id }).then(function (data) {
+        data.results.forEach(item => $select.append(OPTION_SOURCES[name].option(item)));
+    });
+}
+
+function loadAllOptions() {
+    $('.option-search').val('');
+    return $.when(...Object.keys(OPTION_SOURCES).map(name => loadOptions(name)));
+}
+
+function populateReservationForm(data) {
+    $('#reservationId').val(data.id);
+    $('#assignment').val(data.assignment).trigger('change');
+    
+    // Populate assignment fields
+    $('#allocationType').val(data.allocation_type || '');
+    $('#uuaNumber').val(data.uua_number || '');
+    $('#companyGroup').val(data.company_group_name || '');
+    $('#companyGroupId').val(data.company_group || '');
+    $('#company').val(data.company_name || '');
+    $('#companyId').val(data.company || '');
+    $('#startDate').val(data.start_date || '');
+    $('#endDate').val(data.end_date || '');
+    $('#accomodationType').val(data.accomodation_type || '');
+    $('#unitNumber').val(data.unit || '');
+    $('#unitLocationCode').val(data.unit_location_code || '');
+    
+    // Populate housing user fields
+    $('#housingUser').val(data.housing_user);
+    $('#govtId').val(data.govt_id_number || '');
+    $('#idType').val(data.id_type || '');
+    $('#neomId').val(data.neom_id || '');
+    $('#dob').val(data.dob || '');
+    $('#mobileNumber').val(data.mobile_number || '');
+    $('#email').val(data.email || '');
+    $('#nationality').val(data.nationality || '');
+    $('#religion').val(data.religion || '');
+    
+    // Populate reservation fields
+    $('#intendedCheckinDate').val(data.intended_checkin_date);
+    $('#intendedCheckoutDate').val(data.intended_checkout_date);
+    $('#intendedStayDuration').val(data.intended_stay_duration || '');
+    $('#occupancyStatus').val(data.occupancy_status);
+    $('#remarks').val(data.remarks || '');
+}
+
 // =======================================================
 // Modal Management
 // =======================================================
@@ -70,54 +186,27 @@ function openReservationModal(mode = 'create', reservationId = null) {
     if (mode === 'create') {
         $title.text('Add New Reservation');
         $saveBtn.text('Save');
+        loadAllOptions();
         $modal.modal('show');
     } else if (mode === 'update' && reservationId) {
         $title.text('Update Reservation');
         $saveBtn.text('Update');
 
-        $.ajax({
-            url: `/housing/reservation/update/${reservationId}/`,
-            type: 'GET',
-            success: function (data) {
-                $('#reservationId').val(data.id);
-                $('#assignment').val(data.assignment).trigger('change');
-                
-                // Populate assignment fields
-                $('#allocationType').val(data.allocation_type || '');
-                $('#uuaNumber').val(data.uua_number || '');
-                $('#companyGroup').val(data.company_group_name || '');
-                $('#companyGroupId').val(data.company_group || '');
-                $('#company').val(data.company_name || '');
-                $('#companyId').val(data.company || '');
-                $('#startDate').val(data.start_date || '');
-                $('#endDate').val(data.end_date || '');
-                $('#accomodationType').val(data.accomodation_type || '');
-                $('#unitNumber').val(data.unit || '');
-                $('#unitLocationCode').val(data.unit_location_code || '');
-                
-                // Populate housing user fields
-                $('#housingUser').val(data.housing_user);
-                $('#govtId').val(data.govt_id_number || '');
-                $('#idType').val(data.id_type || '');
-                $('#neomId').val(data.neom_id || '');
-                $('#dob').val(data.dob || '');
-                $('#mobileNumber').val(data.mobile_number || '');
-                $('#email').val(data.email || '');
-                $('#nationality').val(data.nationality || '');
-                $('#religion').val(data.religion || '');
-                
-                // Populate reservation fields
-                $('#intendedCheckinDate').val(data.intended_checkin_date);
-                $('#intendedCheckoutDate').val(data.intended_checkout_date);
-                $('#intendedStayDuration').val(data.intended_stay_duration || '');
-                $('#occupancyStatus').val(data.occupancy_status);
-                $('#remarks').val(data.remarks || '');
-
+        $.when(
+            $.ajax({ url: `/housing/reservation/update/${reservationId}/`, type: 'GET' }),
+            loadAllOptions()
+        ).then(function (response) {
+            const data = response[0];
+            return $.when(
+                ensureOption('assignment', data.assignment),
+                ensureOption('unitNumber', data.unit),
+                ensureOption('housingUser', data.housing_user)
+            ).then(function () {
+                populateReservationForm(data);
                 $modal.modal('show');
-            },
-            error: function (xhr) {
-                showCustomMessageModal('Error', 'Failed to load reservation data', false);
-            }
+            });
+        }).fail(function () {
+            showCustomMessageModal('Error', 'Failed to load reservation data', false);
         });
     }
 }
@@ -348,6 +437,15 @@ $(document).ready(function () {
     // Assignment change
     $('#assignment').on('change', showAssignmentInfo);
 
+    // Dropdown searches
+    const searchTimers = {};
+    $('.option-search').on('input', function () {
+        const name = $(this).data('source');
+        const query = $(this).val();
+        clearTimeout(searchTimers[name]);
+        searchTimers[name] = setTimeout(() => loadOptions(name, query), 300);
+    });
+
     // Date changes for calculating duration
     $('#intendedCheckinDate, #intendedCheckoutDate').on('change', calculateStayDuration);
 
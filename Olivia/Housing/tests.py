@@ -1,3 +1,688 @@
-from django.test import TestCase
+import json
+from datetime import date, datetime, timezone
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .availability import availability_calendar, batch_conflicts, calendar_range_ok, find_conflict
+from .billing import _overlap_days, occupied_bed_nights, run_billing
+from .lifecycle import sweep_reservation_lifecycle
+from .matching import propose_units
+from .models import (
+    CheckInCheckOut, CompanyGroup, HousingUser, Reservation, StaySyncEvent, Unit, UnitAllocation, UnitAssignment,
+    UserCompany,
+)
+from .services import (
+    UNKNOWN_RESERVATION, ReservationError, apply_stay_events, bulk_check_in_out, create_reservations,
+)
+
+
+class HousingFixtureMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = CompanyGroup.objects.create(company_name='Group')
+        cls.company = UserCompany.objects.create(company_name='Company', company_group=cls.group)
+        cls.allocation = UnitAllocation.objects.create(
+            allocation_type='UUA', uua_number='UUA-1', allocation_status='Active',
+            company_group=cls.group, company=cls.company,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31), a_rooms_beds='3/3',
+        )
+        cls.units = [
+            Unit.objects.create(
+                unit_number=f'U{i}', occupancy_status='Assigned', accomodation_type='A (1 * 1)',
+                zone='NZ', floor=str(i),
+            )
+            for i in range(3)
+        ]
+        cls.assignments = [
+            UnitAssignment.objects.create(allocation=cls.allocation, unit=unit, accommodation_type='A')
+            for unit in cls.units
+        ]
+        cls.users = [
+            HousingUser.objects.create(
+                username=f'guest{i}', company=cls.company, group=cls.group,
+                government_id=f'G{i}', neom_id=f'N{i}', mobile=f'050000000{i}', email=f'guest{i}@example.com',
+            )
+            for i in range(3)
+        ]
+
+
+class CreateReservationsTests(HousingFixtureMixin, TestCase):
+    def row(self, user, assignment=None, checkin=date(2026, 3, 1), checkout=date(2026, 3, 10)):
+        row = {
+            'housing_user_id': user.pk,
+            'intended_checkin_date': checkin,
+            'intended_checkout_date': checkout,
+        }
+        if assignment is not None:
+            row['assignment_id'] = assignment.pk
+        return row
+
+    def test_snapshot_comes_from_database(self):
+        rows = [self.row(self.users[0], self.assignments[1])]
+        rows[0]['unit_location_code'] = 'client value'
+
+        reservation, = create_reservations(rows)
+
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.assignment_id, self.assignments[1].pk)
+        self.assertEqual(reservation.unit_id, self.units[1].pk)
+        self.assertEqual(reservation.unit_location_code, 'NZ-1')
+        self.assertEqual(reservation.accomodation_type, 'A (1 * 1)')
+        self.assertEqual(reservation.company_id, self.company.pk)
+        self.assertEqual(reservation.company_group_id, self.group.pk)
+        self.assertEqual(reservation.uua_number, 'UUA-1')
+        self.assertEqual(reservation.start_date, date(2026, 1, 1))
+        self.assertEqual(reservation.end_date, date(2026, 12, 31))
+        self.assertEqual(reservation.govt_id_number, 'G0')
+        self.assertEqual(reservation.neom_id, 'N0')
+        self.assertEqual(reservation.email, 'guest0@example.com')
+        self.assertEqual(reservation.intended_stay_duration, 9)
+        self.units[1].refresh_from_db()
+        self.assertEqual(self.units[1].occupancy_status, 'Reserved')
+
+    def test_auto_pick_leaves_rows_untouched(self):
+        rows = [self.row(self.users[0]), self.row(self.users[1])]
+        original = [dict(row) for row in rows]
+
+        reservations = create_reservations(rows, allocation_id=self.allocation.pk)
+
+        self.assertEqual(rows, original)
+        self.assertEqual(
+            [r.assignment_id for r in reservations],
+            [self.assignments[0].pk, self.assignments[1].pk],
+        )
+
+    def test_overlap_within_batch_rejected(self):
+        rows = [
+            self.row(self.users[0], self.assignments[0], date(2026, 3, 1), date(2026, 3, 10)),
+            self.row(self.users[1], self.assignments[0], date(2026, 3, 9), date(2026, 3, 20)),
+        ]
+
+        with self.assertRaises(ReservationError) as raised:
+            create_reservations(rows)
+
+        self.assertEqual(raised.exception.errors, {1: 'Overlaps row 1 of this batch on the same unit'})
+
+    def test_back_to_back_stays_in_batch_allowed(self):
+        rows = [
+            self.row(self.users[0], self.assignments[0], date(2026, 3, 1), date(2026, 3, 10)),
+            self.row(self.users[1], self.assignments[0], date(2026, 3, 10), date(2026, 3, 20)),
+        ]
+
+        self.assertEqual(len(create_reservations(rows)), 2)
+
+    def test_one_bad_row_rolls_back_batch(self):
+        rows = [
+            self.row(self.users[0], self.assignments[0]),
+            self.row(self.users[1], self.assignments[1], date(2026, 3, 10), date(2026, 3, 1)),
+            {**self.row(self.users[2], self.assignments[2]), 'housing_user_id': 0},
+        ]
+
+        with self.assertRaises(ReservationError) as raised:
+            create_reservations(rows)
+
+        self.assertEqual(raised.exception.errors, {
+            1: 'Check-out date must not be before check-in date',
+            2: 'Housing user not found',
+        })
+        self.assertFalse(Reservation.objects.exists())
+        self.assertEqual(
+            set(Unit.objects.values_list('occupancy_status', flat=True)),
+            {'Assigned'},
+        )
+
+
+class BulkCreateViewTests(HousingFixtureMixin, TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+
+    def post(self, name, body):
+        return self.client.post(reverse(name), json.dumps(body), content_type='application/json')
+
+    def test_reservation_batch_created(self):
+        response = self.post('reservation_bulk_create', {
+            'intended_checkin_date': '2026-03-01', 'intended_checkout_date': '2026-03-10',
+            'reservations': [
+                {'housing_user': self.users[0].pk, 'assignment': self.assignments[0].pk},
+                {'housing_user': self.users[1].pk, 'assignment': self.assignments[1].pk,
+                 'intended_checkout_date': '2026-03-05'},
+            ],
+        })
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            sorted(Reservation.objects.values_list('housing_user_id', 'intended_checkout_date')),
+            [(self.users[0].pk, date(2026, 3, 10)), (self.users[1].pk, date(2026, 3, 5))],
+        )
+
+    def test_reservation_failing_row_rolls_back_batch(self):
+        response = self.post('reservation_bulk_create', {
+            'intended_checkin_date': '2026-03-01', 'intended_checkout_date': '2026-03-10',
+            'reservations': [
+                {'housing_user': self.users[0].pk, 'assignment': self.assignments[0].pk},
+                {'housing_user': self.users[1].pk, 'assignment': self.assignments[1].pk},
+                {'housing_user': self.users[2].pk, 'assignment': self.assignments[1].pk},
+                {'housing_user': 0, 'assignment': self.assignments[2].pk},
+            ],
+        })
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        # Keys are 1-based row numbers, matching "Row n:" in the message
+        self.assertEqual(set(errors), {'3', '4'})
+        self.assertEqual(errors['4'], 'Housing user not found')
+        self.assertIn('Row 3:', response.json()['error'])
+        self.assertFalse(Reservation.objects.exists())
+        self.assertEqual(set(Unit.objects.values_list('occupancy_status', flat=True)), {'Assigned'})
+
+    def vacant_units(self, count, status='Vacant Ready'):
+        return [
+            Unit.objects.create(unit_number=f'V{i}', occupancy_status=status, accomodation_type='A (1 * 1)')
+            for i in range(count)
+        ]
+
+    def test_assignment_batch_created(self):
+        allocation = UnitAllocation.objects.create(
+            allocation_type='UUA', uua_number='UUA-2', company_group=self.group, company=self.company,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31), a_rooms_beds='2/2',
+        )
+        units = self.vacant_units(2)
+
+        response = self.post('assignment_bulk_create', {
+            'allocation_id': allocation.pk, 'unit_ids': [unit.pk for unit in units],
+        })
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['created'], 2)
+        self.assertTrue(response.json()['fully_assigned'])
+        self.assertEqual(set(Unit.objects.filter(pk__in=[u.pk for u in units]).values_list(
+            'occupancy_status', flat=True)), {'Assigned'})
+
+    def test_assignment_failing_unit_rolls_back_batch(self):
+        allocation = UnitAllocation.objects.create(
+            allocation_type='UUA', uua_number='UUA-2', company_group=self.group, company=self.company,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31), a_rooms_beds='1/1',
+        )
+        units = self.vacant_units(2)
+        unit_ids = [unit.pk for unit in units]
+
+        taken = self.post('assignment_bulk_create', {
+            'allocation_id': allocation.pk, 'unit_ids': unit_ids[:1] + [self.units[0].pk],
+        })
+        over_capacity = self.post('assignment_bulk_create', {'allocation_id': allocation.pk, 'unit_ids': unit_ids})
+
+        self.assertEqual(taken.status_code, 400)
+        self.assertEqual(taken.json()['error'], f'Units not available for assignment: [{self.units[0].pk}]')
+        self.assertEqual(over_capacity.status_code, 400)
+        self.assertEqual(
+            over_capacity.json()['error'], '2 A type units requested but only 1 A type beds remain in this allocation',
+        )
+        self.assertFalse(UnitAssignment.objects.filter(allocation=allocation).exists())
+        self.assertEqual(
+            set(Unit.objects.filter(pk__in=unit_ids).values_list('occupancy_status', flat=True)), {'Vacant Ready'},
+        )
+
+
+class ReservationOptionsTests(HousingFixtureMixin, TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+
+    def options(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_users_deduplicated_by_username(self):
+        duplicate = HousingUser.objects.create(username='guest0', company=self.company, government_id='G9')
+
+        body = self.options('reservation_user_options')
+
+        self.assertEqual([row['id'] for row in body['results']], [user.pk for user in self.users])
+        self.assertFalse(body['has_more'])
+        self.assertEqual([row['id'] for row in self.options('reservation_user_options', q='guest0')['results']],
+                         [self.users[0].pk])
+        # ?id= still finds the hidden duplicate (the value of a reservation being edited)
+        self.assertEqual([row['govid'] for row in self.options('reservation_user_options', id=duplicate.pk)['results']],
+                         ['G9'])
+
+    def test_id_lookup_ignores_eligibility(self):
+        Unit.objects.filter(pk=self.units[0].pk).update(occupancy_status='Occupied')
+
+        listed = [row['id'] for row in self.options('reservation_assignment_options')['results']]
+        self.assertNotIn(self.assignments[0].pk, listed)
+        body = self.options('reservation_assignment_options', id=self.assignments[0].pk)
+        self.assertEqual([row['id'] for row in body['results']], [self.assignments[0].pk])
+        self.assertEqual(self.options('reservation_unit_options', id=0)['results'], [])
+
+        response = self.client.get(reverse('reservation_unit_options'), {'id': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_pages(self):
+        for i in range(3, 55):
+            HousingUser.objects.create(username=f'guest{i:02}', company=self.company)
+
+        first = self.options('reservation_user_options')
+        second = self.options('reservation_user_options', page=2)
+
+        self.assertEqual(len(first['results']), 50)
+        self.assertTrue(first['has_more'])
+        self.assertEqual(len(second['results']), 5)
+        self.assertFalse(second['has_more'])
+        self.assertFalse({row['id'] for row in first['results']} & {row['id'] for row in second['results']})
+
+
+class AvailabilityTests(HousingFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.stay, cls.next_stay = create_reservations([
+            {'assignment_id': cls.assignments[0].pk, 'housing_user_id': cls.users[0].pk,
+             'intended_checkin_date': date(2026, 3, 5), 'intended_checkout_date': date(2026, 3, 10)},
+            {'assignment_id': cls.assignments[0].pk, 'housing_user_id': cls.users[1].pk,
+             'intended_checkin_date': date(2026, 3, 12), 'intended_checkout_date': date(2026, 3, 20)},
+        ])
+        create_reservations([
+            {'assignment_id': cls.assignments[1].pk, 'housing_user_id': cls.users[2].pk,
+             'intended_checkin_date': date(2026, 3, 1), 'intended_checkout_date': date(2026, 3, 30),
+             'occupancy_status': 'Checked Out'},
+        ])
+
+    def conflict(self, start, end, unit=0, **kwargs):
+        found = find_conflict(self.units[unit].pk, date(2026, 3, start), date(2026, 3, end), **kwargs)
+        return found.pk if found else None
+
+    def test_find_conflict_boundaries(self):
+        # Check-out day is free: back-to-back stays on either side fit
+        self.assertIsNone(self.conflict(1, 5))
+        self.assertIsNone(self.conflict(10, 12))
+        self.assertEqual(self.conflict(9, 11), self.stay.pk)
+        self.assertEqual(self.conflict(4, 6), self.stay.pk)
+        self.assertEqual(self.conflict(1, 25), self.stay.pk)
+        # The reservation being edited does not conflict with itself
+        self.assertIsNone(self.conflict(5, 10, exclude_id=self.stay.pk))
+        self.assertEqual(self.conflict(6, 14, exclude_id=self.stay.pk), self.next_stay.pk)
+        # Checked-out stays no longer hold the unit
+        self.assertIsNone(self.conflict(1, 30, unit=1))
+
+    def test_batch_conflicts(self):
+        unit = self.units[2].pk
+        errors = batch_conflicts([
+            (self.units[0].pk, date(2026, 3, 10), date(2026, 3, 12)),
+            (self.units[0].pk, date(2026, 3, 9), date(2026, 3, 11)),
+            (unit, date(2026, 4, 1), date(2026, 4, 5)),
+            (unit, date(2026, 4, 5), date(2026, 4, 8)),
+            (unit, date(2026, 4, 7), date(2026, 4, 9)),
+            (None, None, None),
+        ])
+
+        self.assertEqual(errors, {
+            1: 'Unit is already reserved from 03/05/2026 to 03/10/2026',
+            4: 'Overlaps row 4 of this batch on the same unit',
+        })
+
+    def test_calendar_clips_and_merges(self):
+        Reservation.objects.filter(pk=self.next_stay.pk).update(intended_checkin_date=date(2026, 3, 10))
+        units = Unit.objects.filter(pk__in=[self.units[0].pk, self.units[1].pk])
+
+        first, second = availability_calendar(units, date(2026, 3, 7), date(2026, 3, 25))
+
+        self.assertEqual(
+            [(b['start'], b['end'], b['reservation']) for b in first['busy']],
+            [(date(2026, 3, 7), date(2026, 3, 10), self.stay.pk),
+             (date(2026, 3, 10), date(2026, 3, 20), self.next_stay.pk)],
+        )
+        self.assertEqual(first['free'], [{'start': date(2026, 3, 20), 'end': date(2026, 3, 25)}])
+        self.assertEqual(second['busy'], [])
+        self.assertEqual(second['free'], [{'start': date(2026, 3, 7), 'end': date(2026, 3, 25)}])
+
+        # A stay checking out on the first day is not busy
+        only, = availability_calendar(units.filter(pk=self.units[0].pk), date(2026, 3, 20), date(2026, 3, 21))
+        self.assertEqual(only['busy'], [])
+
+    def test_calendar_range_limit(self):
+        self.assertTrue(calendar_range_ok(date(2026, 1, 1), date(2027, 1, 2)))
+        self.assertFalse(calendar_range_ok(date(2026, 1, 1), date(2027, 1, 3)))
+        self.assertFalse(calendar_range_ok(date(2026, 1, 1), date(2026, 1, 1)))
+
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+        url = reverse('reservation_availability')
+        unit = str(self.units[0].pk)
+        self.assertEqual(self.client.get(url, {'start': '2026-01-01', 'end': '2027-01-03', 'unit': unit}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': '2026-01-01', 'end': '2027-01-02', 'unit': unit}).status_code, 200)
+
+    def test_update_conflict_returns_error(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+
+        def update(checkin, checkout):
+            return self.client.post(reverse('reservation_update', args=[self.next_stay.pk]), {
+                'assignment': self.assignments[0].pk, 'housing_user': self.users[1].pk,
+                'intended_checkin_date': checkin, 'intended_checkout_date': checkout,
+                'occupancy_status': 'Reserved',
+            })
+
+        response = update('2026-03-08', '2026-03-20')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Unit is already reserved from 03/05/2026 to 03/10/2026')
+        self.assertEqual(Reservation.objects.get(pk=self.next_stay.pk).intended_checkin_date, date(2026, 3, 12))
+        # Back to back with the earlier stay, and overlapping only itself, is fine
+        self.assertEqual(update('2026-03-10', '2026-03-18').status_code, 200)
+        self.assertEqual(Reservation.objects.get(pk=self.next_stay.pk).intended_checkin_date, date(2026, 3, 10))
+
+
+class MatchingTests(HousingFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.target = UnitAllocation.objects.create(
+            allocation_type='UUA', uua_number='UUA-2', allocation_status='Active',
+            company_group=cls.group, company=cls.company,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+            a_rooms_beds='2/2', b_rooms_beds='1/1', d_rooms_beds='1/1',
+        )
+
+        def unit(number, kind, zone, status='Vacant Ready', **fields):
+            return Unit.objects.create(
+                unit_number=number, occupancy_status=status, accomodation_type=kind, zone=zone, **fields,
+            )
+
+        cls.a_nz = [unit(f'A-NZ{i}', 'A (1 * 1)', 'NZ') for i in range(2)]
+        cls.a_cz = unit('A-CZ', 'A (1 * 1)', 'CZ')
+        cls.b_fz = unit('B-FZ', 'B (1 * 1)', 'FZ')
+        # Typed by current_type rather than accomodation_type
+        cls.b_current = unit('X-CZ', '', 'CZ', current_type='B')
+        cls.c_nz = unit('C-NZ', 'C (2 * 1)', 'NZ')
+        cls.a_occupied = unit('A-NZ9', 'A (1 * 1)', 'NZ', status='Occupied')
+        # Vacant Ready but still held by another open allocation
+        cls.a_held = unit('A-NZ8', 'A (1 * 1)', 'NZ')
+        UnitAssignment.objects.create(allocation=cls.allocation, unit=cls.a_held, accommodation_type='A')
+
+    def test_matches_type_and_capacity(self):
+        proposal = propose_units(self.target)
+
+        self.assertEqual(proposal['units']['A'], [unit.pk for unit in self.a_nz])
+        self.assertEqual(len(proposal['units']['B']), 1)
+        self.assertIn(proposal['units']['B'][0], {self.b_fz.pk, self.b_current.pk})
+        self.assertNotIn('C', proposal['units'])
+        self.assertEqual(proposal['units']['D'], [])
+        self.assertEqual(proposal['shortfall'], {'D': 1})
+        self.assertNotIn(self.a_occupied.pk, proposal['unit_ids'])
+        self.assertNotIn(self.a_held.pk, proposal['unit_ids'])
+
+    def test_existing_assignments_reduce_need(self):
+        UnitAssignment.objects.create(allocation=self.target, unit=self.a_nz[0], accommodation_type='A')
+        Unit.objects.filter(pk=self.a_nz[0].pk).update(occupancy_status='Assigned')
+
+        proposal = propose_units(self.target.pk)
+
+        self.assertEqual(len(proposal['units']['A']), 1)
+        self.assertIn(proposal['units']['A'][0], {self.a_nz[1].pk, self.a_cz.pk})
+
+    def test_closed_allocation_releases_units(self):
+        UnitAllocation.objects.filter(pk=self.allocation.pk).update(allocation_status='Closed')
+        Unit.objects.filter(pk__in=[u.pk for u in self.a_nz]).update(occupancy_status='Occupied')
+
+        self.assertEqual(sorted(propose_units(self.target)['units']['A']), sorted([self.a_cz.pk, self.a_held.pk]))
+
+    def test_match_view(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+        url = reverse('assignment_match')
+
+        response = self.client.get(url, {'allocation_id': self.target.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['units']['A'], [unit.pk for unit in self.a_nz])
+        self.assertEqual(self.client.get(url, {'allocation_id': 0}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'allocation_id': 'x'}).status_code, 400)
+
+    def test_capacity_counted_in_beds_everywhere(self):
+        UnitAllocation.objects.filter(pk=self.target.pk).update(a_rooms_beds='1/3')
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+
+        response = self.client.get(reverse('get_allocations_by_company'), {'company_id': self.company.pk})
+
+        counts = {row['uua_number']: row['a_assigned'] for row in response.json()}
+        self.assertEqual(counts['UUA-2'], '0/3')
+        self.assertEqual(len(propose_units(self.target.pk)['units']['A']), 3)
+
+
+def at(day, hour):
+    return datetime(2026, 3, day, hour, tzinfo=timezone.utc)
+
+
+class StayEventTests(HousingFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.reservations = create_reservations([
+            {
+                'assignment_id': assignment.pk,
+                'housing_user_id': user.pk,
+                'intended_checkin_date': date(2026, 3, 1),
+                'intended_checkout_date': date(2026, 3, 10),
+            }
+            for assignment, user in zip(cls.assignments, cls.users)
+        ])
+
+    def event(self, key, kind, reservation_id, when):
+        return {'key': key, 'type': kind, 'reservation_id': reservation_id, 'at': when}
+
+    def test_apply_check_in_then_out(self):
+        reservation = self.reservations[0]
+        outcomes = apply_stay_events([
+            self.event('out', 'checkout', reservation.pk, at(5, 10)),
+            self.event('in', 'checkin', reservation.pk, at(1, 14)),
+        ], device_id='tablet-1')
+
+        self.assertEqual(outcomes['in']['result'], 'applied')
+        self.assertEqual(outcomes['out']['result'], 'applied')
+        self.assertEqual(outcomes['in']['checkin_id'], outcomes['out']['checkin_id'])
+        record = CheckInCheckOut.objects.get(reservation=reservation)
+        self.assertEqual(record.actual_checkin_datetime, at(1, 14))
+        self.assertEqual(record.actual_checkout_datetime, at(5, 10))
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.occupancy_status, 'Checked Out')
+        self.assertEqual(Unit.objects.get(pk=reservation.unit_id).occupancy_status, 'Vacant Dirty')
+
+    def test_apply_rejects_duplicate_check_in(self):
+        reservation = self.reservations[0]
+        outcomes = apply_stay_events([
+            self.event('first', 'checkin', reservation.pk, at(1, 14)),
+            self.event('second', 'checkin', reservation.pk, at(1, 15)),
+        ])
+
+        self.assertEqual(outcomes['first']['result'], 'applied')
+        self.assertEqual(outcomes['second']['result'], 'rejected')
+        self.assertEqual(outcomes['second']['error'], 'Guest is already checked in')
+        self.assertEqual(CheckInCheckOut.objects.filter(reservation=reservation).count(), 1)
+
+    def test_apply_rejects_check_out_before_check_in(self):
+        reservation = self.reservations[0]
+        apply_stay_events([self.event('in', 'checkin', reservation.pk, at(3, 14))])
+
+        outcomes = apply_stay_events([self.event('out', 'checkout', reservation.pk, at(2, 10))])
+
+        self.assertEqual(outcomes['out']['result'], 'rejected')
+        self.assertEqual(outcomes['out']['error'], 'Check-out is before check-in')
+        self.assertIsNone(CheckInCheckOut.objects.get(reservation=reservation).actual_checkout_datetime)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.occupancy_status, 'Occupied')
+
+    def test_apply_unknown_reservation(self):
+        outcomes = apply_stay_events([self.event('lost', 'checkin', 0, at(1, 14))])
+
+        self.assertEqual(outcomes['lost']['result'], 'rejected')
+        self.assertEqual(outcomes['lost']['error'], UNKNOWN_RESERVATION)
+        self.assertIsNone(StaySyncEvent.objects.get(idempotency_key='lost').reservation_id)
+
+    def test_apply_replayed_keys_return_stored_outcome(self):
+        reservation = self.reservations[0]
+        batch = [self.event('in', 'checkin', reservation.pk, at(1, 14))]
+        first = apply_stay_events(batch)
+
+        with self.assertNumQueries(1):
+            replayed = apply_stay_events(batch)
+
+        self.assertTrue(replayed['in']['duplicate'])
+        self.assertEqual(replayed['in']['checkin_id'], first['in']['checkin_id'])
+        self.assertEqual(CheckInCheckOut.objects.filter(reservation=reservation).count(), 1)
+
+    def test_bulk_results_in_input_order(self):
+        first, second, third = self.reservations
+        items = [
+            {'type': 'checkin', 'reservation_id': first.pk, 'at': at(1, 18)},
+            {'type': 'checkin', 'reservation_id': 0, 'at': at(1, 12)},
+            {'type': 'checkin', 'reservation_id': second.pk, 'at': at(1, 9)},
+            {'type': 'checkin', 'reservation_id': first.pk, 'at': at(1, 10)},
+            {'type': 'checkin', 'reservation_id': third.pk, 'at': at(1, 11)},
+        ]
+
+        results = bulk_check_in_out(items)
+
+        self.assertEqual(
+            [(r['reservation'], r['result'], r['error']) for r in results],
+            [
+                (first.pk, 'rejected', 'Guest is already checked in'),
+                (0, 'rejected', UNKNOWN_RESERVATION),
+                (second.pk, 'applied', ''),
+                (first.pk, 'applied', ''),
+                (third.pk, 'applied', ''),
+            ],
+        )
+        self.assertEqual(
+            CheckInCheckOut.objects.get(reservation=first).actual_checkin_datetime, at(1, 10),
+        )
+
+    def test_bulk_rejects_check_out_before_check_in(self):
+        reservation = self.reservations[0]
+        bulk_check_in_out([{'type': 'checkin', 'reservation_id': reservation.pk, 'at': at(3, 14)}])
+
+        results = bulk_check_in_out([
+            {'type': 'checkout', 'reservation_id': reservation.pk, 'at': at(2, 10)},
+            {'type': 'checkout', 'reservation_id': self.reservations[1].pk, 'at': at(2, 10)},
+        ])
+
+        self.assertEqual(results[0]['result'], 'rejected')
+        self.assertEqual(results[0]['error'], 'Check-out is before check-in')
+        self.assertEqual(results[1]['result'], 'applied')
+        self.assertEqual(CheckInCheckOut.objects.filter(reservation=reservation).count(), 1)
+
+
+class CloseAllocationsTests(HousingFixtureMixin, TestCase):
+    def test_units_on_another_open_allocation_stay_assigned(self):
+        ended = UnitAllocation.objects.create(
+            allocation_type='UUA', uua_number='UUA-0', allocation_status='Active',
+            company_group=self.group, company=self.company,
+            start_date=date(2025, 1, 1), end_date=date(2025, 12, 31), a_rooms_beds='2/2',
+        )
+        for unit in self.units[:2]:
+            UnitAssignment.objects.create(allocation=ended, unit=unit, accommodation_type='A')
+        spare = Unit.objects.create(unit_number='U9', occupancy_status='Assigned', accomodation_type='A (1 * 1)')
+        UnitAssignment.objects.create(allocation=ended, unit=spare, accommodation_type='A')
+
+        summary = sweep_reservation_lifecycle(today=date(2026, 2, 1))
+
+        self.assertEqual(summary['allocations_closed'], 1)
+        self.assertEqual(summary['units_released'], 1)
+        ended.refresh_from_db()
+        self.assertEqual(ended.allocation_status, 'Closed')
+        spare.refresh_from_db()
+        self.assertEqual(spare.occupancy_status, 'Vacant Ready')
+        self.assertEqual(
+            set(Unit.objects.filter(pk__in=[u.pk for u in self.units]).values_list('occupancy_status', flat=True)),
+            {'Assigned'},
+        )
+
+
+class BillingTests(HousingFixtureMixin, TestCase):
+    period = (date(2026, 3, 1), date(2026, 3, 31))
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.reservations = create_reservations([
+            {
+                'assignment_id': assignment.pk,
+                'housing_user_id': user.pk,
+                'intended_checkin_date': date(2026, 2, 1),
+                'intended_checkout_date': date(2026, 5, 1),
+                'occupancy_status': 'Occupied',
+            }
+            for assignment, user in zip(cls.assignments, cls.users)
+        ])
+
+    def stay(self, checkin, checkout=None, reservation=0):
+        CheckInCheckOut.objects.create(
+            reservation=self.reservations[reservation],
+            actual_checkin_datetime=checkin,
+            actual_checkout_datetime=checkout,
+        )
+
+    def nights(self):
+        return occupied_bed_nights(*self.period).get((self.allocation.pk, 'A'), 0)
+
+    def test_overlap_days_includes_both_ends(self):
+        self.assertEqual(_overlap_days(date(2026, 1, 1), date(2026, 12, 31), *self.period), 31)
+        self.assertEqual(_overlap_days(date(2026, 3, 31), date(2026, 4, 30), *self.period), 1)
+        self.assertEqual(_overlap_days(date(2026, 2, 1), date(2026, 3, 1), *self.period), 1)
+        self.assertEqual(_overlap_days(date(2026, 3, 10), date(2026, 3, 12), *self.period), 3)
+        self.assertEqual(_overlap_days(date(2026, 4, 1), date(2026, 4, 30), *self.period), 0)
+        self.assertEqual(_overlap_days(date(2026, 1, 1), date(2026, 2, 28), *self.period), 0)
+
+    def test_stay_inside_period(self):
+        self.stay(datetime(2026, 3, 10, 14, tzinfo=timezone.utc), datetime(2026, 3, 15, 9, tzinfo=timezone.utc))
+        self.assertEqual(self.nights(), 5)
+
+    def test_open_stay_runs_through_period_end(self):
+        self.stay(datetime(2026, 3, 30, 14, tzinfo=timezone.utc))
+        self.assertEqual(self.nights(), 2)
+
+    def test_stay_crossing_both_edges(self):
+        self.stay(datetime(2026, 2, 20, 14, tzinfo=timezone.utc), datetime(2026, 4, 5, 9, tzinfo=timezone.utc))
+        self.assertEqual(self.nights(), 31)
+
+    def test_same_day_check_out_is_no_night(self):
+        self.stay(datetime(2026, 3, 10, 8, tzinfo=timezone.utc), datetime(2026, 3, 10, 20, tzinfo=timezone.utc))
+        self.assertEqual(self.nights(), 0)
+
+    def test_stays_outside_period_ignored(self):
+        self.stay(datetime(2026, 2, 1, 14, tzinfo=timezone.utc), datetime(2026, 3, 1, 9, tzinfo=timezone.utc))
+        self.stay(datetime(2026, 4, 1, 14, tzinfo=timezone.utc), reservation=1)
+        self.stay(None, datetime(2026, 3, 5, 9, tzinfo=timezone.utc), reservation=2)
+        self.assertEqual(self.nights(), 0)
+
+    def test_stays_summed_per_allocation(self):
+        self.stay(datetime(2026, 3, 30, 14, tzinfo=timezone.utc))
+        self.stay(datetime(2026, 3, 1, 14, tzinfo=timezone.utc), datetime(2026, 3, 3, 9, tzinfo=timezone.utc), 1)
+        self.assertEqual(self.nights(), 4)
+
+    def test_revised_allocation_billed_once(self):
+        UnitAllocation.objects.filter(pk=self.allocation.pk).update(allocation_status='Revised')
+        self.stay(datetime(2026, 3, 30, 14, tzinfo=timezone.utc))
+
+        run = run_billing(*self.period)
+
+        line, = run.lines.all()
+        self.assertEqual(line.allocation_id, self.allocation.pk)
+        self.assertEqual(line.allocated_bed_nights, 3 * 31)
+        self.assertEqual(line.occupied_bed_nights, 2)
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True, QUERY_BUDGET_RAISE=True)
+class QueryBudgetTests(HousingFixtureMixin, TestCase):
+    def test_allocations_by_company_within_budget(self):
+        for i in range(5):
+            UnitAllocation.objects.create(
+                allocation_type='UUA', uua_number=f'UUA-B{i}', allocation_status='Active',
+                company_group=self.group, company=self.company,
+                start_date=date(2026, 1, 1), end_date=date(2026, 12, 31), a_rooms_beds='2/2', b_rooms_beds='1/1',
+            )
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+
+        response = self.client.get(reverse('get_allocations_by_company'), {'company_id': self.company.pk})
+
+        self.assertEqual(response.status_code, 200)
+        counts = {row['uua_number']: (row['a_assigned'], row['b_assigned']) for row in response.json()}
+        self.assertEqual(counts['UUA-1'], ('3/3', '0/0'))
+        self.assertEqual(counts['UUA-B0'], ('0/2', '0/1'))
@@ -44,6 +44,8 @@ urlpatterns = [
     # --- Assignment URLs ---
     path('assigning/', views.assignment_list_view, name='assigning'),
     path('assignment/create/', views.assignment_create_view, name='assignment_create'),
+    path('assignment/bulk-create/', views.assignment_bulk_create_view, name='assignment_bulk_create'),
+    path('assignment/match/', views.assignment_match_view, name='assignment_match'),
     path('assignment/update/<int:pk>/', views.assignment_update_view, name='assignment_update'),
     path('assignment/delete/', views.assignment_delete_view, name='assignment_delete'),
     path('assignment/export/', views.assignment_export_view, name='assignment_export'),
@@ -53,17 +55,27 @@ urlpatterns = [
     # --- Reservation URLs ---
     path('reservation/', views.reservation_list_view, name='reservation'),
     path('reservation/create/', views.reservation_create_view, name='reservation_create'),
+    path('reservation/bulk-create/', views.reservation_bulk_create_view, name='reservation_bulk_create'),
     path('reservation/update/<int:pk>/', views.reservation_update_view, name='reservation_update'),
     path('reservation/delete/', views.reservation_delete_view, name='reservation_delete'),
+    path('reservation/availability/', views.reservation_availability_view, name='reservation_availability'),
+    path('reservation/options/assignments/', views.reservation_assignment_options_view, name='reservation_assignment_options'),
+    path('reservation/options/units/', views.reservation_unit_options_view, name='reservation_unit_options'),
+    path('reservation/options/users/', views.reservation_user_options_view, name='reservation_user_options'),
     path('reservation/export/', views.reservation_export_view, name='reservation_export'),
 
     # --- Check-In/Check-Out URLs ---
     path('checkin_checkout/', views.checkin_checkout_list_view, name='checkin_checkout'),
     path('checkin/create/', views.checkin_checkout_create_view, name='checkin_checkout_create'),
+    path('checkin/bulk/', views.checkin_checkout_bulk_view, name='checkin_checkout_bulk'),
     path('checkin/update/<int:pk>/', views.checkin_checkout_update_view, name='checkin_checkout_update'),
     path('checkin/delete/', views.checkin_checkout_delete_view, name='checkin_checkout_delete'),
     path('checkin/export/', views.checkin_checkout_export_view, name='checkin_checkout_export'),
 
+    # --- Occupancy Report URLs ---
+    path('reports/occupancy/', views.occupancy_report_view, name='occupancy_report'),
+    path('reports/occupancy/export/', views.occupancy_report_export_view, name='occupancy_report_export'),
+
     # --- Generic Tab URL (keep last)
     path('<str:tab_name>/', views.housing_tab_view, name="housing_tab"),
     
@@ -3,22 +3,35 @@ import json
 from django.shortcuts import render, redirect, get_object_or_404
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.http import JsonResponse, Http404, HttpResponseBadRequest, HttpResponse
-from django.db import transaction, connection
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, Min, Q, Subquery
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.db import IntegrityError
+from utils.db import read_replica, write_transaction
 from utils.excel_exporter import export_to_excel
 from django.contrib import messages
 from django_countries import countries
 from datetime import datetime
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 import logging
 
 
 # NOTE: Ensure these imports are correct based on your project structure
 from Olivia.constants import HOUSING_TABS
 from Housing.models import Unit, CompanyGroup, UserCompany, HousingUser, UnitAllocation, UnitAssignment, Reservation, CheckInCheckOut
+from Housing.services import (
+    ROOM_TYPES, AssignmentError, ReservationError, apply_stay_status, assign_units, assignments_for_reservation,
+    bulk_check_in_out, create_reservations, fill_reservation_snapshot, parse_beds,
+)
+from Housing.matching import propose_units
+from Housing.reporting import REPORT_GROUPINGS, occupancy_report
+from Housing.availability import (
+    BLOCKING_STATUSES, availability_calendar, calendar_range_ok, conflict_message, find_conflict, unit_on_hold,
+    units_for_calendar,
+)
 
 
 # =======================================================
@@ -39,13 +52,6 @@ def _calculate_unit_location(request_data):
     unit_location = '-'.join(filter(None, location_parts))
     return unit_location
 
-def _get_auditing_user(request):
-    """Helper to safely get the username for auditing."""
-    if request.user.is_authenticated:
-        return request.user.username
-    # If the user is not authenticated, return a placeholder (should be handled by login_required)
-    return "SYSTEM/ANONYMOUS" 
-
 # =======================================================
 # GENERAL VIEWS
 # =======================================================
@@ -81,21 +87,12 @@ def housing_tab_view(request, tab_name=None, **kwargs):
 # =======================================================
 
 def company_list_view(request):
-    print("\n--- DEBUG: company_list_view EXECUTING ---")
-
-    try:
-        connection.close()
-        connection.ensure_connection()
-    except Exception as db_e:
-        print(f"DEBUG: DB Connection Error (safe to ignore if minor): {db_e}")
-
     # Eager load the related company_group to prevent N+1 queries in the template
     all_groups = CompanyGroup.objects.all()
 
     try:
         # 1️⃣ Query all companies directly
         all_companies = UserCompany.objects.select_related("company_group").order_by("-id")
-        print(f"DEBUG: Found {all_companies.count()} companies in DB")
 
         # 2️⃣ Paginate (optional)
         paginator = Paginator(all_companies, 15)
@@ -105,11 +102,7 @@ def company_list_view(request):
         except (PageNotAnInteger, EmptyPage):
             company_page = paginator.page(1)
 
-        # 3️⃣ Log first company for sanity
-        if company_page.object_list: # Check if list is not empty
-            print(f"DEBUG: First company on this page: {company_page.object_list[0].company_name}")
-
-        # 4️⃣ Send context
+        # 3️⃣ Send context
         context = {
             "companies": company_page.object_list,
             "company_page": company_page,
@@ -201,7 +194,6 @@ def create_unit(request):
             
         try:
             unit_location = _calculate_unit_location(request.POST)
-            auditing_user = _get_auditing_user(request) # Get the username
 
             # Create and Save the Unit
             unit = Unit(
@@ -221,8 +213,6 @@ def create_unit(request):
                 actual_type=request.POST.get("actual_type"),
                 current_type=request.POST.get("current_type"),
                 room_physical_status=request.POST.get("room_physical_status"),
-                # --- AUDITING FIELD ADDED ---
-                created_by=auditing_user, 
             )
             unit.save()
             
@@ -265,7 +255,6 @@ def update_unit(request, unit_id):
             
         try:
             unit_location = _calculate_unit_location(request.POST)
-            auditing_user = _get_auditing_user(request) # Get the username
 
             # Update the fields
             unit.unit_number = request.POST.get("unit_number")
@@ -285,9 +274,6 @@ def update_unit(request, unit_id):
             unit.current_type = request.POST.get("current_type")
             unit.room_physical_status = request.POST.get("room_physical_status")
             
-            # --- AUDITING FIELD ADDED ---
-            unit.modified_by = auditing_user
-            
             unit.save() 
             return JsonResponse({"success": True, "action": "updated"})
         except Exception as e:
@@ -341,7 +327,6 @@ def import_units(request):
         return JsonResponse({"success": False, "error": "Authentication required for import."}, status=403)
 
     excel_file = request.FILES['excel_file']
-    auditing_user = _get_auditing_user(request) # Get the username
     
     try:
         df = pd.read_excel(excel_file)
@@ -432,16 +417,11 @@ def import_units(request):
                         has_changed = True
                 
                 if has_changed:
-                    # --- AUDITING FIELD: Set modified_by for update (Correct) ---
-                    existing_unit.modified_by = auditing_user
                     units_to_update.append(existing_unit)
                 
             else:
                 # Create logic (Unit number is new)
                 try:
-                    # --- AUDITING FIELD: Set created_by for creation (Correct) ---
-                    data['created_by'] = auditing_user
-                    
                     # Attempt to create the Unit object to trigger model validation
                     new_unit = Unit(**data)
                     units_to_create.append(new_unit)
@@ -453,19 +433,15 @@ def import_units(request):
         created_count = 0
         updated_count = 0
         
-        with transaction.atomic():
+        with write_transaction():
             # A. Bulk Create New Units
             if units_to_create:
                 created_objects = Unit.objects.bulk_create(units_to_create)
                 created_count = len(created_objects)
 
-            # B. Bulk Update Existing Units
+            # B. Bulk Update Existing Units (audit fields are stamped by the manager)
             if units_to_update:
-                Unit.objects.bulk_update(
-                    units_to_update, 
-                    # Note: We must include all fields we manually updated, including the auditing fields
-                    fields=update_fields + ['modified_by', 'modified_date'] 
-                )
+                Unit.objects.bulk_update(units_to_update, fields=update_fields)
                 updated_count = len(units_to_update)
 
         total_processed = created_count + updated_count
@@ -484,6 +460,7 @@ def import_units(request):
 # EXPORT VIEW (Unit)
 # =======================================================
 
+@read_replica
 def export_units(request):
     """
     Fetches all Unit records, extracts the required fields, and exports them 
@@ -546,8 +523,6 @@ def create_company_api(request):
         # 🔒 Authentication Check: Ensure user is logged in
         if not request.user.is_authenticated:
              return JsonResponse({"error": "Authentication required."}, status=403)
-             
-        auditing_user = _get_auditing_user(request) # Get username
 
         try:
             data = json.loads(request.body)
@@ -570,8 +545,6 @@ def create_company_api(request):
                 email_address=data.get('email_address'),
                 mobile=data.get('mobile'),
                 phone=data.get('phone'),
-                created_by=request.user,
-                modified_by=request.user
             )
             
             # --- Prepare Response Data ---
@@ -608,17 +581,12 @@ def create_company_group_api(request):
         try:
             data = json.loads(request.body)
             company_name = data.get('company_name', '').strip()
-            
-            # Assuming CompanyGroup is simple and doesn't require created_by/modified_by logic in the view
-            # If it did, you would add the auditing_user assignment here (e.g., new_group.created_by = auditing_user)
 
             if not company_name:
                 return JsonResponse({'error': 'Name required.'}, status=400)
 
             new_group = CompanyGroup.objects.create(
                 company_name=company_name,
-                created_by=request.user,
-                modified_by=request.user
             )
 
             response_data = {'id': new_group.id, 'company_name': new_group.company_name}
@@ -670,7 +638,6 @@ def company_update_view(request, pk):
             return JsonResponse(response_data)
         
         # Handle PUT request - update company
-        auditing_user = _get_auditing_user(request) # Get username
         data = json.loads(request.body)
 
         # 1. Update simple fields
@@ -692,9 +659,6 @@ def company_update_view(request, pk):
         else:
             company.company_group = None
             
-        # ✅ AUDITING FIX: Set modified_by on update
-        company.modified_by = auditing_user
-            
         company.save()
         
         # 3. Prepare response data for the frontend table update
@@ -754,6 +718,7 @@ def company_delete_view(request):
 # COMPANY EXPORT VIEW
 # =======================================================
 
+@read_replica
 def export_companies(request):
     """
     Fetches all UserCompany records, extracts the required fields, and exports them 
@@ -1094,6 +1059,7 @@ def save_user(request):
 # EXPORT VIEW (HousingUser)
 # =======================================================
 
+@read_replica
 def export_users(request):
     """
     Export HousingUser records to Excel.
@@ -1222,8 +1188,6 @@ def allocation_create_view(request):
             allocation_status=allocation_status,
             security_deposit=security_deposit,
             advance_payment=advance_payment,
-            created_by=request.user,
-            modified_by=request.user,
         )
         allocation.save()
         
@@ -1275,8 +1239,6 @@ def allocation_update_view(request, pk):
             allocation.allocation_status = request.POST.get('allocation_status', 'Active')
             allocation.security_deposit = request.POST.get('security_deposit') or None
             allocation.advance_payment = request.POST.get('advance_payment') or None
-            allocation.modified_by = request.user
-            
             allocation.save()
             
             messages.success(request, f'Allocation {allocation.uua_number} updated successfully!')
@@ -1304,6 +1266,7 @@ def allocation_delete_view(request):
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 
+@read_replica
 def allocation_export_view(request):
     """Export allocations to Excel"""
     try:
@@ -1437,17 +1400,7 @@ def assignment_create_view(request):
         allocation = UnitAllocation.objects.get(id=allocation_id)
         
         # Check if the accommodation type is available in the allocation
-        available_beds = 0
-        field_name = f"{accommodation_type.lower()}_rooms_beds"
-        
-        if hasattr(allocation, field_name):
-            rooms_beds_value = getattr(allocation, field_name)
-            if rooms_beds_value:
-                # Parse "2/4" format to get number of beds (second number)
-                try:
-                    available_beds = int(rooms_beds_value.split('/')[1])
-                except:
-                    available_beds = 0
+        available_beds = parse_beds(getattr(allocation, f"{accommodation_type.lower()}_rooms_beds", None))
         
         if available_beds == 0:
             return JsonResponse({
@@ -1472,8 +1425,6 @@ def assignment_create_view(request):
             allocation_id=allocation_id,
             unit_id=unit_id,
             accommodation_type=accommodation_type,
-            created_by=request.user,
-            modified_by=request.user,
         )
         assignment.save()
         
@@ -1486,20 +1437,9 @@ def assignment_create_view(request):
             pass
         
         # Check if all room types are fully assigned
-        def get_bed_count(alloc, room_type):
-            field = f"{room_type.lower()}_rooms_beds"
-            if hasattr(alloc, field):
-                value = getattr(alloc, field)
-                if value:
-                    try:
-                        return int(value.split('/')[1])  # Get beds (second number)
-                    except:
-                        return 0
-            return 0
-        
         all_assigned = True
         for room_type in ['A', 'B', 'C', 'D']:
-            required = get_bed_count(allocation, room_type)
+            required = parse_beds(getattr(allocation, f"{room_type.lower()}_rooms_beds"))
             if required > 0:
                 assigned = UnitAssignment.objects.filter(
                     allocation_id=allocation_id,
@@ -1525,6 +1465,66 @@ def assignment_create_view(request):
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 
+@require_POST
+def assignment_bulk_create_view(request):
+    """
+    Assign many units to an allocation in one request.
+
+    JSON body: {"allocation_id": 1, "unit_ids": [1, 2, ...]}
+           or  {"allocation_id": 1, "filters": {"zone": "NZ", "building": "Bld1", ...}}
+    plus an optional "accommodation_type" (A/B/C/D, defaults to each unit's current type).
+    With filters, Vacant Ready units fill the remaining capacity per type.
+    """
+    if request.content_type != 'application/json':
+        return JsonResponse({'success': False, 'error': 'Invalid content type.'}, status=400)
+
+    try:
+        data = json.loads(request.body)
+        allocation_id = data.get('allocation_id')
+        if not allocation_id:
+            return JsonResponse({'success': False, 'error': 'Allocation is required'}, status=400)
+        unit_ids = data.get('unit_ids')
+        if unit_ids is None and not data.get('filters'):
+            return JsonResponse({'success': False, 'error': 'Provide unit_ids or filters'}, status=400)
+
+        result = assign_units(
+            allocation_id,
+            unit_ids=[int(unit_id) for unit_id in unit_ids] if unit_ids is not None else None,
+            filters=data.get('filters'),
+            accommodation_type=data.get('accommodation_type') or None,
+        )
+        return JsonResponse({
+            'success': True,
+            'message': f"{result['created']} unit(s) assigned successfully",
+            **result,
+        })
+
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'Invalid JSON format.'}, status=400)
+    except (TypeError, ValueError):
+        return JsonResponse({'success': False, 'error': 'unit_ids must be a list of IDs'}, status=400)
+    except UnitAllocation.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Allocation not found'}, status=400)
+    except AssignmentError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+
+@require_http_methods(["GET"])
+def assignment_match_view(request):
+    """
+    Propose vacant units for an allocation's remaining beds, kept together by
+    location. Post the returned unit_ids to assignment/bulk-create/ to commit.
+    """
+    allocation_id = request.GET.get('allocation_id')
+    if not allocation_id:
+        return JsonResponse({'success': False, 'error': 'Allocation is required'}, status=400)
+    try:
+        proposal = propose_units(int(allocation_id))
+    except (ValueError, UnitAllocation.DoesNotExist):
+        return JsonResponse({'success': False, 'error': 'Allocation not found'}, status=400)
+    return JsonResponse({'success': True, **proposal})
+
+
 @require_http_methods(["GET", "POST"])
 def assignment_update_view(request, pk):
     """Update an existing unit assignment"""
@@ -1566,8 +1566,6 @@ def assignment_update_view(request, pk):
             assignment.allocation_id = allocation_id
             assignment.unit_id = unit_id
             assignment.accommodation_type = accommodation_type
-            assignment.modified_by = request.user
-            
             assignment.save()
             
             messages.success(request, 'Unit assignment updated successfully!')
@@ -1606,6 +1604,7 @@ def assignment_delete_view(request):
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 
+@read_replica
 def assignment_export_view(request):
     """Export assignments to Excel"""
     try:
@@ -1681,30 +1680,26 @@ def get_allocations_by_company(request):
         return JsonResponse({'error': 'No company_id provided'}, status=400)
     
     try:
+        # Existing assignments per room type, counted in the same query
         allocations = UnitAllocation.objects.filter(
             company_id=company_id,
             allocation_status='Active'
-        ).select_related('company_group', 'company').order_by('-created_date')
+        ).annotate(**{
+            f'{room_type.lower()}_assigned_count': Count(
+                'unit_assignments', filter=Q(unit_assignments__accommodation_type=room_type)
+            )
+            for room_type in ROOM_TYPES
+        }).select_related('company_group', 'company').order_by('-created_date')
         
+        def get_available_count(alloc, room_type):
+            # Assigned units against the bed capacity that assignment enforces
+            total = parse_beds(getattr(alloc, f"{room_type.lower()}_rooms_beds"))
+            if not total:
+                return "0/0"
+            return f"{getattr(alloc, f'{room_type.lower()}_assigned_count')}/{total}"
+
         result = []
         for allocation in allocations:
-            # Count existing assignments for each type
-            def get_available_count(alloc, room_type):
-                field = f"{room_type.lower()}_rooms_beds"
-                if hasattr(alloc, field):
-                    value = getattr(alloc, field)
-                    if value:
-                        try:
-                            total = int(value.split('/')[0])
-                            assigned = UnitAssignment.objects.filter(
-                                allocation_id=alloc.id,
-                                accommodation_type=room_type
-                            ).count()
-                            return f"{assigned}/{total}"
-                        except:
-                            return "0/0"
-                return "0/0"
-            
             result.append({
                 'id': allocation.id,
                 'allocation_type': allocation.allocation_type,
@@ -1778,10 +1773,10 @@ def get_allocation_by_company_group(request):
 # =======================================================
 
 def reservation_list_view(request):
-    """List all reservations with pagination"""
+    """List reservations, 25 per page; modal dropdowns load from the options endpoints below"""
     query = request.GET.get('q', '')
     reservations = Reservation.objects.select_related(
-        'assignment', 'housing_user', 'assignment__allocation', 'assignment__unit'
+        'housing_user', 'assignment__unit', 'assignment__allocation__company'
     ).all()
     
     if query:
@@ -1802,137 +1797,206 @@ def reservation_list_view(request):
     except EmptyPage:
         reservations_page = paginator.page(paginator.num_pages)
     
-    # Get data for the modal
-    # Get assignments where:
-    # 1. Unit has Assigned occupancy status
-    # 2. Unit does NOT have any active reservations with Reserved or Hold status
-    reserved_or_hold_unit_ids = Reservation.objects.filter(
-        occupancy_status__in=['Reserved', 'Hold']
-    ).values_list('unit_id', flat=True)
-    
-    assignments = UnitAssignment.objects.select_related(
-        'allocation', 'unit', 'allocation__company_group', 'allocation__company'
-    ).filter(
-        unit__occupancy_status='Assigned'
-    ).exclude(
-        unit_id__in=reserved_or_hold_unit_ids
-    )
-    
-    # Get unique housing users based on username (first occurrence of each unique username)
-    seen_usernames = set()
-    housing_users = []
-    for user in HousingUser.objects.select_related('group', 'company').order_by('username', 'id'):
-        if user.username not in seen_usernames:
-            seen_usernames.add(user.username)
-            housing_users.append(user)
-    
-    assigned_units = Unit.objects.filter(occupancy_status='Assigned').exclude(id__in=reserved_or_hold_unit_ids)
-    
     context = {
         'tabs': HOUSING_TABS,
         'active_tab': 'reservation',
         'reservations': reservations_page,
-        'assignments': assignments,
-        'housing_users': housing_users,
-        'assigned_units': assigned_units,
         'query': query,
     }
     
     return render(request, 'housing/reservation.html', context)
 
 
+# --- Reservation modal options (searchable, paginated) ---
+
+RESERVATION_OPTIONS_PAGE_SIZE = 50
+
+
+def _options_page(request, queryset, row, base):
+    """
+    One page of dropdown options. ``?id=`` looks the row up in ``base``, so it
+    is returned even when no longer eligible (the value of the reservation
+    being edited).
+    """
+    if request.GET.get('id'):
+        try:
+            rows = list(base.filter(pk=int(request.GET['id'])))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid id'}, status=400)
+        return JsonResponse({'results': [row(obj) for obj in rows], 'has_more': False})
+
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    offset = (page - 1) * RESERVATION_OPTIONS_PAGE_SIZE
+    rows = list(queryset[offset:offset + RESERVATION_OPTIONS_PAGE_SIZE + 1])
+    return JsonResponse({
+        'results': [row(obj) for obj in rows[:RESERVATION_OPTIONS_PAGE_SIZE]],
+        'has_more': len(rows) > RESERVATION_OPTIONS_PAGE_SIZE,
+    })
+
+
+@require_http_methods(["GET"])
+def reservation_assignment_options_view(request):
+    """Assignments whose unit is Assigned and not already reserved or on hold"""
+    query = request.GET.get('q', '').strip()
+    base = UnitAssignment.objects.select_related('unit', 'allocation__company', 'allocation__company_group')
+    assignments = base.filter(unit__occupancy_status='Assigned').filter(~unit_on_hold('unit_id'))
+    if query:
+        assignments = assignments.filter(
+            Q(unit__unit_number__icontains=query) | Q(allocation__uua_number__icontains=query)
+        )
+    assignments = assignments.order_by('unit__unit_number', 'id')
+
+    def row(a):
+        unit, allocation = a.unit, a.allocation
+        return {
+            'id': a.id,
+            'unit': unit.unit_number,
+            'unit_id': unit.id,
+            'uua': allocation.uua_number,
+            'company': allocation.company.company_name if allocation.company else '',
+            'company_id': allocation.company_id,
+            'group': allocation.company_group.company_name if allocation.company_group else '',
+            'group_id': allocation.company_group_id,
+            'allocation_type': allocation.allocation_type,
+            'start_date': allocation.start_date.strftime('%m/%d/%Y') if allocation.start_date else '',
+            'end_date': allocation.end_date.strftime('%m/%d/%Y') if allocation.end_date else '',
+            'accom_type': unit.accomodation_type or '',
+            'location_code': f"{unit.zone}-{unit.area}-{unit.block}-{unit.building}-{unit.floor}",
+        }
+
+    return _options_page(request, assignments, row, base)
+
+
+@require_http_methods(["GET"])
+def reservation_unit_options_view(request):
+    """Units that are Assigned and not already reserved or on hold"""
+    query = request.GET.get('q', '').strip()
+    units = Unit.objects.filter(occupancy_status='Assigned').filter(~unit_on_hold('pk'))
+    if query:
+        units = units.filter(unit_number__icontains=query)
+    units = units.only('id', 'unit_number', 'accomodation_type').order_by('unit_number', 'id')
+
+    def row(unit):
+        return {'id': unit.id, 'label': f"{unit.unit_number} - {unit.accomodation_type}"}
+
+    return _options_page(request, units, row, Unit.objects.all())
+
+
+@require_http_methods(["GET"])
+def reservation_user_options_view(request):
+    """Housing users, one per username (the lowest id), de-duplicated in SQL"""
+    query = request.GET.get('q', '').strip()
+    first_per_username = HousingUser.objects.values('username').annotate(first_id=Min('id')).values('first_id')
+    base = HousingUser.objects.select_related('group', 'company')
+    users = base.filter(id__in=Subquery(first_per_username))
+    if query:
+        users = users.filter(username__icontains=query)
+    users = users.order_by('username', 'id')
+
+    def row(user):
+        return {
+            'id': user.id,
+            'username': user.username,
+            'neomid': user.neom_id or '',
+            'govid': user.government_id or '',
+            'idtype': user.id_type or '',
+            'dob': user.dob.strftime('%m/%d/%Y') if user.dob else '',
+            'mobile': user.mobile or '',
+            'email': user.email or '',
+            'nationality': user.nationality.name if user.nationality else '',
+            'religion': user.religion or '',
+            'company': user.company.company_name if user.company else '',
+            'group': user.group.company_name if user.group else '',
+        }
+
+    return _options_page(request, users, row, base)
+
+
 @require_http_methods(["POST"])
 def reservation_create_view(request):
-    """Create a new reservation"""
+    """Create a new reservation; assignment and housing-user details are filled server-side"""
     try:
-        from datetime import datetime
-        
         assignment_id = request.POST.get('assignment')
         housing_user_id = request.POST.get('housing_user')
         intended_checkin_date_str = request.POST.get('intended_checkin_date')
         intended_checkout_date_str = request.POST.get('intended_checkout_date')
-        occupancy_status = request.POST.get('occupancy_status', 'Reserved')
-        remarks = request.POST.get('remarks', '')
         
-        # Convert date strings to date objects
-        intended_checkin_date = datetime.strptime(intended_checkin_date_str, '%Y-%m-%d').date() if intended_checkin_date_str else None
-        intended_checkout_date = datetime.strptime(intended_checkout_date_str, '%Y-%m-%d').date() if intended_checkout_date_str else None
-        
-        # Get additional fields from form
-        allocation_type = request.POST.get('allocation_type', '')
-        uua_number = request.POST.get('uua_number', '')
-        company_group_id = request.POST.get('company_group')
-        company_id = request.POST.get('company')
-        start_date_str = request.POST.get('start_date')
-        end_date_str = request.POST.get('end_date')
-        accomodation_type = request.POST.get('accomodation_type', '')
-        unit_id = request.POST.get('unit')
-        unit_location_code = request.POST.get('unit_location_code', '')
-        
-        # Convert start and end dates
-        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date() if start_date_str else None
-        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date() if end_date_str else None
-        
-        # Get housing user fields
-        govt_id_number = request.POST.get('govt_id_number', '')
-        id_type = request.POST.get('id_type', '')
-        neom_id = request.POST.get('neom_id', '')
-        dob_str = request.POST.get('dob')
-        mobile_number = request.POST.get('mobile_number', '')
-        email = request.POST.get('email', '')
-        nationality = request.POST.get('nationality', '')
-        religion = request.POST.get('religion', '')
-        
-        # Convert dob
-        dob = datetime.strptime(dob_str, '%Y-%m-%d').date() if dob_str else None
-        # Convert dob
-        dob = datetime.strptime(dob_str, '%Y-%m-%d').date() if dob_str else None
-        
-        # Create the reservation
-        reservation = Reservation(
-            assignment_id=assignment_id,
-            housing_user_id=housing_user_id,
-            intended_checkin_date=intended_checkin_date,
-            intended_checkout_date=intended_checkout_date,
-            occupancy_status=occupancy_status,
-            remarks=remarks,
-            allocation_type=allocation_type,
-            uua_number=uua_number,
-            company_group_id=company_group_id if company_group_id else None,
-            company_id=company_id if company_id else None,
-            start_date=start_date,
-            end_date=end_date,
-            accomodation_type=accomodation_type,
-            unit_id=unit_id if unit_id else None,
-            unit_location_code=unit_location_code,
-            govt_id_number=govt_id_number,
-            id_type=id_type,
-            neom_id=neom_id,
-            dob=dob,
-            mobile_number=mobile_number,
-            email=email,
-            nationality=nationality,
-            religion=religion,
-            created_by=request.user,
-            modified_by=request.user,
-        )
-        reservation.save()
-        
-        # Update unit occupancy status to match reservation status (Reserved or Hold)
-        if unit_id:
-            unit = Unit.objects.get(id=unit_id)
-            # Set unit status to Reserved or Hold based on reservation occupancy status
-            if occupancy_status in ['Reserved', 'Hold']:
-                unit.occupancy_status = occupancy_status
-                unit.save()
+        create_reservations([{
+            'assignment_id': int(assignment_id) if assignment_id else None,
+            'housing_user_id': int(housing_user_id) if housing_user_id else None,
+            'intended_checkin_date': datetime.strptime(intended_checkin_date_str, '%Y-%m-%d').date() if intended_checkin_date_str else None,
+            'intended_checkout_date': datetime.strptime(intended_checkout_date_str, '%Y-%m-%d').date() if intended_checkout_date_str else None,
+            'occupancy_status': request.POST.get('occupancy_status', 'Reserved'),
+            'remarks': request.POST.get('remarks', ''),
+        }])
         
         messages.success(request, 'Reservation created successfully!')
         return JsonResponse({'success': True, 'message': 'Reservation created successfully'})
         
+    except ReservationError as e:
+        return JsonResponse({'success': False, 'error': e.errors[0]}, status=400)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 
+@require_POST
+def reservation_bulk_create_view(request):
+    """
+    Create reservations for a company roster in one transaction.
+
+    JSON body: {"allocation_id": 1,                       (to pick free assignments)
+                "intended_checkin_date": "YYYY-MM-DD",    (defaults for every row)
+                "intended_checkout_date": "YYYY-MM-DD",
+                "occupancy_status": "Reserved", "remarks": "",
+                "reservations": [{"housing_user": 5, "assignment": 9 (optional),
+                                  "intended_checkin_date": ... (optional overrides)}, ...]}
+    Nothing is created if any row fails; the errors are listed per row.
+    """
+    if request.content_type != 'application/json':
+        return JsonResponse({'success': False, 'error': 'Invalid content type.'}, status=400)
+
+    try:
+        data = json.loads(request.body)
+        items = data.get('reservations')
+        if not isinstance(items, list) or not items:
+            return JsonResponse({'success': False, 'error': 'reservations must be a non-empty list'}, status=400)
+
+        def parse_date(value):
+            return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+        rows = []
+        for item in items:
+            merged = {**data, **item}
+            rows.append({
+                'assignment_id': int(item['assignment']) if item.get('assignment') else None,
+                'housing_user_id': int(item['housing_user']) if item.get('housing_user') else None,
+                'intended_checkin_date': parse_date(merged.get('intended_checkin_date')),
+                'intended_checkout_date': parse_date(merged.get('intended_checkout_date')),
+                'occupancy_status': merged.get('occupancy_status') or 'Reserved',
+                'remarks': merged.get('remarks') or '',
+            })
+        reservations = create_reservations(rows, allocation_id=data.get('allocation_id'))
+
+        return JsonResponse({
+            'success': True,
+            'message': f'{len(reservations)} reservation(s) created successfully',
+            'reservations': [
+                {'id': r.id, 'housing_user': r.housing_user_id, 'assignment': r.assignment_id, 'unit': r.unit_id}
+                for r in reservations
+            ],
+        })
+
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'Invalid JSON format.'}, status=400)
+    except (TypeError, ValueError, AttributeError) as e:
+        return JsonResponse({'success': False, 'error': f'Invalid reservation data: {e}'}, status=400)
+    except ReservationError as e:
+        return JsonResponse({'success': False, 'error': str(e), 'errors': {str(i + 1): m for i, m in e.errors.items()}}, status=400)
+
+
 @require_http_methods(["GET", "POST"])
 def reservation_update_view(request, pk):
     """Update an existing reservation"""
@@ -1976,8 +2040,9 @@ def reservation_update_view(request, pk):
         try:
             from datetime import datetime
             
-            reservation.assignment_id = request.POST.get('assignment')
-            reservation.housing_user_id = request.POST.get('housing_user')
+            assignment = assignments_for_reservation().get(pk=request.POST.get('assignment'))
+            housing_user = HousingUser.objects.get(pk=request.POST.get('housing_user'))
+            fill_reservation_snapshot(reservation, assignment, housing_user)
             
             # Convert date strings to date objects
             intended_checkin_date_str = request.POST.get('intended_checkin_date')
@@ -1985,46 +2050,23 @@ def reservation_update_view(request, pk):
             reservation.intended_checkin_date = datetime.strptime(intended_checkin_date_str, '%Y-%m-%d').date() if intended_checkin_date_str else None
             reservation.intended_checkout_date = datetime.strptime(intended_checkout_date_str, '%Y-%m-%d').date() if intended_checkout_date_str else None
             
-            # Update assignment fields
-            reservation.allocation_type = request.POST.get('allocation_type', '')
-            reservation.uua_number = request.POST.get('uua_number', '')
-            company_group_id = request.POST.get('company_group')
-            company_id = request.POST.get('company')
-            reservation.company_group_id = company_group_id if company_group_id else None
-            reservation.company_id = company_id if company_id else None
-            
-            start_date_str = request.POST.get('start_date')
-            end_date_str = request.POST.get('end_date')
-            reservation.start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date() if start_date_str else None
-            reservation.end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date() if end_date_str else None
-            
-            reservation.accomodation_type = request.POST.get('accomodation_type', '')
-            unit_id = request.POST.get('unit')
-            reservation.unit_id = unit_id if unit_id else None
-            reservation.unit_location_code = request.POST.get('unit_location_code', '')
-            
-            # Update housing user fields
-            reservation.govt_id_number = request.POST.get('govt_id_number', '')
-            reservation.id_type = request.POST.get('id_type', '')
-            reservation.neom_id = request.POST.get('neom_id', '')
-            dob_str = request.POST.get('dob')
-            reservation.dob = datetime.strptime(dob_str, '%Y-%m-%d').date() if dob_str else None
-            reservation.mobile_number = request.POST.get('mobile_number', '')
-            reservation.email = request.POST.get('email', '')
-            reservation.nationality = request.POST.get('nationality', '')
-            reservation.religion = request.POST.get('religion', '')
-            
             reservation.occupancy_status = request.POST.get('occupancy_status', 'Reserved')
             reservation.remarks = request.POST.get('remarks', '')
-            reservation.modified_by = request.user
-            
-            reservation.save()
-            
-            # Update unit occupancy status to match reservation status (Reserved or Hold)
-            if reservation.unit:
-                if reservation.occupancy_status in ['Reserved', 'Hold']:
-                    reservation.unit.occupancy_status = reservation.occupancy_status
-                    reservation.unit.save()
+            with transaction.atomic():
+                if reservation.occupancy_status in BLOCKING_STATUSES:
+                    conflict = find_conflict(
+                        reservation.unit_id, reservation.intended_checkin_date, reservation.intended_checkout_date,
+                        exclude_id=reservation.pk, lock=True,
+                    )
+                    if conflict:
+                        return JsonResponse({'success': False, 'error': conflict_message(conflict)}, status=400)
+                reservation.save()
+                
+                # Update unit occupancy status to match reservation status (Reserved or Hold)
+                if reservation.unit:
+                    if reservation.occupancy_status in ['Reserved', 'Hold']:
+                        reservation.unit.occupancy_status = reservation.occupancy_status
+                        reservation.unit.save()
             
             messages.success(request, 'Reservation updated successfully!')
             return JsonResponse({'success': True, 'message': 'Reservation updated successfully'})
@@ -2033,6 +2075,34 @@ def reservation_update_view(request, pk):
             return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 
+@require_http_methods(["GET"])
+def reservation_availability_view(request):
+    """
+    Free/busy calendar for many units in one query.
+
+    GET params: start, end (YYYY-MM-DD, end exclusive), and either
+    unit=1,2,3 or unit filters zone / area / block / building / floor.
+    """
+    try:
+        start = datetime.strptime(request.GET.get('start', ''), '%Y-%m-%d').date()
+        end = datetime.strptime(request.GET.get('end', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return JsonResponse({'error': 'start and end must be YYYY-MM-DD dates'}, status=400)
+    if not calendar_range_ok(start, end):
+        return JsonResponse({'error': 'end must be after start and within a year of it'}, status=400)
+
+    try:
+        unit_ids = [int(v) for v in request.GET.get('unit', '').split(',') if v.strip()]
+    except ValueError:
+        return JsonResponse({'error': 'unit must be a comma-separated list of IDs'}, status=400)
+    filters = {name: request.GET.get(name) for name in ('zone', 'area', 'block', 'building', 'floor')}
+    if not unit_ids and not any(filters.values()):
+        return JsonResponse({'error': 'Select units with unit= or a location filter'}, status=400)
+
+    calendar = availability_calendar(units_for_calendar(unit_ids, filters), start, end)
+    return JsonResponse({'start': start, 'end': end, 'units': calendar})
+
+
 @require_http_methods(["POST"])
 def reservation_delete_view(request):
     """Delete a reservation"""
@@ -2054,6 +2124,7 @@ def reservation_delete_view(request):
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 
+@read_replica
 def reservation_export_view(request):
     """Export reservations to Excel"""
     try:
@@ -2198,9 +2269,6 @@ def checkin_checkout_create_view(request):
     try:
         from datetime import datetime
         
-        print("POST data:", dict(request.POST))
-        print("User:", request.user, "Is authenticated:", request.user.is_authenticated)
-        
         # Extract only the fields we need
         reservation_id = request.POST.get('reservation')
         actual_checkin_datetime_str = request.POST.get('actual_checkin_datetime') or None
@@ -2227,27 +2295,11 @@ def checkin_checkout_create_view(request):
             actual_checkout_datetime=actual_checkout_datetime,
             remarks=remarks,
         )
-        # Set audit fields explicitly
-        checkin.created_by = request.user
-        checkin.modified_by = request.user
         checkin.save()
         
         # Update reservation and unit status
-        reservation = Reservation.objects.get(pk=reservation_id)
-        if actual_checkin_datetime and not actual_checkout_datetime:
-            reservation.occupancy_status = 'Occupied'
-            reservation.save()
-            # Update unit status to Occupied
-            if reservation.unit:
-                reservation.unit.occupancy_status = 'Occupied'
-                reservation.unit.save()
-        elif actual_checkout_datetime:
-            reservation.occupancy_status = 'Checked Out'
-            reservation.save()
-            # Update unit status to Vacant Dirty
-            if reservation.unit:
-                reservation.unit.occupancy_status = 'Vacant Dirty'
-                reservation.unit.save()
+        reservation = Reservation.objects.select_related('unit').get(pk=reservation_id)
+        apply_stay_status(reservation, actual_checkin_datetime, actual_checkout_datetime)
         
         messages.success(request, 'Check-in/check-out record created successfully!')
         return JsonResponse({'success': True, 'message': 'Check-in/check-out created successfully'})
@@ -2256,6 +2308,62 @@ def checkin_checkout_create_view(request):
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 
+CHECKIN_BULK_MAX_ITEMS = 1000
+
+
+@require_POST
+def checkin_checkout_bulk_view(request):
+    """
+    Check many reservations in or out at once (group arrivals / departures).
+
+    JSON body: {"type": "checkin"|"checkout", "at": "YYYY-MM-DDTHH:MM" (default now),
+                "remarks": "", "reservations": [1, 2, ...]}
+    or per-item values: {"items": [{"reservation": 1, "type": ..., "at": ..., "remarks": ...}, ...]}
+    (top-level type / at / remarks are defaults). Returns one result per item.
+    """
+    if request.content_type != 'application/json':
+        return JsonResponse({'success': False, 'error': 'Invalid content type.'}, status=400)
+
+    try:
+        data = json.loads(request.body)
+        items = data.get('items')
+        if items is None:
+            items = [{'reservation': reservation_id} for reservation_id in data.get('reservations') or []]
+        if not isinstance(items, list) or not items:
+            return JsonResponse({'success': False, 'error': 'Provide reservations or items'}, status=400)
+        if len(items) > CHECKIN_BULK_MAX_ITEMS:
+            return JsonResponse({'success': False, 'error': f'At most {CHECKIN_BULK_MAX_ITEMS} items per request'}, status=400)
+
+        now = timezone.now()
+        events = []
+        for item in items:
+            merged = {**data, **item}
+            if merged.get('type') not in ('checkin', 'checkout'):
+                return JsonResponse({'success': False, 'error': 'type must be checkin or checkout'}, status=400)
+            at = parse_datetime(merged['at']) if merged.get('at') else now
+            if at is None:
+                return JsonResponse({'success': False, 'error': f"Invalid date/time: {merged['at']}"}, status=400)
+            events.append({
+                'reservation_id': int(item['reservation']),
+                'type': merged['type'],
+                'at': timezone.make_aware(at) if timezone.is_naive(at) else at,
+                'remarks': merged.get('remarks') or '',
+            })
+
+        results = bulk_check_in_out(events)
+        applied = sum(1 for result in results if result['result'] == 'applied')
+        return JsonResponse({
+            'success': True,
+            'message': f'{applied} of {len(results)} check-in/check-out(s) applied',
+            'results': results,
+        })
+
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'Invalid JSON format.'}, status=400)
+    except (KeyError, TypeError, ValueError):
+        return JsonResponse({'success': False, 'error': 'Each item needs a reservation ID'}, status=400)
+
+
 @require_http_methods(["GET", "POST"])
 def checkin_checkout_update_view(request, pk):
     """Update an existing check-in/check-out record"""
@@ -2317,26 +2425,10 @@ def checkin_checkout_update_view(request, pk):
                 checkin.actual_checkout_datetime = None
             
             checkin.remarks = remarks
-            checkin.modified_by = request.user
-            
             checkin.save()
             
             # Update reservation and unit status
-            reservation = checkin.reservation
-            if actual_checkin_datetime and not actual_checkout_datetime:
-                reservation.occupancy_status = 'Occupied'
-                reservation.save()
-                # Update unit status to Occupied
-                if reservation.unit:
-                    reservation.unit.occupancy_status = 'Occupied'
-                    reservation.unit.save()
-            elif actual_checkout_datetime:
-                reservation.occupancy_status = 'Checked Out'
-                reservation.save()
-                # Update unit status to Vacant Dirty
-                if reservation.unit:
-                    reservation.unit.occupancy_status = 'Vacant Dirty'
-                    reservation.unit.save()
+            apply_stay_status(checkin.reservation, actual_checkin_datetime, actual_checkout_datetime)
             
             messages.success(request, 'Check-in/check-out record updated successfully!')
             return JsonResponse({'success': True, 'message': 'Check-in/check-out updated successfully'})
@@ -2360,6 +2452,7 @@ def checkin_checkout_delete_view(request):
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 
+@read_replica
 def checkin_checkout_export_view(request):
     """Export check-ins/check-outs to Excel"""
     try:
@@ -2449,4 +2542,60 @@ def checkin_checkout_export_view(request):
         return HttpResponse(f"An error occurred during export: {e}", status=500)
 
 
+# =======================================================
+# OCCUPANCY REPORTS (read the daily snapshot table only)
+# =======================================================
+
+def _occupancy_report_params(request):
+    start = datetime.strptime(request.GET.get('start', ''), '%Y-%m-%d').date()
+    end = datetime.strptime(request.GET.get('end', ''), '%Y-%m-%d').date()
+    group_by = [name for name in request.GET.get('group_by', 'date,company').split(',') if name in REPORT_GROUPINGS]
+    return start, end, group_by, request.GET.get('company') or None
+
+
+@require_http_methods(["GET"])
+def occupancy_report_view(request):
+    """
+    Occupancy totals from the daily snapshots.
+    GET params: start, end (YYYY-MM-DD, inclusive), group_by (any of
+    date,company,accommodation_type,zone; default date,company), company.
+    """
+    try:
+        start, end, group_by, company_id = _occupancy_report_params(request)
+    except ValueError:
+        return JsonResponse({'error': 'start and end must be YYYY-MM-DD dates'}, status=400)
+    rows = list(occupancy_report(start, end, group_by, company_id))
+    return JsonResponse({'start': start, 'end': end, 'group_by': group_by, 'rows': rows})
+
+
+@read_replica
+def occupancy_report_export_view(request):
+    """Export the occupancy report to Excel"""
+    try:
+        start, end, group_by, company_id = _occupancy_report_params(request)
+    except ValueError:
+        return JsonResponse({'error': 'start and end must be YYYY-MM-DD dates'}, status=400)
+
+    columns = []
+    if 'date' in group_by:
+        columns.append(('Date', lambda r: r['date'].strftime('%m/%d/%Y')))
+    if 'company' in group_by:
+        columns.append(('Company', lambda r: r['company__company_name'] or 'Unallocated'))
+    if 'accommodation_type' in group_by:
+        columns.append(('Accommodation Type', lambda r: r['accommodation_type']))
+    if 'zone' in group_by:
+        columns.append(('Zone', lambda r: r['zone']))
+    columns += [
+        ('Total Beds', lambda r: r['total']),
+        ('Occupied', lambda r: r['occupied']),
+        ('Reserved', lambda r: r['reserved']),
+        ('Vacant', lambda r: r['vacant']),
+    ]
+
+    return export_to_excel(
+        occupancy_report(start, end, group_by, company_id),
+        [header for header, _ in columns],
+        lambda row: [value(row) for _, value in columns],
+        file_prefix="occupancy_report"
+    )
 
@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     
 
     # Your apps
+    'utils',
     'HumanResource',
     'Housing',
     'HardService',
@@ -59,14 +60,17 @@ INSTALLED_APPS = [
     'Tickets',
     'Training',
     "accounts",
+    'api',
 ]
 
 MIDDLEWARE = [
+    'utils.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'utils.audit.AuditUserMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "accounts.middleware.AppAccessRestrictionMiddleware",
@@ -100,11 +104,95 @@ WSGI_APPLICATION = 'Olivia.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Configured from the environment. Without DB_ENGINE=postgres the local
+# SQLite file is used.
+#   DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT   connection
+#   DB_CONN_MAX_AGE      seconds to keep a connection open (default 60)
+#   DB_POOL_MAX_SIZE     use psycopg's connection pool of this size instead
+#                        of persistent connections (needs psycopg[pool])
+#   DB_REPLICA_HOST      read replica for export views (utils.db.read_replica)
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'olivia'),
+            'USER': os.environ.get('DB_USER', 'olivia'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
+    if os.environ.get('DB_POOL_MAX_SIZE'):
+        # Pooled connections are returned to the pool after each request
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ['DB_POOL_MAX_SIZE']),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+    if os.environ.get('DB_REPLICA_HOST'):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': os.environ['DB_REPLICA_HOST'],
+            'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+            'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+
+# Applied to every SQLite connection by utils.db.tune_sqlite
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -32000,  # KiB
+    'temp_store': 'MEMORY',
+}
+
+DATABASE_ROUTERS = ['utils.db.ReplicaRouter']
+
+
+# Caches
+# "default" is shared by every worker process: token lookups, pending
+# approval counts and the routing table version are invalidated through it.
+# REDIS_URL selects Redis (needs redis-py); otherwise the database cache
+# table, created by accounts migration 0013 / `manage.py createcachetable`.
+# On the database cache a hit is a query too, so token lookups and pending
+# counts go straight to their tables and the routing version is polled every
+# few seconds (utils/cache.py); set REDIS_URL in production to cache them.
+# "local" is per process, for immutable data that is cheaper to rebuild than
+# to fetch from the database cache: Warehouse label symbols use it.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'olivia_cache',
+            'OPTIONS': {'MAX_ENTRIES': 50000},
+        },
+    }
+CACHES['local'] = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'olivia-local',
+    'OPTIONS': {'MAX_ENTRIES': 5000},
 }
 
 
@@ -158,4 +246,45 @@ LOGOUT_REDIRECT_URL = 'login'  # Or a URL name for the login page
 LOGOUT_TEMPLATE_NAME = 'logout.html' # Or whatever your template path is
 # Media files (uploads)
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# REST Framework (mobile API)
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.authentication.CachedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated',
+    ],
+}
+
+# Approval sweeper: days a step may wait before it is escalated, for
+# authorities without auto_approve_after_days. None leaves them waiting.
+APPROVAL_ESCALATION_DAYS = None
+# Days before a step of a can_skip_if_unavailable authority is skipped
+APPROVAL_SKIP_AFTER_DAYS = 3
+
+# Mobile API tokens: cache lifetime, expiry and rotation (seconds; None disables)
+API_TOKEN_CACHE_TIMEOUT = 300
+API_TOKEN_TTL = None
+API_TOKEN_ROTATE_AFTER = None
+
+# Housing billing: bed-night rate per room type ({'A': '120.00', ...}) and
+# which bed-nights are charged ('allocated' or 'occupied')
+HOUSING_BED_NIGHT_RATES = {}
+HOUSING_BILLING_BASIS = 'allocated'
+
+# Request instrumentation (utils.metrics): per-view query count and timing,
+# served at /metrics/ to staff or to "Authorization: Bearer <METRICS_TOKEN>"
+REQUEST_METRICS_ENABLED = True
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+# Most queries a request to the view may run (keyed by URL name); over
+# budget is logged, or raised with QUERY_BUDGET_RAISE (tests override it)
+QUERY_BUDGETS = {
+    'api_receiving_list': 20,
+    'api_products_list': 20,
+    'get_allocations_by_company': 10,
+    'reservation': 15,
+}
+QUERY_BUDGET_DEFAULT = None
+QUERY_BUDGET_RAISE = False
@@ -20,6 +20,7 @@ from django.contrib.auth import views as auth_views
 from Olivia import views
 from django.conf import settings
 from django.conf.urls.static import static
+from utils.metrics import metrics_view
 
 urlpatterns = [
     path('api/', include('api.urls')),  # Mobile API endpoints
@@ -33,6 +34,9 @@ urlpatterns = [
     # Logout (redirects to login page)
     path('accounts/logout/', views.logout, name='logout'),
 
+    # Request metrics (Prometheus)
+    path('metrics/', metrics_view, name='metrics'),
+
     # Dashboard
     path('dashboard/', views.dashboard, name='dashboard'),
 
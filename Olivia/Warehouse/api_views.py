@@ -1,11 +1,18 @@
+from django.core import signing
 from django.shortcuts import get_object_or_404
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from .models import Receiving, ReceivingItem, Supplier, Category, Location, MaterialRequisition, MaterialRequisitionItem, Product
+from .models import Receiving, ReceivingItem, Supplier, Category, Location, MaterialRequisition, MaterialRequisitionItem, Product, StockMovement
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When, Window
+from django.db.models.expressions import RowRange
+from django.utils import timezone
+from . import labels
 from utils.excel_exporter import export_to_excel
+from utils.pagination import keyset_paginate, get_page_size, decode_cursor, encode_cursor
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
+from decimal import Decimal
 
 
 @require_http_methods(["GET"])
@@ -157,8 +164,7 @@ def api_receiving_create(request):
                 purchase_type=data.get('purchase_type', 'LOCAL'),
                 department=data.get('department', ''),
                 status=data.get('status', 'PENDING'),
-                remarks=data.get('remarks', ''),
-                created_by=request.user if request.user.is_authenticated else None
+                remarks=data.get('remarks', '')
             )
             
             # Get or create category
@@ -283,7 +289,6 @@ def api_receiving_update(request, pk):
         receiving.department = data.get('department', receiving.department)
         receiving.status = data.get('status', receiving.status)
         receiving.remarks = data.get('remarks', receiving.remarks)
-        receiving.modified_by = request.user if request.user.is_authenticated else None
         
         receiving.save()
         
@@ -525,8 +530,7 @@ def api_receiving_import(request):
                     supplier=supplier,
                     purchase_type=purchase_type,
                     department=department,
-                    status='COMPLETED',
-                    created_by=request.user if request.user.is_authenticated else None
+                    status='COMPLETED'
                 )
                 
                 # Get default location
@@ -554,8 +558,7 @@ def api_receiving_import(request):
                     unit_price=unit_price,
                     vat_percentage=vat_percentage,
                     production_date=production_date,
-                    expiry_date=expiry_date,
-                    created_by=request.user if request.user.is_authenticated else None
+                    expiry_date=expiry_date
                 )
                 
                 success_count += 1
@@ -709,14 +712,52 @@ def api_receiving_export(request):
 
 @require_http_methods(["GET"])
 def api_requisition_list(request):
-    """Get all material requisition records"""
+    """
+    Get material requisition records, newest first, one keyset page at a time.
+
+    Filters: status, department, date_from, date_to (YYYY-MM-DD), search.
+    Pass the returned ``next_cursor`` back as ``cursor`` to fetch the next page.
+    Item counts and requested/issued totals are annotated in the same query.
+    """
     try:
-        requisitions = MaterialRequisition.objects.all().select_related('requested_by', 'approved_by').prefetch_related('materialrequisitionitem_set__product').order_by('-date')
+        requisitions = MaterialRequisition.objects.select_related('requested_by', 'approved_by').annotate(
+            items_count=Count('materialrequisitionitem'),
+            total_requested=Sum('materialrequisitionitem__requested_quantity'),
+            total_issued=Sum('materialrequisitionitem__issued_quantity'),
+        )
+
+        status = request.GET.get('status')
+        if status:
+            requisitions = requisitions.filter(status=status)
+        department = request.GET.get('department')
+        if department:
+            requisitions = requisitions.filter(department__iexact=department)
+        date_from = request.GET.get('date_from')
+        if date_from:
+            requisitions = requisitions.filter(date__gte=datetime.strptime(date_from, '%Y-%m-%d').date())
+        date_to = request.GET.get('date_to')
+        if date_to:
+            requisitions = requisitions.filter(date__lte=datetime.strptime(date_to, '%Y-%m-%d').date())
+        search = request.GET.get('search', '').strip()
+        if search:
+            requisitions = requisitions.filter(
+                Q(mr_number__icontains=search) |
+                Q(department__icontains=search) |
+                Q(requested_by__username__icontains=search) |
+                Q(requested_by__first_name__icontains=search) |
+                Q(requested_by__last_name__icontains=search)
+            )
+
+        page, next_cursor = keyset_paginate(
+            requisitions, ['-date', '-id'],
+            cursor=request.GET.get('cursor'),
+            page_size=get_page_size(request),
+        )
+
         data = []
-        
-        for req in requisitions:
-            items_count = req.materialrequisitionitem_set.count()
-            
+        for req in page:
+            total_requested = req.total_requested or 0
+            total_issued = req.total_issued or 0
             data.append({
                 'id': req.id,
                 'mr_number': req.mr_number,
@@ -725,13 +766,16 @@ def api_requisition_list(request):
                 'requested_by': req.requested_by.get_full_name() or req.requested_by.username if req.requested_by else '',
                 'status': req.status,
                 'status_display': req.get_status_display(),
-                'items_count': items_count,
+                'items_count': req.items_count,
+                'total_requested': float(total_requested),
+                'total_issued': float(total_issued),
+                'outstanding': float(total_requested - total_issued),
                 'remarks': req.remarks,
                 'approved_by': req.approved_by.get_full_name() or req.approved_by.username if req.approved_by else '',
                 'approved_date': req.approved_date.strftime('%Y-%m-%d') if req.approved_date else None,
             })
-        
-        return JsonResponse({'data': data}, status=200)
+
+        return JsonResponse({'data': data, 'next_cursor': next_cursor}, status=200)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
 
@@ -754,8 +798,7 @@ def api_requisition_create(request):
             department=data.get('department', ''),
             requested_by=request.user if request.user.is_authenticated else None,
             status=data.get('status', 'PENDING'),
-            remarks=data.get('remarks', ''),
-            created_by=request.user if request.user.is_authenticated else None
+            remarks=data.get('remarks', '')
         )
         
         # Create items
@@ -767,8 +810,7 @@ def api_requisition_create(request):
                 product=product,
                 requested_quantity=item_data['requested_quantity'],
                 issued_quantity=item_data.get('issued_quantity', 0),
-                remarks=item_data.get('remarks', ''),
-                created_by=request.user if request.user.is_authenticated else None
+                remarks=item_data.get('remarks', '')
             )
         
         return JsonResponse({
@@ -833,7 +875,6 @@ def api_requisition_update(request, pk):
         requisition.department = data.get('department', requisition.department)
         requisition.status = data.get('status', requisition.status)
         requisition.remarks = data.get('remarks', requisition.remarks)
-        requisition.modified_by = request.user if request.user.is_authenticated else None
         requisition.save()
         
         # Update items if provided
@@ -850,8 +891,7 @@ def api_requisition_update(request, pk):
                     product=product,
                     requested_quantity=item_data['requested_quantity'],
                     issued_quantity=item_data.get('issued_quantity', 0),
-                    remarks=item_data.get('remarks', ''),
-                    created_by=request.user if request.user.is_authenticated else None
+                    remarks=item_data.get('remarks', '')
                 )
         
         return JsonResponse({'message': 'Material requisition updated successfully'}, status=200)
@@ -983,3 +1023,180 @@ def api_products_list(request):
         return JsonResponse({'data': data}, status=200)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
+
+
+# =======================================================
+# STOCK MOVEMENT LEDGER API ENDPOINTS
+# =======================================================
+
+LEDGER_CURSOR_SALT = 'warehouse.ledger_cursor'
+
+
+@require_http_methods(["GET"])
+def api_stock_movement_ledger(request):
+    """
+    Chronological stock movement ledger for one product, optionally at one location.
+
+    Params: product_id (required), location_id, date_from, date_to (YYYY-MM-DD),
+    cursor, page_size. Each row carries the running balance, computed in SQL with
+    a window sum; the cursor carries the balance forward so later pages only
+    scan their own rows. It is signed for this product and location, so a
+    client cannot forge the balance.
+    """
+    try:
+        product_id = request.GET.get('product_id')
+        if not product_id:
+            return JsonResponse({'error': 'product_id is required'}, status=400)
+        location_id = request.GET.get('location_id')
+
+        movements = StockMovement.objects.filter(product_id=product_id)
+        if location_id:
+            # An OR across the two FKs cannot use either (location, date) index;
+            # a UNION of one indexed lookup per side can
+            product_movements = StockMovement.objects.filter(product_id=product_id).order_by()
+            at_location = product_movements.filter(to_location_id=location_id).values('pk').union(
+                product_movements.filter(from_location_id=location_id).values('pk')
+            )
+            movements = movements.filter(pk__in=at_location)
+            # Transfers count against the location they left and for the one they reached
+            signed_quantity = Case(
+                When(movement_type='TRANSFER', from_location_id=location_id, then=-F('quantity')),
+                When(movement_type='OUT', then=-F('quantity')),
+                default=F('quantity'),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            )
+        else:
+            # Product-wide ledger: transfers move stock around without changing it
+            signed_quantity = Case(
+                When(movement_type='TRANSFER', then=Value(0)),
+                When(movement_type='OUT', then=-F('quantity')),
+                default=F('quantity'),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            )
+        movements = movements.annotate(signed_quantity=signed_quantity)
+
+        date_from = request.GET.get('date_from')
+        date_to = request.GET.get('date_to')
+        if date_to:
+            end = datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)
+            movements = movements.filter(date__lt=timezone.make_aware(end))
+
+        signer = signing.Signer(salt=f'{LEDGER_CURSOR_SALT}:{product_id}:{location_id or ""}')
+        cursor = request.GET.get('cursor')
+        if cursor:
+            try:
+                cursor = signer.unsign(cursor)
+            except signing.BadSignature:
+                return JsonResponse({'error': 'Invalid cursor'}, status=400)
+            opening_balance = Decimal(str(decode_cursor(cursor)[2]))
+        else:
+            opening_balance = Decimal('0')
+            if date_from:
+                start = timezone.make_aware(datetime.strptime(date_from, '%Y-%m-%d'))
+                opening_balance = movements.filter(date__lt=start).aggregate(
+                    total=Sum('signed_quantity'))['total'] or Decimal('0')
+                movements = movements.filter(date__gte=start)
+
+        movements = movements.select_related('from_location', 'to_location').annotate(
+            running_total=Window(
+                expression=Sum('signed_quantity'),
+                order_by=[F('date').asc(), F('id').asc()],
+                frame=RowRange(start=None, end=0),
+            ),
+        )
+
+        page, next_cursor = keyset_paginate(
+            movements, ['date', 'id'],
+            cursor=cursor,
+            page_size=get_page_size(request, default=100, maximum=1000),
+        )
+
+        data = []
+        balance = opening_balance
+        for movement in page:
+            balance = opening_balance + movement.running_total
+            data.append({
+                'id': movement.id,
+                'date': movement.date.isoformat(),
+                'reference_number': movement.reference_number,
+                'movement_type': movement.movement_type,
+                'quantity': float(movement.quantity),
+                'signed_quantity': float(movement.signed_quantity),
+                'from_location': movement.from_location.name if movement.from_location else None,
+                'to_location': movement.to_location.name if movement.to_location else None,
+                'balance': float(balance),
+                'remarks': movement.remarks,
+            })
+
+        if next_cursor:
+            last = page[-1]
+            next_cursor = signer.sign(encode_cursor([last.date, last.id, balance]))
+
+        return JsonResponse({
+            'data': data,
+            'opening_balance': float(opening_balance),
+            'next_cursor': next_cursor,
+        }, status=200)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+
+# =======================================================
+# LABEL GENERATION API ENDPOINTS
+# =======================================================
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def api_labels_render(request):
+    """
+    Render a batch of labels server-side as a multi-page PDF or a ZPL stream.
+
+    Body: {"product_codes": [...], "grn_numbers": [...], "receiving_item_ids": [...],
+           "format": "pdf"|"zpl", "label_type": "barcode"|"qr"|"both",
+           "size": "small"|"medium"|"large", "copies": 1, "include_price": false}
+    """
+    try:
+        data = json.loads(request.body)
+
+        output_format = data.get('format', 'pdf')
+        label_type = data.get('label_type', 'barcode')
+        size = data.get('size', 'medium')
+        copies = int(data.get('copies', 1))
+
+        if output_format not in ('pdf', 'zpl'):
+            return JsonResponse({'error': 'format must be pdf or zpl'}, status=400)
+        if label_type not in labels.LABEL_TYPES:
+            return JsonResponse({'error': f'label_type must be one of {", ".join(labels.LABEL_TYPES)}'}, status=400)
+        if size not in labels.LABEL_SIZES:
+            return JsonResponse({'error': f'size must be one of {", ".join(labels.LABEL_SIZES)}'}, status=400)
+        if not 1 <= copies <= 1000:
+            return JsonResponse({'error': 'copies must be between 1 and 1000'}, status=400)
+
+        label_rows = labels.collect_labels(
+            product_codes=data.get('product_codes') or None,
+            grn_numbers=data.get('grn_numbers') or None,
+            receiving_item_ids=data.get('receiving_item_ids') or None,
+            include_price=bool(data.get('include_price')),
+        )
+        if not label_rows:
+            return JsonResponse({'error': 'No labels matched the request'}, status=400)
+
+        timestamp = datetime.now().strftime('%Y-%m-%d %H-%M-%S')
+        if output_format == 'zpl':
+            response = HttpResponse(
+                labels.render_zpl(label_rows, label_type, size, copies),
+                content_type='text/plain; charset=utf-8',
+            )
+            response['Content-Disposition'] = f'attachment; filename="labels_{timestamp}.zpl"'
+        else:
+            response = HttpResponse(
+                labels.render_pdf(label_rows, label_type, size, copies),
+                content_type='application/pdf',
+            )
+            response['Content-Disposition'] = f'attachment; filename="labels_{timestamp}.pdf"'
+        return response
+
+    except labels.LabelError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=400)
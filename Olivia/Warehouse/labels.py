@@ -0,0 +1,319 @@
+"""
+Server-side label rendering for the Warehouse label generator.
+
+Labels are collected from products, GRNs or receiving items in a handful of
+queries, then rendered either to ZPL (the printer draws the barcode itself) or
+to a multi-page PDF built with Pillow. Barcode/QR symbols are cached by a hash
+of their content in the per-process "local" cache alias (rendering one is
+cheaper than fetching the PNG from the database cache). Missing symbols are
+rendered in chunks, each chunk cached as soon as it is done. A web request
+renders at most MAX_REQUEST_SYMBOLS new symbols, in-process; bigger batches go
+through ``python manage.py render_labels``, which has no limit and renders in
+a process pool.
+
+PDF rendering needs ``python-barcode`` and ``qrcode`` (see requirements_labels.txt).
+"""
+import hashlib
+import io
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.cache import caches
+
+from .models import Product, ReceivingItem
+
+
+LABEL_TYPES = ('barcode', 'qr', 'both')
+
+# Label sizes offered by the label generator page, in inches (width, height)
+LABEL_SIZES = {
+    'small': (2, 1),
+    'medium': (3, 2),
+    'large': (4, 3),
+}
+
+PDF_DPI = 300
+ZPL_DPI = 203
+
+# Cache alias holding rendered symbols (see CACHES in settings)
+SYMBOL_CACHE = 'local'
+SYMBOL_CACHE_TIMEOUT = 60 * 60 * 24
+# Uncached symbols rendered (and cached) per chunk
+RENDER_CHUNK_SIZE = 200
+# Most uncached symbols one web request may render
+MAX_REQUEST_SYMBOLS = 2000
+# Below this many uncached symbols a process pool costs more than it saves
+POOL_THRESHOLD = 64
+
+
+class LabelError(Exception):
+    """Raised when a label request cannot be rendered"""
+
+
+# =======================================================
+# COLLECTING LABEL DATA
+# =======================================================
+
+def _product_label(product, include_price):
+    return {
+        'code': product.code,
+        'title': product.name,
+        'subtitle': product.category.name if product.category_id else '',
+        'price': product.unit_price if include_price else None,
+    }
+
+
+def collect_labels(product_codes=None, grn_numbers=None, receiving_item_ids=None, include_price=False):
+    """
+    Build label rows for the requested products, GRNs and receiving items.
+
+    Each source is fetched with a single query; product labels keep the order
+    in which the codes were requested.
+    """
+    labels = []
+
+    if product_codes:
+        products = Product.objects.select_related('category').filter(code__in=product_codes)
+        by_code = {p.code: p for p in products}
+        missing = [code for code in product_codes if code not in by_code]
+        if missing:
+            raise LabelError(f"Unknown product code(s): {', '.join(missing[:10])}")
+        labels.extend(_product_label(by_code[code], include_price) for code in product_codes)
+
+    item_filters = []
+    if grn_numbers:
+        item_filters.append(('receiving__grn_number__in', grn_numbers))
+    if receiving_item_ids:
+        item_filters.append(('id__in', receiving_item_ids))
+
+    for lookup, values in item_filters:
+        items = (
+            ReceivingItem.objects
+            .select_related('receiving', 'product')
+            .filter(**{lookup: values})
+            .order_by('receiving__grn_number', 'id')
+        )
+        for item in items:
+            code = item.item_code or (item.product.code if item.product else '')
+            if not code:
+                continue
+            subtitle = f"GRN {item.receiving.grn_number}"
+            if item.expiry_date:
+                subtitle += f" | EXP {item.expiry_date.strftime('%Y-%m-%d')}"
+            labels.append({
+                'code': code,
+                'title': item.item_description or (item.product.name if item.product else ''),
+                'subtitle': subtitle,
+                'price': item.unit_price if include_price else None,
+            })
+
+    return labels
+
+
+# =======================================================
+# ZPL
+# =======================================================
+
+def _zpl_field(value):
+    """Hex-escape the characters ZPL treats as commands (used with ^FH)"""
+    value = str(value)
+    for char in ('_', '^', '~'):
+        value = value.replace(char, '_%02X' % ord(char))
+    return value
+
+
+def render_zpl(labels, label_type='barcode', size='medium', copies=1):
+    """Render labels as one ZPL stream; copies are printed with ^PQ"""
+    width_in, height_in = LABEL_SIZES[size]
+    width, height = width_in * ZPL_DPI, height_in * ZPL_DPI
+    margin = 20
+    text_height = max(20, height // 10)
+    symbol_height = height - 2 * margin - 3 * text_height
+
+    chunks = []
+    for label in labels:
+        lines = [
+            '^XA',
+            '^CI28',
+            f'^PW{width}^LL{height}',
+            f'^FO{margin},{margin}^A0N,{text_height},{text_height}^FH^FD{_zpl_field(label["title"][:40])}^FS',
+        ]
+        y = margin + text_height + 5
+        x = margin
+        if label_type in ('barcode', 'both'):
+            barcode_height = max(30, symbol_height - text_height)
+            lines.append(f'^FO{x},{y}^BY2^BCN,{barcode_height},Y,N,N^FH^FD{_zpl_field(label["code"])}^FS')
+        if label_type in ('qr', 'both'):
+            qr_x = width - margin - symbol_height if label_type == 'both' else x
+            magnification = max(2, min(10, symbol_height // 40))
+            lines.append(f'^FO{qr_x},{y}^BQN,2,{magnification}^FH^FDQA,{_zpl_field(label["code"])}^FS')
+        footer = label['subtitle']
+        if label['price'] is not None:
+            footer = f"{footer}  Price: {label['price']:.2f}".strip()
+        if footer:
+            lines.append(
+                f'^FO{margin},{height - margin - text_height}^A0N,{text_height},{text_height}'
+                f'^FH^FD{_zpl_field(footer[:60])}^FS'
+            )
+        lines.append(f'^PQ{copies}')
+        lines.append('^XZ')
+        chunks.append('\n'.join(lines))
+    return '\n'.join(chunks) + '\n'
+
+
+# =======================================================
+# PDF
+# =======================================================
+
+def _symbol_key(kind, data, height):
+    digest = hashlib.sha1(f'{kind}|{height}|{data}'.encode()).hexdigest()
+    return f'warehouse:label:{digest}'
+
+
+def _render_symbol(job):
+    """Render one barcode or QR symbol to PNG bytes (picklable, for the render_labels pool)"""
+    from PIL import Image
+
+    kind, data, height = job
+    if kind == 'qr':
+        import qrcode
+
+        qr = qrcode.QRCode(border=1)
+        qr.add_data(data)
+        qr.make(fit=True)
+        matrix = qr.get_matrix()
+        size = len(matrix)
+        pixels = bytes(0 if cell else 255 for row in matrix for cell in row)
+        image = Image.frombytes('L', (size, size), pixels)
+        image = image.resize((height, height), Image.NEAREST)
+    else:
+        import barcode
+
+        modules = barcode.get('code128', data).build()[0]
+        # 10-module quiet zone each side, 3 pixels per module at PDF_DPI
+        modules = '0' * 10 + modules + '0' * 10
+        row = bytes(0 if m == '1' else 255 for m in modules)
+        image = Image.frombytes('L', (len(modules), 1), row)
+        image = image.resize((len(modules) * 3, height), Image.NEAREST)
+
+    buffer = io.BytesIO()
+    image.convert('1').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _render_symbols(jobs, max_new=None, workers=None):
+    """
+    Return {job: png_bytes}, reusing cached symbols and rendering the rest in chunks.
+
+    workers > 1 renders in a process pool; only the render_labels command uses it,
+    web requests always render in-process.
+    """
+    symbol_cache = caches[SYMBOL_CACHE]
+    keys = {job: _symbol_key(*job) for job in jobs}
+    cached = symbol_cache.get_many(list(keys.values()))
+    symbols = {job: cached[key] for job, key in keys.items() if key in cached}
+
+    missing = [job for job in keys if job not in symbols]
+    if max_new is not None and len(missing) > max_new:
+        raise LabelError(
+            f'{len(missing)} new symbols exceed the limit of {max_new} per request; '
+            'split the batch or use the render_labels management command'
+        )
+
+    pool = None
+    if workers and workers > 1 and len(missing) >= POOL_THRESHOLD:
+        # django.setup lets spawned/forkserver workers unpickle _render_symbol
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+    try:
+        for start in range(0, len(missing), RENDER_CHUNK_SIZE):
+            chunk = missing[start:start + RENDER_CHUNK_SIZE]
+            rendered = pool.map(_render_symbol, chunk, chunksize=16) if pool else map(_render_symbol, chunk)
+            fresh = dict(zip(chunk, rendered))
+            symbol_cache.set_many({keys[job]: png for job, png in fresh.items()}, SYMBOL_CACHE_TIMEOUT)
+            symbols.update(fresh)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    return symbols
+
+
+def _load_font(size):
+    from PIL import ImageFont
+
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 has no scalable default font
+        return ImageFont.load_default()
+
+
+def render_pdf(labels, label_type='barcode', size='medium', copies=1, max_new_symbols=MAX_REQUEST_SYMBOLS,
+               workers=None):
+    """
+    Render labels as a multi-page PDF, one label per page.
+
+    max_new_symbols=None lifts the per-request limit; workers > 1 renders missing
+    symbols in a process pool (management command only).
+    """
+    from PIL import Image, ImageDraw
+
+    try:
+        import barcode  # noqa: F401
+        import qrcode  # noqa: F401
+    except ImportError:
+        raise LabelError('PDF labels require the python-barcode and qrcode packages')
+
+    width_in, height_in = LABEL_SIZES[size]
+    width, height = width_in * PDF_DPI, height_in * PDF_DPI
+    margin = PDF_DPI // 10
+    text_height = height // 9
+    symbol_height = height - 2 * margin - 3 * text_height
+    title_font = _load_font(text_height)
+    small_font = _load_font(int(text_height * 0.8))
+
+    jobs = set()
+    for label in labels:
+        if label_type in ('barcode', 'both'):
+            jobs.add(('barcode', label['code'], symbol_height))
+        if label_type in ('qr', 'both'):
+            jobs.add(('qr', label['code'], symbol_height))
+    symbols = {job: Image.open(io.BytesIO(png)) for job, png in _render_symbols(jobs, max_new_symbols, workers).items()}
+
+    pages = []
+    for label in labels:
+        page = Image.new('1', (width, height), 1)
+        draw = ImageDraw.Draw(page)
+        draw.text((margin, margin), label['title'][:40], font=title_font, fill=0)
+
+        y = margin + text_height + margin // 2
+        qr_width = 0
+        if label_type in ('qr', 'both'):
+            qr = symbols[('qr', label['code'], symbol_height)]
+            qr_x = width - margin - qr.width if label_type == 'both' else margin
+            page.paste(qr, (qr_x, y))
+            qr_width = qr.width + margin
+        if label_type in ('barcode', 'both'):
+            bar = symbols[('barcode', label['code'], symbol_height)]
+            max_width = width - 2 * margin - (qr_width if label_type == 'both' else 0)
+            if bar.width > max_width:
+                bar = bar.resize((max_width, bar.height))
+            page.paste(bar, (margin, y))
+            draw.text((margin, y + symbol_height + 4), label['code'], font=small_font, fill=0)
+        elif label_type == 'qr':
+            draw.text((margin + qr_width, y), label['code'], font=small_font, fill=0)
+
+        footer = label['subtitle']
+        if label['price'] is not None:
+            footer = f"{footer}  Price: {label['price']:.2f}".strip()
+        if footer:
+            draw.text((margin, height - margin - text_height), footer[:60], font=small_font, fill=0)
+
+        pages.extend([page] * copies)
+
+    if not pages:
+        raise LabelError('No labels to render')
+
+    output = io.BytesIO()
+    pages[0].save(output, format='PDF', resolution=PDF_DPI, save_all=True, append_images=pages[1:])
+    return output.getvalue()
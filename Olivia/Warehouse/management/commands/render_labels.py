@@ -0,0 +1,55 @@
+"""
+Management command to render a large label batch outside the web request.
+Run with: python manage.py render_labels --grn GRN-0001 --grn GRN-0002 --output labels.pdf
+      or: python manage.py render_labels --product P100 --format zpl --copies 3 --output labels.zpl
+"""
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from Warehouse import labels
+
+
+class Command(BaseCommand):
+    help = 'Render product / GRN / receiving item labels to a PDF or ZPL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product', action='append', dest='product_codes', help='Product code (repeatable)')
+        parser.add_argument('--grn', action='append', dest='grn_numbers', help='GRN number (repeatable)')
+        parser.add_argument('--item', type=int, action='append', dest='receiving_item_ids',
+                            help='Receiving item id (repeatable)')
+        parser.add_argument('--format', choices=('pdf', 'zpl'), default='pdf')
+        parser.add_argument('--label-type', choices=labels.LABEL_TYPES, default='barcode')
+        parser.add_argument('--size', choices=tuple(labels.LABEL_SIZES), default='medium')
+        parser.add_argument('--copies', type=int, default=1)
+        parser.add_argument('--include-price', action='store_true')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Processes used to render PDF symbols (default: CPU count, 1 disables the pool)')
+        parser.add_argument('--output', required=True, help='File to write')
+
+    def handle(self, *args, **options):
+        try:
+            rows = labels.collect_labels(
+                product_codes=options['product_codes'],
+                grn_numbers=options['grn_numbers'],
+                receiving_item_ids=options['receiving_item_ids'],
+                include_price=options['include_price'],
+            )
+            if not rows:
+                raise CommandError('No labels matched')
+            # Workers are forked; don't let them inherit an open DB connection
+            connections.close_all()
+            if options['format'] == 'zpl':
+                content = labels.render_zpl(rows, options['label_type'], options['size'], options['copies']).encode()
+            else:
+                content = labels.render_pdf(
+                    rows, options['label_type'], options['size'], options['copies'],
+                    max_new_symbols=None, workers=options['workers'],
+                )
+        except labels.LabelError as e:
+            raise CommandError(str(e))
+
+        with open(options['output'], 'wb') as output:
+            output.write(content)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(rows)} label(s) to {options['output']}"))
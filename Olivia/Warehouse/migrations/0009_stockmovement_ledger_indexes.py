@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Warehouse', '0008_alter_receiving_department_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='receiving',
+            name='department',
+            field=models.CharField(blank=True, choices=[('SOFT SERVICE', 'Soft Service'), ('HARD SERVICE', 'Hard Service'), ('ICT', 'ICT'), ('FLS', 'FLS')], max_length=20, verbose_name='Department'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['product', 'date'], name='stockmove_product_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['to_location', 'date'], name='stockmove_to_loc_date_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Warehouse', '0009_stockmovement_ledger_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['from_location', 'date'], name='stockmove_from_loc_date_idx'),
+        ),
+    ]
@@ -1,13 +1,17 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from utils.audit import AuditManager, AuditMixin
+
 # Base Audit Model
-class AuditModel(models.Model):
+class AuditModel(AuditMixin, models.Model):
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="%(class)s_created")
     created_date = models.DateTimeField(auto_now_add=True)
     modified_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="%(class)s_modified")
     modified_date = models.DateTimeField(auto_now=True)
 
+    objects = AuditManager()
+
     class Meta:
         abstract = True
 
@@ -144,6 +148,8 @@ class ReceivingItem(AuditModel):
     vat_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0, verbose_name='VAT%')
     production_date = models.DateField(null=True, blank=True)
     expiry_date = models.DateField(null=True, blank=True)
+
+    history_fields = ('quantity',)
     
     class Meta:
         ordering = ['id']
@@ -261,6 +267,11 @@ class StockMovement(AuditModel):
 
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['product', 'date'], name='stockmove_product_date_idx'),
+            models.Index(fields=['to_location', 'date'], name='stockmove_to_loc_date_idx'),
+            models.Index(fields=['from_location', 'date'], name='stockmove_from_loc_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.movement_type} - {self.product.code} - {self.quantity}"
@@ -9,8 +9,8 @@
 
 let currentPage = 1;
 const itemsPerPage = 15;
-let totalItems = 0;
-let allRequisitions = [];
+let pageCursors = [null];  // pageCursors[n - 1] is the cursor that loads page n
+let nextCursor = null;
 let filteredRequisitions = [];
 let selectedRequisitionId = null;
 let tempItems = [];  // For multiple items before saving
@@ -52,15 +52,25 @@ function bindEventListeners() {
 // III. Data Loading & Display
 // =======================================================
 
-function loadRequisitions() {
+function loadRequisitions(page = 1) {
+    const params = {
+        page_size: itemsPerPage,
+        search: $('#searchRequisition').val() || '',
+        status: $('#statusFilter').val() || ''
+    };
+    if (pageCursors[page - 1]) {
+        params.cursor = pageCursors[page - 1];
+    }
+
     $.ajax({
         url: '/warehouse/api/requisition/list/',
         type: 'GET',
+        data: params,
         success: function(response) {
-            allRequisitions = response.data;
-            filteredRequisitions = allRequisitions;
-            totalItems = filteredRequisitions.length;
-            currentPage = 1;
+            filteredRequisitions = response.data;
+            nextCursor = response.next_cursor;
+            currentPage = page;
+            pageCursors[page] = nextCursor;
             displayRequisitions();
         },
         error: function(xhr, status, error) {
@@ -104,11 +114,7 @@ function displayRequisitions() {
         return;
     }
     
-    const start = (currentPage - 1) * itemsPerPage;
-    const end = Math.min(start + itemsPerPage, filteredRequisitions.length);
-    const pageData = filteredRequisitions.slice(start, end);
-    
-    pageData.forEach(req => {
+    filteredRequisitions.forEach(req => {
         const statusBadge = getStatusBadge(req.status);
         const row = `
             <tr data-id="${req.id}">
@@ -424,22 +430,9 @@ function removeItem(index) {
 // =======================================================
 
 function handleSearch() {
-    const searchTerm = $('#searchRequisition').val().toLowerCase();
-    const statusFilter = $('#statusFilter').val();
-    
-    filteredRequisitions = allRequisitions.filter(req => {
-        const matchesSearch = !searchTerm || 
-            req.department.toLowerCase().includes(searchTerm) ||
-            req.requested_by.toLowerCase().includes(searchTerm);
-        
-        const matchesStatus = !statusFilter || req.status === statusFilter;
-        
-        return matchesSearch && matchesStatus;
-    });
-    
-    totalItems = filteredRequisitions.length;
-    currentPage = 1;
-    displayRequisitions();
+    // Filtering happens server-side; restart from the first page
+    pageCursors = [null];
+    loadRequisitions(1);
 }
 
 // =======================================================
@@ -447,24 +440,24 @@ function handleSearch() {
 // =======================================================
 
 function changePage(page) {
-    const totalPages = Math.ceil(totalItems / itemsPerPage);
-    if (page < 1 || page > totalPages) return;
-    
-    currentPage = page;
-    displayRequisitions();
+    if (page < 1) return;
+    if (page > currentPage && !nextCursor) return;
+
+    loadRequisitions(page);
 }
 
 function updatePagination() {
-    const totalPages = Math.ceil(totalItems / itemsPerPage);
+    // Keyset pagination: the server only says whether another page exists
+    const knownPages = nextCursor ? currentPage + 1 : currentPage;
     $('#currentPage').text(currentPage);
-    $('#totalPages').text(totalPages);
+    $('#totalPages').text(nextCursor ? `${knownPages}+` : knownPages);
     
     $('#prevPage').prop('disabled', currentPage === 1);
-    $('#nextPage').prop('disabled', currentPage === totalPages || totalPages === 0);
+    $('#nextPage').prop('disabled', !nextCursor);
     
     const start = (currentPage - 1) * itemsPerPage + 1;
-    const end = Math.min(currentPage * itemsPerPage, totalItems);
-    $('#pageInfo').text(totalItems > 0 ? `Showing ${start}-${end} of ${totalItems}` : 'No records');
+    const end = start + filteredRequisitions.length - 1;
+    $('#pageInfo').text(filteredRequisitions.length > 0 ? `Showing ${start}-${end}` : 'No records');
 }
 
 // =======================================================
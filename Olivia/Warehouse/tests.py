@@ -1,3 +1,211 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from utils.pagination import decode_cursor, encode_cursor
+
+from . import labels
+from .models import Category, Location, MaterialRequisition, Product, StockMovement, UnitOfMeasure
+
+
+class WarehouseFixtureMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', password='pw')
+        cls.category = Category.objects.create(name='Consumables')
+        cls.uom = UnitOfMeasure.objects.create(name='Piece', abbreviation='pc')
+        cls.product = Product.objects.create(code='P-1', name='Gloves', category=cls.category, unit=cls.uom)
+        cls.store = Location.objects.create(name='Main store', code='MAIN')
+        cls.site = Location.objects.create(name='Site store', code='SITE')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+
+class RequisitionListTests(WarehouseFixtureMixin, TestCase):
+    url = '/warehouse/api/requisition/list/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Three requisitions per day, so the date ties are broken by id
+        cls.requisitions = [
+            MaterialRequisition.objects.create(
+                mr_number=f'MR-{i}', date=datetime(2026, 4, 1 + i // 3).date(), department='Ops',
+                requested_by=cls.admin,
+            )
+            for i in range(7)
+        ]
+
+    def test_newest_first_across_pages(self):
+        numbers, cursor = [], None
+        while True:
+            params = {'page_size': 2, **({'cursor': cursor} if cursor else {})}
+            body = self.client.get(self.url, params).json()
+            numbers.extend(row['mr_number'] for row in body['data'])
+            cursor = body['next_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual(numbers, ['MR-6', 'MR-5', 'MR-4', 'MR-3', 'MR-2', 'MR-1', 'MR-0'])
+        self.assertIsNone(self.client.get(self.url, {'page_size': 7}).json()['next_cursor'])
+
+    def test_invalid_cursor_is_400(self):
+        for cursor in ('garbage', encode_cursor(['not-a-date', 1]), encode_cursor([1])):
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertEqual(response.json(), {'error': 'Invalid cursor'})
+
+
+class StockMovementLedgerTests(WarehouseFixtureMixin, TestCase):
+    url = '/warehouse/api/stock-movement/ledger/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        start = datetime(2026, 3, 1, 9, tzinfo=timezone.utc)
+        # (type, quantity, from, to); two movements share each timestamp so ties break on id
+        rows = [
+            ('IN', 100, None, cls.store),
+            ('IN', 20, None, cls.site),
+            ('TRANSFER', 30, cls.store, cls.site),
+            ('OUT', 5, None, cls.site),
+            ('OUT', 10, None, cls.store),
+            ('IN', 7, None, cls.store),
+        ]
+        for i, (kind, quantity, source, target) in enumerate(rows):
+            movement = StockMovement.objects.create(
+                product=cls.product, movement_type=kind, quantity=quantity,
+                from_location=source, to_location=target, reference_number=f'REF-{i}',
+            )
+            StockMovement.objects.filter(pk=movement.pk).update(date=start + timedelta(days=i // 2))
+
+    def pages(self, **params):
+        params = {'product_id': self.product.pk, 'page_size': 2, **params}
+        rows, cursor = [], None
+        while True:
+            response = self.client.get(self.url, {**params, **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200, response.content)
+            body = response.json()
+            rows.extend(body['data'])
+            cursor = body['next_cursor']
+            if cursor is None:
+                return rows
+
+    def test_balance_carries_across_pages(self):
+        rows = self.pages()
+
+        self.assertEqual([row['reference_number'] for row in rows], [f'REF-{i}' for i in range(6)])
+        self.assertEqual([row['balance'] for row in rows], [100, 120, 120, 115, 105, 112])
+        self.assertEqual(rows, self.pages(page_size=6))
+
+    def test_location_filter_covers_both_sides(self):
+        store = self.pages(location_id=self.store.pk)
+        site = self.pages(location_id=self.site.pk)
+
+        self.assertEqual([row['reference_number'] for row in store], ['REF-0', 'REF-2', 'REF-4', 'REF-5'])
+        self.assertEqual([row['balance'] for row in store], [100, 70, 60, 67])
+        self.assertEqual([row['reference_number'] for row in site], ['REF-1', 'REF-2', 'REF-3'])
+        self.assertEqual([row['balance'] for row in site], [20, 50, 45])
+
+    def test_tampered_cursor_rejected(self):
+        first = self.client.get(self.url, {'product_id': self.product.pk, 'page_size': 2}).json()
+        token, signature = first['next_cursor'].rsplit(':', 1)
+        date, pk, _balance = decode_cursor(token)
+        forged = f"{encode_cursor([date, pk, '1000000'])}:{signature}"
+
+        for cursor in (forged, token, 'garbage'):
+            response = self.client.get(self.url, {'product_id': self.product.pk, 'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertEqual(response.json(), {'error': 'Invalid cursor'})
+
+        # A cursor from one location's ledger is not valid for another
+        store = self.client.get(self.url, {
+            'product_id': self.product.pk, 'location_id': self.store.pk, 'page_size': 1,
+        }).json()
+        response = self.client.get(self.url, {
+            'product_id': self.product.pk, 'location_id': self.site.pk, 'cursor': store['next_cursor'],
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+class LabelTests(WarehouseFixtureMixin, TestCase):
+    url = '/warehouse/api/labels/render/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for code in ('P-2', 'P-3'):
+            Product.objects.create(code=code, name=f'Item {code}', category=cls.category, unit=cls.uom)
+
+    def setUp(self):
+        super().setUp()
+        caches[labels.SYMBOL_CACHE].clear()
+
+    def render(self, **body):
+        return self.client.post(self.url, json.dumps(body), content_type='application/json')
+
+    def test_collect_labels_keeps_requested_order(self):
+        rows = labels.collect_labels(product_codes=['P-3', 'P-1', 'P-2', 'P-1'])
+
+        self.assertEqual([row['code'] for row in rows], ['P-3', 'P-1', 'P-2', 'P-1'])
+        self.assertEqual(rows[1]['subtitle'], 'Consumables')
+        self.assertIsNone(rows[1]['price'])
+
+    def test_collect_labels_unknown_codes(self):
+        with self.assertRaisesMessage(labels.LabelError, 'Unknown product code(s): NOPE, GONE'):
+            labels.collect_labels(product_codes=['P-1', 'NOPE', 'GONE'])
+
+        response = self.render(product_codes=['NOPE'], format='zpl')
+        self.assertEqual(response.status_code, 400)
+
+    def test_zpl_field_escaping(self):
+        self.assertEqual(labels._zpl_field('A^B~C_D'), 'A_5EB_7EC_5FD')
+        self.assertEqual(labels._zpl_field(12.5), '12.5')
+
+        Product.objects.filter(code='P-2').update(name='Caret ^FS~JA')
+        zpl = self.render(product_codes=['P-2'], format='zpl', copies=2).content.decode()
+        self.assertIn('^FDCaret _5EFS_7EJA^FS', zpl)
+        self.assertIn('^PQ2', zpl)
+
+    def test_request_symbol_limit(self):
+        jobs = [('barcode', code, 100) for code in ('P-1', 'P-2', 'P-3')]
+
+        with mock.patch.object(labels, '_render_symbol', return_value=b'png') as render:
+            with self.assertRaisesMessage(labels.LabelError, '3 new symbols exceed the limit of 2 per request'):
+                labels._render_symbols(jobs, max_new=2)
+            render.assert_not_called()
+
+            # Cached symbols don't count towards the limit
+            labels._render_symbols(jobs[:2], max_new=2)
+            self.assertEqual(labels._render_symbols(jobs, max_new=2), dict.fromkeys(jobs, b'png'))
+            self.assertEqual(render.call_count, 3)
+
+    def test_request_symbol_limit_returns_400(self):
+        # max_new_symbols=0 for the view's call
+        with mock.patch.object(labels.render_pdf, '__defaults__', ('barcode', 'medium', 1, 0, None)):
+            response = self.render(product_codes=['P-1'], format='pdf')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('use the render_labels management command', response.json()['error'])
+
+    def test_render_labels_command_uses_pool(self):
+        pool = mock.Mock(wraps=labels.ProcessPoolExecutor)
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.object(labels, 'POOL_THRESHOLD', 1), \
+                mock.patch.object(labels, 'ProcessPoolExecutor', pool):
+            output = os.path.join(directory, 'labels.pdf')
+            call_command('render_labels', '--product', 'P-1', '--product', 'P-2', '--label-type', 'both',
+                         '--workers', '2', '--output', output, stdout=StringIO())
+            with open(output, 'rb') as pdf:
+                self.assertTrue(pdf.read().startswith(b'%PDF'))
+
+        self.assertEqual(pool.call_args.kwargs['max_workers'], 2)
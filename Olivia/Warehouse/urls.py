@@ -31,4 +31,10 @@ urlpatterns = [
     path('api/requisition/delete/', api_views.api_requisition_delete, name='api_requisition_delete'),
     path('api/requisition/export/', api_views.api_requisition_export, name='api_requisition_export'),
     path('api/products/list/', api_views.api_products_list, name='api_products_list'),
+
+    # API endpoints for Stock Movement
+    path('api/stock-movement/ledger/', api_views.api_stock_movement_ledger, name='api_stock_movement_ledger'),
+
+    # API endpoints for Label Generator
+    path('api/labels/render/', api_views.api_labels_render, name='api_labels_render'),
 ]
\ No newline at end of file
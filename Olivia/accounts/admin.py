@@ -11,6 +11,7 @@ class ProfileInline(admin.StackedInline):
     model = Profile
     can_delete = False
     filter_horizontal = ("allowed_apps", "custom_permissions")
+    raw_id_fields = ("employee",)
 
 class UserAdmin(BaseUserAdmin):
     inlines = (ProfileInline,)
@@ -46,8 +47,9 @@ class RolePermissionAdmin(admin.ModelAdmin):
 
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
-    list_display = ('user',)
+    list_display = ('user', 'employee')
     filter_horizontal = ('allowed_apps',)
+    raw_id_fields = ('employee',)
 
 # Unregister the original User admin and register our custom one
 admin.site.unregister(User)
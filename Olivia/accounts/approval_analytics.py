@@ -0,0 +1,243 @@
+"""
+Approval SLA Analytics
+Daily rollups of decided approval steps and the metrics read from them:
+median / p90 time-to-decision, throughput per day and live queue depth.
+
+Time-to-decision is measured from when a step became current (the previous
+level's decision, or submission for level 1) to its own decision, and is
+aggregated in the database. Each day keeps a cumulative histogram over
+SLA_BUCKET_HOURS so percentiles can be merged across any date range.
+"""
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import ApprovalDailyStat, ApprovalStep
+
+
+# Upper bounds (hours) of the time-to-decision histogram buckets
+SLA_BUCKET_HOURS = (1, 2, 4, 8, 12, 24, 48, 72, 120, 168, 336, 720)
+
+DECIDED_STATUSES = ('approved', 'rejected', 'skipped')
+
+
+# =======================================================
+# ROLLUP
+# =======================================================
+
+def _decided_steps(since, until):
+    """Decided steps with a DB-side ``decision_time`` duration, by decision day."""
+    previous_decision = ApprovalStep.objects.filter(
+        workflow=models.OuterRef('workflow'),
+        approval_level=models.OuterRef('approval_level') - 1,
+    ).values('action_date')[:1]
+
+    return (
+        ApprovalStep.objects
+        .filter(status__in=DECIDED_STATUSES, action_date__isnull=False)
+        .annotate(day=TruncDate('action_date'))
+        .filter(day__gte=since, day__lte=until)
+        .annotate(
+            started_at=Coalesce(
+                models.Subquery(previous_decision), 'assigned_at',
+                output_field=models.DateTimeField(),
+            ),
+        )
+        .annotate(
+            decision_time=models.ExpressionWrapper(
+                models.F('action_date') - models.F('started_at'),
+                output_field=models.DurationField(),
+            ),
+        )
+    )
+
+
+def rollup_approval_stats(since=None, until=None):
+    """
+    Rebuild ApprovalDailyStat rows for ``since``..``until`` (dates, inclusive).
+
+    Without ``since`` the rollup resumes from the last stored day, which is
+    recomputed because it may have been rolled up before it ended. Each run
+    is one grouped query plus a replace of the affected days.
+
+    Returns:
+        Number of rollup rows written
+    """
+    until = until or timezone.localdate()
+    if since is None:
+        last = ApprovalDailyStat.objects.aggregate(last=models.Max('date'))['last']
+        if last is None:
+            first = ApprovalStep.objects.filter(
+                status__in=DECIDED_STATUSES, action_date__isnull=False
+            ).aggregate(first=models.Min('action_date'))['first']
+            if first is None:
+                return 0
+            last = timezone.localtime(first).date()
+        since = last
+    if since > until:
+        return 0
+
+    buckets = {
+        f'le_{hours}': models.Count('id', filter=models.Q(decision_time__lte=timedelta(hours=hours)))
+        for hours in SLA_BUCKET_HOURS
+    }
+    groups = (
+        _decided_steps(since, until)
+        .values('day', 'workflow__app', 'workflow__request_type', 'approval_level')
+        .annotate(
+            decided=models.Count('id'),
+            approved=models.Count('id', filter=models.Q(status='approved')),
+            rejected=models.Count('id', filter=models.Q(status='rejected')),
+            skipped=models.Count('id', filter=models.Q(status='skipped')),
+            escalated=models.Count('id', filter=models.Q(is_escalated=True)),
+            total_time=models.Sum('decision_time'),
+            **buckets,
+        )
+        .order_by()
+    )
+
+    rows = [
+        ApprovalDailyStat(
+            date=group['day'],
+            app=group['workflow__app'],
+            request_type=group['workflow__request_type'],
+            approval_level=group['approval_level'],
+            decided_count=group['decided'],
+            approved_count=group['approved'],
+            rejected_count=group['rejected'],
+            skipped_count=group['skipped'],
+            escalated_count=group['escalated'],
+            total_decision_seconds=int(group['total_time'].total_seconds()) if group['total_time'] else 0,
+            decision_histogram=[group[f'le_{hours}'] for hours in SLA_BUCKET_HOURS],
+        )
+        for group in groups
+    ]
+
+    with transaction.atomic():
+        ApprovalDailyStat.objects.filter(date__gte=since, date__lte=until).delete()
+        ApprovalDailyStat.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+# =======================================================
+# METRICS
+# =======================================================
+
+def histogram_percentile(histogram, total, fraction):
+    """
+    Estimate a percentile (in hours) from a cumulative SLA histogram,
+    interpolating linearly inside the bucket it falls in. Decisions slower
+    than the last bucket are reported as that bucket's bound.
+    """
+    if not total:
+        return None
+    target = total * fraction
+    lower_hours, lower_count = 0, 0
+    for hours, count in zip(SLA_BUCKET_HOURS, histogram):
+        if count >= target:
+            if count == lower_count:
+                return float(hours)
+            share = (target - lower_count) / (count - lower_count)
+            return round(lower_hours + share * (hours - lower_hours), 2)
+        lower_hours, lower_count = hours, count
+    return float(SLA_BUCKET_HOURS[-1])
+
+
+def get_sla_metrics(date_from, date_to, app=None, request_type=None):
+    """
+    SLA metrics for decisions between ``date_from`` and ``date_to``, read from
+    the daily rollups.
+
+    Returns:
+        Dict with ``by_level`` (per app/request_type/level counts, average,
+        median and p90 hours) and ``per_day`` throughput.
+    """
+    stats = ApprovalDailyStat.objects.filter(date__gte=date_from, date__lte=date_to)
+    if app:
+        stats = stats.filter(app=app)
+    if request_type:
+        stats = stats.filter(request_type=request_type)
+
+    by_level = {}
+    for stat in stats.order_by('app', 'request_type', 'approval_level'):
+        key = (stat.app, stat.request_type, stat.approval_level)
+        entry = by_level.setdefault(key, {
+            'app': stat.app,
+            'request_type': stat.request_type,
+            'approval_level': stat.approval_level,
+            'decided': 0, 'approved': 0, 'rejected': 0, 'skipped': 0, 'escalated': 0,
+            'seconds': 0, 'histogram': [0] * len(SLA_BUCKET_HOURS),
+        })
+        entry['decided'] += stat.decided_count
+        entry['approved'] += stat.approved_count
+        entry['rejected'] += stat.rejected_count
+        entry['skipped'] += stat.skipped_count
+        entry['escalated'] += stat.escalated_count
+        entry['seconds'] += stat.total_decision_seconds
+        for i, count in enumerate(stat.decision_histogram[:len(SLA_BUCKET_HOURS)]):
+            entry['histogram'][i] += count
+
+    levels = []
+    for entry in by_level.values():
+        decided = entry['decided']
+        histogram = entry.pop('histogram')
+        seconds = entry.pop('seconds')
+        entry['avg_hours'] = round(seconds / decided / 3600, 2) if decided else None
+        entry['median_hours'] = histogram_percentile(histogram, decided, 0.5)
+        entry['p90_hours'] = histogram_percentile(histogram, decided, 0.9)
+        levels.append(entry)
+
+    per_day = [
+        {
+            'date': row['date'].isoformat(),
+            'decided': row['decided'],
+            'approved': row['approved'],
+            'rejected': row['rejected'],
+        }
+        for row in stats.values('date').annotate(
+            decided=models.Sum('decided_count'),
+            approved=models.Sum('approved_count'),
+            rejected=models.Sum('rejected_count'),
+        ).order_by('date')
+    ]
+
+    return {'by_level': levels, 'per_day': per_day}
+
+
+def get_queue_depth(app=None, request_type=None, limit=50):
+    """
+    Pending current-level steps per approver, deepest queue first.
+    Uses the (assigned_to, status, approval_level) inbox index.
+    """
+    now = timezone.now()
+    steps = ApprovalStep.objects.filter(
+        status='pending',
+        approval_level=models.F('workflow__current_approval_level'),
+        workflow__current_status__in=('submitted', 'pending'),
+    )
+    if app:
+        steps = steps.filter(workflow__app=app)
+    if request_type:
+        steps = steps.filter(workflow__request_type=request_type)
+
+    rows = (
+        steps.values('assigned_to_id', 'assigned_to__full_name')
+        .annotate(
+            pending=models.Count('id'),
+            overdue=models.Count('id', filter=models.Q(due_date__lt=now)),
+            oldest_due=models.Min('due_date'),
+        )
+        .order_by('-pending', 'assigned_to_id')[:limit]
+    )
+    return [
+        {
+            'employee_id': row['assigned_to_id'],
+            'employee': row['assigned_to__full_name'],
+            'pending': row['pending'],
+            'overdue': row['overdue'],
+            'oldest_due': row['oldest_due'].isoformat() if row['oldest_due'] else None,
+        }
+        for row in rows
+    ]
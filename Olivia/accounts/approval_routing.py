@@ -0,0 +1,190 @@
+"""
+Compiled Approval Routing Table
+In-memory lookup of approval authorities and their approvers, so submitting
+a request does not re-query ApprovalAuthority / ApproverAssignment each time.
+
+The table is built with two queries and keyed by (app, request_type,
+department). Amount-bounded authorities are kept sorted by min_amount so the
+applicable ones are found by bisection. Any change to ApprovalAuthority or
+ApproverAssignment bumps a version number in the shared cache once the
+change commits (see accounts/signals.py), and every process rebuilds its
+copy on next use.
+A copy is also rebuilt once it is ROUTING_TABLE_MAX_AGE seconds old, in
+case a bump is lost (cache eviction or a write outside the signals).
+On the database cache reading the version is itself a query, so a process
+only re-reads it every ROUTING_VERSION_POLL_INTERVAL seconds: changes made
+in the process apply at once, changes made elsewhere within the interval.
+"""
+import threading
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Optional
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from utils.cache import database_cache
+
+from .models import ApprovalAuthority, ApproverAssignment
+
+
+ROUTING_VERSION_CACHE_KEY = 'approvals:routing_version'
+ROUTING_TABLE_MAX_AGE = 60
+ROUTING_VERSION_POLL_INTERVAL = 5
+
+_NO_MIN = Decimal('-Infinity')
+_NO_MAX = Decimal('Infinity')
+
+
+@dataclass
+class ApproverChoice:
+    employee_id: int
+    delegate_id: Optional[int] = None
+    delegation_start: Optional[object] = None
+    delegation_end: Optional[object] = None
+
+    def resolve(self, today):
+        """Return the delegate while a delegation window is active, else the approver."""
+        if self.delegate_id and self.delegation_start and self.delegation_end:
+            if self.delegation_start <= today <= self.delegation_end:
+                return self.delegate_id
+        return self.employee_id
+
+
+@dataclass
+class RouteEntry:
+    authority: ApprovalAuthority
+    min_amount: Decimal
+    max_amount: Decimal
+    primary: Optional[ApproverChoice] = None
+    backup: Optional[ApproverChoice] = None
+
+    def approver_id(self, today):
+        """Same priority as get_approver_for_authority: primary, then backup."""
+        choice = self.primary or self.backup
+        return choice.resolve(today) if choice else None
+
+
+@dataclass
+class RouteBucket:
+    """Entries for one (app, request_type, department) key, sorted by min_amount."""
+    entries: list = field(default_factory=list)
+    mins: list = field(default_factory=list)
+
+    def matching(self, amount):
+        if amount is None:
+            return list(self.entries)
+        amount = Decimal(str(amount))
+        candidates = self.entries[:bisect_right(self.mins, amount)]
+        return [entry for entry in candidates if entry.max_amount >= amount]
+
+
+class RoutingTable:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.by_authority = {
+            entry.authority.pk: entry for bucket in buckets.values() for entry in bucket.entries
+        }
+
+    @classmethod
+    def build(cls):
+        entries = {}
+        for authority in ApprovalAuthority.objects.filter(is_required=True):
+            entries[authority.pk] = RouteEntry(
+                authority=authority,
+                min_amount=authority.min_amount if authority.min_amount is not None else _NO_MIN,
+                max_amount=authority.max_amount if authority.max_amount is not None else _NO_MAX,
+            )
+
+        # Meta ordering puts primaries first, matching get_approver_for_authority
+        assignments = ApproverAssignment.objects.filter(
+            is_active=True, approval_authority_id__in=list(entries)
+        ).values_list(
+            'approval_authority_id', 'employee_id', 'is_primary', 'is_backup',
+            'delegate_to_id', 'delegation_start', 'delegation_end',
+        )
+        for authority_id, employee_id, is_primary, is_backup, delegate_id, start, end in assignments:
+            entry = entries[authority_id]
+            choice = ApproverChoice(employee_id, delegate_id, start, end)
+            if is_primary and entry.primary is None:
+                entry.primary = choice
+            elif is_backup and entry.backup is None:
+                entry.backup = choice
+
+        buckets = defaultdict(RouteBucket)
+        for entry in sorted(entries.values(), key=lambda e: e.min_amount):
+            authority = entry.authority
+            bucket = buckets[(authority.app, authority.request_type, authority.department.lower())]
+            bucket.entries.append(entry)
+            bucket.mins.append(entry.min_amount)
+        return cls(dict(buckets))
+
+    def route(self, app, request_type, department=None, amount=None):
+        """
+        Applicable route entries ordered by approval level.
+
+        Mirrors get_approval_authorities: department-wide authorities (blank
+        department) always apply, department-specific ones only to that department.
+        """
+        matched = []
+        bucket = self.buckets.get((app, request_type, ''))
+        if bucket:
+            matched.extend(bucket.matching(amount))
+        if department:
+            bucket = self.buckets.get((app, request_type, department.lower()))
+            if bucket:
+                matched.extend(bucket.matching(amount))
+        return sorted(matched, key=lambda entry: entry.authority.approval_level)
+
+    def approver_ids(self, entries, today=None):
+        today = today or timezone.now().date()
+        return [entry.approver_id(today) for entry in entries]
+
+
+_lock = threading.Lock()
+_table = None
+_table_version = None
+_table_built_at = 0.0
+_version_read_at = 0.0
+
+
+def _current_version():
+    global _version_read_at
+    now = time.monotonic()
+    if _table is not None and database_cache() and now - _version_read_at < ROUTING_VERSION_POLL_INTERVAL:
+        return _table_version
+    _version_read_at = now
+    return cache.get(ROUTING_VERSION_CACHE_KEY, 0)
+
+
+def _stale(version):
+    return (
+        _table is None or version != _table_version
+        or time.monotonic() - _table_built_at >= ROUTING_TABLE_MAX_AGE
+    )
+
+
+def get_routing_table():
+    """Return this process's routing table, rebuilding it if the shared version moved or it aged out."""
+    global _table, _table_version, _table_built_at
+    version = _current_version()
+    if _stale(version):
+        with _lock:
+            if _stale(version):
+                _table = RoutingTable.build()
+                _table_version = version
+                _table_built_at = time.monotonic()
+    return _table
+
+
+def invalidate_routing_table():
+    """Force every process to rebuild its routing table on next use."""
+    global _table
+    try:
+        cache.incr(ROUTING_VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(ROUTING_VERSION_CACHE_KEY, 1, None)
+    _table = None
@@ -0,0 +1,236 @@
+"""
+Approval Sweeper
+Acts on overdue approval steps: auto-approves, skips or escalates them
+according to their ApprovalAuthority. Run it from the sweep_approvals
+management command, e.g. every minute from cron, or with --loop.
+
+Each batch is one indexed range query on (status, due_date), written back
+with bulk_update / bulk_create in its own transaction. Every handled step
+leaves the overdue set, so re-running a sweep is safe. A step with nobody
+to escalate to stays unescalated with its due date moved ESCALATION_RETRY
+ahead, so a later sweep tries again once a backup or next approver exists.
+
+Steps that were pending before due dates were stamped have none, so the
+sweep never sees them; backfill_due_dates() (sweep_approvals --backfill)
+gives them one counted from when their level became current.
+"""
+import time
+from datetime import timedelta
+
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from .approval_routing import get_routing_table
+from .approval_utils import advance_workflow, get_step_due_date, invalidate_pending_counts, start_current_levels
+from .models import ApprovalLog, ApprovalStep, ApprovalWorkflow
+
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_MAX_SECONDS = 50
+ESCALATION_RETRY = timedelta(hours=24)
+
+
+def _overdue_steps(now, batch_size):
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    return list(
+        ApprovalStep.objects.select_for_update(skip_locked=skip_locked, of=('self', 'workflow'))
+        .filter(
+            status='pending',
+            due_date__lte=now,
+            is_escalated=False,
+            approval_level=models.F('workflow__current_approval_level'),
+            workflow__current_status__in=('submitted', 'pending'),
+        )
+        .select_related('workflow', 'approval_authority')
+        .order_by('due_date', 'id')[:batch_size]
+    )
+
+
+def _escalation_targets(steps, today):
+    """Next level's approver if there is one, else the authority's backup or delegate."""
+    next_level = dict(
+        ApprovalStep.objects.filter(
+            workflow_id__in=[step.workflow_id for step in steps],
+            approval_level=models.F('workflow__current_approval_level') + 1,
+        ).values_list('workflow_id', 'assigned_to_id')
+    )
+    routing = get_routing_table()
+
+    targets = {}
+    for step in steps:
+        candidates = [next_level.get(step.workflow_id)]
+        entry = routing.by_authority.get(step.approval_authority_id)
+        if entry:
+            if entry.backup:
+                candidates.append(entry.backup.resolve(today))
+            if entry.primary:
+                candidates.append(entry.primary.resolve(today))
+        targets[step.pk] = next(
+            (pk for pk in candidates if pk and pk != step.assigned_to_id), None
+        )
+    return targets
+
+
+def _sweep_batch(now, batch_size, summary):
+    with transaction.atomic():
+        steps = _overdue_steps(now, batch_size)
+        if not steps:
+            return 0
+
+        escalate = [
+            step for step in steps
+            if step.approval_authority.auto_approve_after_days is None
+            and not step.approval_authority.can_skip_if_unavailable
+        ]
+        targets = _escalation_targets(escalate, now.date()) if escalate else {}
+
+        workflows, advanced, logs, touched_employees = [], [], [], set()
+        for step in steps:
+            authority = step.approval_authority
+            workflow = step.workflow
+            previous_status = workflow.current_status
+            touched_employees.add(step.assigned_to_id)
+
+            if step.pk in targets:
+                target = targets.get(step.pk)
+                reason = f"No decision by {step.due_date:%Y-%m-%d %H:%M}"
+                if target is None:
+                    step.due_date = now + ESCALATION_RETRY
+                    logs.append(ApprovalLog(
+                        workflow=workflow, approval_step=step, action='commented',
+                        previous_status=previous_status, new_status=previous_status,
+                        comments=f"{reason}; no escalation target, retrying after {step.due_date:%Y-%m-%d %H:%M}",
+                    ))
+                    summary['unescalated'] += 1
+                    continue
+                step.is_escalated = True
+                step.escalated_to_id = target
+                step.escalation_reason = reason
+                step.assigned_to_id = target
+                touched_employees.add(target)
+                logs.append(ApprovalLog(
+                    workflow=workflow, approval_step=step, action='escalated',
+                    previous_status=previous_status, new_status=previous_status,
+                    comments=reason,
+                ))
+                summary['escalated'] += 1
+                continue
+
+            if authority.auto_approve_after_days is not None:
+                step.status = 'approved'
+                step.comments = f"Auto-approved after {authority.auto_approve_after_days} day(s) without a decision"
+                action = 'approved'
+                summary['auto_approved'] += 1
+            else:
+                step.status = 'skipped'
+                step.comments = 'Skipped: approver unavailable'
+                action = 'skipped'
+                summary['skipped'] += 1
+            step.action_date = now
+
+            if advance_workflow(workflow, step.approval_level, now):
+                advanced.append(workflow.pk)
+            workflows.append(workflow)
+            logs.append(ApprovalLog(
+                workflow=workflow, approval_step=step, action=action,
+                previous_status=previous_status, new_status=workflow.current_status,
+                comments=step.comments,
+            ))
+
+        ApprovalStep.objects.bulk_update(steps, [
+            'status', 'action_date', 'comments', 'assigned_to', 'due_date',
+            'is_escalated', 'escalated_to', 'escalation_reason',
+        ])
+        if workflows:
+            ApprovalWorkflow.objects.bulk_update(
+                workflows, ['current_status', 'current_approval_level', 'completed_at', 'updated_at']
+            )
+        if advanced:
+            start_current_levels(advanced, now)
+        ApprovalLog.objects.bulk_create(logs)
+
+    if advanced:
+        touched_employees.update(
+            ApprovalStep.objects.filter(
+                workflow_id__in=advanced,
+                approval_level=models.F('workflow__current_approval_level'),
+            ).values_list('assigned_to_id', flat=True)
+        )
+    invalidate_pending_counts(touched_employees)
+    return len(steps)
+
+
+def backfill_due_dates(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Stamp due dates on current-level pending steps that have none.
+
+    A level counts from the previous level's decision, or from submission
+    for level 1. Steps whose authority sets no deadline keep NULL.
+
+    Returns:
+        Number of steps given a due date
+    """
+    updated, last_id = 0, 0
+    while True:
+        steps = list(
+            ApprovalStep.objects.filter(
+                pk__gt=last_id,
+                status='pending',
+                due_date__isnull=True,
+                approval_level=models.F('workflow__current_approval_level'),
+                workflow__current_status__in=('submitted', 'pending'),
+            )
+            .select_related('workflow', 'approval_authority')
+            .order_by('id')[:batch_size]
+        )
+        if not steps:
+            return updated
+        last_id = steps[-1].pk
+
+        decided = dict(
+            ApprovalStep.objects.filter(
+                workflow_id__in=[step.workflow_id for step in steps],
+                approval_level=models.F('workflow__current_approval_level') - 1,
+            ).values_list('workflow_id', 'action_date')
+        )
+        stamped = []
+        for step in steps:
+            start = decided.get(step.workflow_id) or step.workflow.submitted_at or step.assigned_at
+            step.due_date = get_step_due_date(step.approval_authority, start)
+            if step.due_date is not None:
+                stamped.append(step)
+        if stamped:
+            ApprovalStep.objects.bulk_update(stamped, ['due_date'])
+            updated += len(stamped)
+
+
+def sweep_overdue_steps(now=None, batch_size=DEFAULT_BATCH_SIZE, max_seconds=DEFAULT_MAX_SECONDS):
+    """
+    Handle overdue approval steps in batches until none remain or time runs out.
+
+    Args:
+        now: Reference time (defaults to now)
+        batch_size: Steps handled per transaction
+        max_seconds: Stop starting new batches after this long
+
+    Returns:
+        Dict with auto_approved / skipped / escalated / unescalated (no target,
+        retried later) / batches counts and timed_out
+    """
+    now = now or timezone.now()
+    summary = {
+        'auto_approved': 0, 'skipped': 0, 'escalated': 0, 'unescalated': 0, 'batches': 0, 'timed_out': False,
+    }
+    started = time.monotonic()
+
+    while True:
+        if time.monotonic() - started >= max_seconds:
+            summary['timed_out'] = True
+            break
+        handled = _sweep_batch(now, batch_size, summary)
+        if handled:
+            summary['batches'] += 1
+        if handled < batch_size:
+            break
+
+    return summary
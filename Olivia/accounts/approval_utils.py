@@ -2,20 +2,98 @@
 Approval Workflow Utility Functions
 Helper functions to manage approval workflows across the system
 """
+from datetime import timedelta
+
+from django.conf import settings
 from django.utils import timezone
-from django.db import models
+from django.db import models, transaction
+from django.core.cache import cache
 from django.contrib.contenttypes.models import ContentType
 from .models import (
     ApprovalAuthority, ApproverAssignment, ApprovalWorkflow, 
     ApprovalStep, ApprovalLog
 )
-from HumanResource.models import Employee
+from .approval_routing import get_routing_table
+from utils.cache import shared_memory_cache
+from HumanResource.models import Employee, Manager
+
+
+# Per-employee pending approval counts (inbox badge), invalidated on every decision
+PENDING_COUNT_CACHE_KEY = 'approvals:pending_count:{employee_id}'
+PENDING_COUNT_CACHE_TIMEOUT = 60 * 10
+
+# Days a level may wait before the sweeper escalates it, when the authority
+# has no auto_approve_after_days of its own. None (the default) disables escalation.
+DEFAULT_ESCALATION_DAYS = getattr(settings, 'APPROVAL_ESCALATION_DAYS', None)
+# Days before the sweeper skips a level whose authority has can_skip_if_unavailable
+DEFAULT_SKIP_DAYS = getattr(settings, 'APPROVAL_SKIP_AFTER_DAYS', 3)
+
+
+def get_step_due_date(authority, start):
+    """
+    When a step that becomes current at ``start`` is considered overdue.
+    
+    Args:
+        authority: ApprovalAuthority of the step
+        start: Datetime the step's level became current
+    
+    Returns:
+        Datetime or None
+    """
+    days = authority.auto_approve_after_days
+    if days is None:
+        days = DEFAULT_SKIP_DAYS if authority.can_skip_if_unavailable else DEFAULT_ESCALATION_DAYS
+    if days is None:
+        return None
+    return start + timedelta(days=days)
+
+
+def start_current_levels(workflow_ids, now=None):
+    """
+    Stamp due dates on the steps that just became current in the given workflows.
+    
+    Args:
+        workflow_ids: IDs of ApprovalWorkflow instances that moved to a new level
+        now: Datetime the levels started (defaults to now)
+    """
+    now = now or timezone.now()
+    steps = list(ApprovalStep.objects.filter(
+        workflow_id__in=list(workflow_ids),
+        status='pending',
+        approval_level=models.F('workflow__current_approval_level')
+    ).select_related('approval_authority'))
+    for step in steps:
+        step.due_date = get_step_due_date(step.approval_authority, now)
+    if steps:
+        ApprovalStep.objects.bulk_update(steps, ['due_date'])
+
+
+def advance_workflow(workflow, approval_level, now):
+    """
+    Move a workflow past an approved (or skipped) level, without saving it.
+    
+    Returns:
+        True if the workflow moved to a new pending level, False if it completed
+    """
+    workflow.updated_at = now
+    if approval_level >= workflow.total_approval_levels:
+        # Final approval
+        workflow.current_status = 'approved'
+        workflow.completed_at = now
+        return False
+    # Move to next level
+    workflow.current_approval_level = approval_level + 1
+    workflow.current_status = 'pending'
+    return True
 
 
 def initiate_approval_workflow(request_object, app, request_type, requestor, title, amount=None, urgency='medium'):
     """
     Initialize an approval workflow for any request object.
     
+    Authorities and approvers come from the compiled routing table, and the
+    approval steps are created with a single bulk_create.
+    
     Args:
         request_object: The Django model instance requiring approval
         app: App name (e.g., 'humanresource', 'logistics')
@@ -31,59 +109,93 @@ def initiate_approval_workflow(request_object, app, request_type, requestor, tit
     content_type = ContentType.objects.get_for_model(request_object)
     
     # Get applicable approval authorities
-    authorities = get_approval_authorities(
+    routing = get_routing_table()
+    routes = routing.route(
         app=app,
         request_type=request_type,
         department=requestor.department,
         amount=amount
     )
     
-    if not authorities:
+    if not routes:
         raise ValueError(f"No approval authorities configured for {app}.{request_type}")
     
-    # Create workflow
-    workflow = ApprovalWorkflow.objects.create(
-        content_type=content_type,
-        object_id=request_object.pk,
-        app=app,
-        request_type=request_type,
-        request_title=title,
-        request_amount=amount,
-        requestor=requestor,
-        requestor_department=requestor.department,
-        current_status='submitted',
-        current_approval_level=1,
-        total_approval_levels=len(authorities),
-        submitted_at=timezone.now(),
-        urgency=urgency
-    )
-    
-    # Create approval steps
-    for authority in authorities:
-        # Find the appropriate approver
-        approver = get_approver_for_authority(authority, requestor)
+    # Find the appropriate approvers; Level 1 goes to the direct manager first
+    approver_ids = routing.approver_ids(routes)
+    if routes[0].authority.approval_level == 1:
+        manager_id = get_manager_employee_id(requestor)
+        if manager_id:
+            approver_ids[0] = manager_id
+    
+    now = timezone.now()
+    with transaction.atomic():
+        # Create workflow
+        workflow = ApprovalWorkflow.objects.create(
+            content_type=content_type,
+            object_id=request_object.pk,
+            app=app,
+            request_type=request_type,
+            request_title=title,
+            request_amount=amount,
+            requestor=requestor,
+            requestor_department=requestor.department,
+            current_status='submitted',
+            current_approval_level=1,
+            total_approval_levels=len(routes),
+            submitted_at=now,
+            urgency=urgency
+        )
         
-        if approver:
-            ApprovalStep.objects.create(
+        # Create approval steps
+        ApprovalStep.objects.bulk_create([
+            ApprovalStep(
                 workflow=workflow,
-                approval_level=authority.approval_level,
-                approval_authority=authority,
-                assigned_to=approver,
-                status='pending' if authority.approval_level == 1 else 'pending'
+                approval_level=route.authority.approval_level,
+                approval_authority=route.authority,
+                assigned_to_id=approver_id,
+                status='pending',
+                due_date=get_step_due_date(route.authority, now) if route.authority.approval_level == 1 else None,
             )
+            for route, approver_id in zip(routes, approver_ids)
+            if approver_id
+        ])
+        
+        # Log submission
+        ApprovalLog.objects.create(
+            workflow=workflow,
+            action='submitted',
+            actor=requestor.user if hasattr(requestor, 'user') else None,
+            new_status='submitted',
+            comments=f"Workflow initiated for {title}"
+        )
     
-    # Log submission
-    ApprovalLog.objects.create(
-        workflow=workflow,
-        action='submitted',
-        actor=requestor.user if hasattr(requestor, 'user') else None,
-        new_status='submitted',
-        comments=f"Workflow initiated for {title}"
-    )
+    invalidate_pending_counts([
+        approver_id for route, approver_id in zip(routes, approver_ids)
+        if route.authority.approval_level == 1
+    ])
     
     return workflow
 
 
+def get_manager_employee_id(requestor):
+    """
+    Employee ID of the requestor's direct manager, if the manager has an Employee record.
+    
+    Employee.manager points at HumanResource.Manager; the two are matched by staff ID.
+    
+    Args:
+        requestor: Employee instance
+    
+    Returns:
+        int or None
+    """
+    if not requestor.manager_id:
+        return None
+    return Employee.objects.filter(
+        staffid=models.Subquery(Manager.objects.filter(pk=requestor.manager_id).values('staffid')[:1])
+    ).values_list('pk', flat=True).first()
+
+
 def get_approval_authorities(app, request_type, department=None, amount=None):
     """
     Get applicable approval authorities based on request parameters.
@@ -139,8 +251,10 @@ def get_approver_for_authority(authority, requestor):
         Employee instance or None
     """
     # Level 1: Try direct manager first
-    if authority.approval_level == 1 and requestor.manager:
-        return requestor.manager
+    if authority.approval_level == 1:
+        manager_id = get_manager_employee_id(requestor)
+        if manager_id:
+            return Employee.objects.get(pk=manager_id)
     
     # Check assigned approvers
     assignments = ApproverAssignment.objects.filter(
@@ -203,16 +317,16 @@ def approve_step(workflow_id, approval_level, approver, comments=''):
     )
     
     # Update workflow
-    if approval_level >= workflow.total_approval_levels:
-        # Final approval
-        workflow.current_status = 'approved'
-        workflow.completed_at = timezone.now()
+    if advance_workflow(workflow, approval_level, timezone.now()):
+        workflow.save()
+        start_current_levels([workflow.pk])
     else:
-        # Move to next level
-        workflow.current_approval_level = approval_level + 1
-        workflow.current_status = 'pending'
+        workflow.save()
     
-    workflow.save()
+    # The approver's queue shrinks and the next level's approver gains an item
+    invalidate_pending_counts(
+        ApprovalStep.objects.filter(workflow=workflow).values_list('assigned_to_id', flat=True)
+    )
     
     return workflow
 
@@ -256,12 +370,19 @@ def reject_step(workflow_id, approval_level, approver, reason=''):
     workflow.completed_at = timezone.now()
     workflow.save()
     
+    invalidate_pending_counts([step.assigned_to_id])
+    
     return workflow
 
 
 def get_pending_approvals_for_employee(employee):
     """
-    Get all pending approval steps assigned to an employee.
+    Get the approval steps currently waiting on an employee.
+    
+    Only steps at their workflow's current level are returned (later levels
+    stay 'pending' until reached), including freshly submitted workflows.
+    Workflow, requestor and authority are joined in the same query, and the
+    filter is served by the (assigned_to, status, approval_level) index.
     
     Args:
         employee: Employee instance
@@ -272,8 +393,59 @@ def get_pending_approvals_for_employee(employee):
     return ApprovalStep.objects.filter(
         assigned_to=employee,
         status='pending',
-        workflow__current_status='pending'
-    ).select_related('workflow', 'approval_authority').order_by('-workflow__urgency', '-workflow__submitted_at')
+        approval_level=models.F('workflow__current_approval_level'),
+        workflow__current_status__in=['submitted', 'pending']
+    ).select_related(
+        'workflow', 'workflow__requestor', 'approval_authority'
+    ).order_by('-assigned_at', '-id')
+
+
+def get_pending_count_for_employee(employee):
+    """
+    Number of approvals waiting on an employee, cached for the inbox badge.
+    
+    Args:
+        employee: Employee instance
+    
+    Returns:
+        int
+    """
+    if not shared_memory_cache():
+        # A per-process cache would keep serving counts other workers invalidated,
+        # and a database cache hit costs as much as the count
+        return get_pending_approvals_for_employee(employee).count()
+    key = PENDING_COUNT_CACHE_KEY.format(employee_id=employee.pk)
+    count = cache.get(key)
+    if count is None:
+        count = get_pending_approvals_for_employee(employee).count()
+        cache.set(key, count, PENDING_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def invalidate_pending_counts(employee_ids):
+    """Drop cached pending counts for the given employee IDs."""
+    keys = [PENDING_COUNT_CACHE_KEY.format(employee_id=pk) for pk in set(employee_ids) if pk]
+    if keys and shared_memory_cache():
+        cache.delete_many(keys)
+
+
+def get_employee_for_user(user):
+    """
+    Resolve the Employee record for a logged-in user.
+    
+    Only the link an administrator set on the user's profile counts. Username
+    and email are chosen at self-registration, so matching on them would let
+    anyone act as an approver.
+    
+    Args:
+        user: User instance
+    
+    Returns:
+        Employee instance or None
+    """
+    if not user.is_authenticated:
+        return None
+    return Employee.objects.filter(profile__user=user).first()
 
 
 def get_approval_history_for_request(request_object):
@@ -298,6 +470,16 @@ def get_approval_history_for_request(request_object):
         return ApprovalLog.objects.none()
 
 
+def _is_step_actionable(step, employee):
+    """Eligibility rule shared by single and bulk decisions (step.workflow must be loaded)."""
+    return (
+        step.assigned_to_id == employee.pk and
+        step.status == 'pending' and
+        step.workflow.current_approval_level == step.approval_level and
+        step.workflow.current_status in ('submitted', 'pending')
+    )
+
+
 def can_employee_approve(employee, workflow_id, approval_level):
     """
     Check if an employee can approve a specific step.
@@ -311,14 +493,105 @@ def can_employee_approve(employee, workflow_id, approval_level):
         Boolean
     """
     try:
-        step = ApprovalStep.objects.get(
+        step = ApprovalStep.objects.select_related('workflow').get(
             workflow_id=workflow_id,
             approval_level=approval_level
         )
-        return (
-            step.assigned_to == employee and 
-            step.status == 'pending' and
-            step.workflow.current_approval_level == approval_level
-        )
+        return _is_step_actionable(step, employee)
     except ApprovalStep.DoesNotExist:
         return False
+
+
+def bulk_decide_steps(step_ids, approver, decision, comments='', actor=None, ip_address=None, user_agent=''):
+    """
+    Approve or reject many approval steps at once.
+    
+    All steps are locked and loaded with their workflows in one query,
+    checked with the same rule as can_employee_approve, then written back
+    with bulk_update; the ApprovalLog rows go in with one bulk_create.
+    Everything happens in a single transaction.
+    
+    Args:
+        step_ids: IDs of ApprovalStep instances
+        approver: Employee instance making the decision
+        decision: 'approve' or 'reject'
+        comments: Comments (or rejection reason) applied to every step
+        actor: User recorded on the log entries
+        ip_address: Client IP recorded on the log entries
+        user_agent: Client user agent recorded on the log entries
+    
+    Returns:
+        Dict of step_id -> {'success': bool, 'workflow_status' or 'error': str}
+    """
+    if decision not in ('approve', 'reject'):
+        raise ValueError("decision must be 'approve' or 'reject'")
+    
+    step_ids = list(dict.fromkeys(int(pk) for pk in step_ids))
+    results = {}
+    now = timezone.now()
+    
+    with transaction.atomic():
+        steps = {
+            step.pk: step
+            for step in ApprovalStep.objects.select_for_update().select_related('workflow').filter(pk__in=step_ids)
+        }
+        
+        decided_steps, workflows, logs = [], [], []
+        for step_id in step_ids:
+            step = steps.get(step_id)
+            if step is None:
+                results[step_id] = {'success': False, 'error': 'Approval step not found'}
+                continue
+            if not _is_step_actionable(step, approver):
+                results[step_id] = {'success': False, 'error': 'Not eligible to decide this step'}
+                continue
+            
+            workflow = step.workflow
+            previous_status = workflow.current_status
+            
+            step.status = 'approved' if decision == 'approve' else 'rejected'
+            step.approved_by = approver
+            step.action_date = now
+            step.comments = comments
+            
+            if decision == 'reject':
+                workflow.current_status = 'rejected'
+                workflow.completed_at = now
+                workflow.updated_at = now
+            else:
+                advance_workflow(workflow, step.approval_level, now)
+            
+            decided_steps.append(step)
+            workflows.append(workflow)
+            logs.append(ApprovalLog(
+                workflow=workflow,
+                approval_step=step,
+                action='approved' if decision == 'approve' else 'rejected',
+                actor=actor,
+                previous_status=previous_status,
+                new_status=workflow.current_status,
+                comments=comments,
+                ip_address=ip_address,
+                user_agent=user_agent,
+            ))
+            results[step_id] = {'success': True, 'workflow_status': workflow.current_status}
+        
+        if decided_steps:
+            ApprovalStep.objects.bulk_update(decided_steps, ['status', 'approved_by', 'action_date', 'comments'])
+            ApprovalWorkflow.objects.bulk_update(
+                workflows, ['current_status', 'current_approval_level', 'completed_at', 'updated_at']
+            )
+            start_current_levels([w.pk for w in workflows if w.current_status == 'pending'], now)
+            ApprovalLog.objects.bulk_create(logs)
+    
+    if decided_steps:
+        # The approver's queue shrinks; advanced workflows land in the next approver's queue
+        invalidate_pending_counts(
+            ApprovalStep.objects.filter(
+                workflow__in=[w.pk for w in workflows if w.current_status == 'pending'],
+                approval_level=models.F('workflow__current_approval_level')
+            ).values_list('assigned_to_id', flat=True)
+        )
+        invalidate_pending_counts([approver.pk])
+    
+    return results
@@ -0,0 +1,177 @@
+"""
+Approval Workflow API Views
+JSON endpoints for approvers: inbox, pending-count badge, bulk decisions
+"""
+import json
+from datetime import date, timedelta
+
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.http import JsonResponse, HttpResponseBadRequest
+from django.utils import timezone
+from django.views.decorators.http import require_http_methods
+
+from .approval_analytics import get_queue_depth, get_sla_metrics
+from .approval_utils import (
+    bulk_decide_steps, get_employee_for_user, get_pending_approvals_for_employee,
+    get_pending_count_for_employee
+)
+from utils.pagination import keyset_paginate, get_page_size
+
+
+BULK_DECISION_LIMIT = 500
+METRICS_DEFAULT_DAYS = 30
+METRICS_MAX_DAYS = 366
+
+
+def _serialize_step(step, now):
+    workflow = step.workflow
+    return {
+        'id': step.id,
+        'workflow_id': workflow.id,
+        'approval_level': step.approval_level,
+        'total_approval_levels': workflow.total_approval_levels,
+        'app': workflow.app,
+        'request_type': workflow.request_type,
+        'request_title': workflow.request_title,
+        'request_amount': float(workflow.request_amount) if workflow.request_amount is not None else None,
+        'urgency': workflow.urgency,
+        'requestor': workflow.requestor.full_name,
+        'requestor_department': workflow.requestor_department,
+        'authority': str(step.approval_authority),
+        'assigned_at': step.assigned_at.isoformat(),
+        'due_date': step.due_date.isoformat() if step.due_date else None,
+        'is_overdue': bool(step.due_date and step.due_date < now),
+        'submitted_at': workflow.submitted_at.isoformat() if workflow.submitted_at else None,
+    }
+
+
+@login_required
+@require_http_methods(["GET"])
+def approval_inbox(request):
+    """
+    Approvals waiting on the current user, newest first, one keyset page at a time.
+
+    Filters: urgency, app, request_type, overdue=1. Pass the returned
+    ``next_cursor`` back as ``cursor`` for the next page.
+    """
+    employee = get_employee_for_user(request.user)
+    if employee is None:
+        return JsonResponse({'error': 'No employee record is linked to this user'}, status=403)
+
+    try:
+        steps = get_pending_approvals_for_employee(employee)
+        now = timezone.now()
+
+        urgency = request.GET.get('urgency')
+        if urgency:
+            steps = steps.filter(workflow__urgency=urgency)
+        app = request.GET.get('app')
+        if app:
+            steps = steps.filter(workflow__app=app)
+        request_type = request.GET.get('request_type')
+        if request_type:
+            steps = steps.filter(workflow__request_type=request_type)
+        if request.GET.get('overdue') in ('1', 'true'):
+            steps = steps.filter(due_date__lt=now)
+
+        page, next_cursor = keyset_paginate(
+            steps, ['-assigned_at', '-id'],
+            cursor=request.GET.get('cursor'),
+            page_size=get_page_size(request),
+        )
+
+        return JsonResponse({
+            'data': [_serialize_step(step, now) for step in page],
+            'next_cursor': next_cursor,
+            'pending_count': get_pending_count_for_employee(employee),
+        })
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+
+@login_required
+@require_http_methods(["GET"])
+def approval_pending_count(request):
+    """Cached number of approvals waiting on the current user (inbox badge)."""
+    employee = get_employee_for_user(request.user)
+    if employee is None:
+        return JsonResponse({'count': 0})
+    return JsonResponse({'count': get_pending_count_for_employee(employee)})
+
+
+@login_required
+@require_http_methods(["POST"])
+def approval_bulk_decision(request):
+    """
+    Approve or reject many steps at once.
+
+    Body: {"step_ids": [...], "decision": "approve"|"reject", "comments": ""}
+    Returns a per-step result map.
+    """
+    employee = get_employee_for_user(request.user)
+    if employee is None:
+        return JsonResponse({'error': 'No employee record is linked to this user'}, status=403)
+
+    try:
+        payload = json.loads(request.body.decode())
+    except Exception:
+        return HttpResponseBadRequest('Invalid JSON payload')
+
+    step_ids = payload.get('step_ids') or []
+    decision = payload.get('decision')
+    if not step_ids or decision not in ('approve', 'reject'):
+        return HttpResponseBadRequest('`step_ids` and `decision` (approve/reject) are required')
+    if len(step_ids) > BULK_DECISION_LIMIT:
+        return HttpResponseBadRequest(f'At most {BULK_DECISION_LIMIT} steps per request')
+
+    try:
+        results = bulk_decide_steps(
+            step_ids, employee, decision,
+            comments=payload.get('comments', ''),
+            actor=request.user,
+            ip_address=request.META.get('REMOTE_ADDR'),
+            user_agent=request.META.get('HTTP_USER_AGENT', ''),
+        )
+    except (TypeError, ValueError) as e:
+        return HttpResponseBadRequest(str(e))
+
+    return JsonResponse({
+        'success': all(r['success'] for r in results.values()),
+        'results': {str(pk): r for pk, r in results.items()},
+    })
+
+
+@login_required
+@user_passes_test(lambda u: u.is_active and (u.is_staff or u.is_superuser))
+@require_http_methods(["GET"])
+def approval_sla_metrics(request):
+    """
+    Approval SLA dashboard data, read from the daily rollups.
+
+    Query: date_from, date_to (YYYY-MM-DD, default last 30 days), app, request_type.
+    Returns time-to-decision per level, decisions per day and current queue depth.
+    """
+    try:
+        date_to = date.fromisoformat(request.GET['date_to']) if request.GET.get('date_to') else timezone.localdate()
+        date_from = (
+            date.fromisoformat(request.GET['date_from']) if request.GET.get('date_from')
+            else date_to - timedelta(days=METRICS_DEFAULT_DAYS - 1)
+        )
+    except ValueError:
+        return HttpResponseBadRequest('Dates must be YYYY-MM-DD')
+    if date_from > date_to:
+        return HttpResponseBadRequest('`date_from` must not be after `date_to`')
+    if (date_to - date_from).days >= METRICS_MAX_DAYS:
+        return HttpResponseBadRequest(f'At most {METRICS_MAX_DAYS} days per request')
+
+    app = request.GET.get('app') or None
+    request_type = request.GET.get('request_type') or None
+    metrics = get_sla_metrics(date_from, date_to, app=app, request_type=request_type)
+
+    return JsonResponse({
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'by_level': metrics['by_level'],
+        'per_day': metrics['per_day'],
+        'queue': get_queue_depth(app=app, request_type=request_type),
+    })
@@ -0,0 +1,46 @@
+"""
+Management command to apply retention to ChangeHistory and compact old entries.
+Run with: python manage.py compact_change_history  (e.g. nightly from cron)
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.models import ChangeHistoryCompaction
+from utils.history import collapse_history, purge_history
+
+
+class Command(BaseCommand):
+    help = 'Delete change history past retention and merge same-day changes in older history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int,
+                            default=getattr(settings, 'CHANGE_HISTORY_RETENTION_DAYS', 730),
+                            help='Delete history older than this many days')
+        parser.add_argument('--compact-after-days', type=int,
+                            default=getattr(settings, 'CHANGE_HISTORY_COMPACT_AFTER_DAYS', 30),
+                            help='Merge same-day changes once history is this many days old')
+
+    def handle(self, *args, **options):
+        retention, compact_after = options['retention_days'], options['compact_after_days']
+        if retention <= 0 or compact_after < 0:
+            raise CommandError('--retention-days must be positive and --compact-after-days not negative')
+
+        now = timezone.now()
+        retention_cutoff = now - timedelta(days=retention)
+        purged = purge_history(retention_cutoff)
+        self.stdout.write(f'  ✓ Deleted {purged} row(s) older than {retention} day(s)')
+
+        compacted = 0
+        if compact_after < retention:
+            before = now - timedelta(days=compact_after)
+            # Only the window since the previous run; everything older is already merged
+            last = ChangeHistoryCompaction.objects.order_by('-compacted_before').first()
+            since = max(last.compacted_before, retention_cutoff) if last else retention_cutoff
+            compacted = collapse_history(before, since=since)
+            ChangeHistoryCompaction.objects.create(compacted_before=before, rows_removed=compacted)
+        self.stdout.write(f'  ✓ Merged away {compacted} row(s) older than {compact_after} day(s)')
+
+        self.stdout.write(self.style.SUCCESS('Change history compaction complete'))
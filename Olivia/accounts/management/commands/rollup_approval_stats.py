@@ -0,0 +1,28 @@
+"""
+Management command to refresh the approval SLA daily rollups.
+Run with: python manage.py rollup_approval_stats  (e.g. hourly from cron)
+      or: python manage.py rollup_approval_stats --since 2025-01-01
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.approval_analytics import rollup_approval_stats
+
+
+class Command(BaseCommand):
+    help = 'Roll up decided approval steps into ApprovalDailyStat'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='First day to rebuild (YYYY-MM-DD); defaults to the last rolled-up day')
+        parser.add_argument('--until', help='Last day to rebuild (YYYY-MM-DD); defaults to today')
+
+    def handle(self, *args, **options):
+        try:
+            since = date.fromisoformat(options['since']) if options['since'] else None
+            until = date.fromisoformat(options['until']) if options['until'] else None
+        except ValueError:
+            raise CommandError('Dates must be YYYY-MM-DD')
+
+        written = rollup_approval_stats(since=since, until=until)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} approval rollup row(s)'))
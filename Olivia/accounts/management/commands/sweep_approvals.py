@@ -0,0 +1,48 @@
+"""
+Management command to auto-approve, skip or escalate overdue approval steps.
+Run with: python manage.py sweep_approvals  (e.g. every minute from cron)
+      or: python manage.py sweep_approvals --loop --interval 60
+      or: python manage.py sweep_approvals --backfill  (once, for steps pending before due dates existed)
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.approval_sweeper import DEFAULT_BATCH_SIZE, DEFAULT_MAX_SECONDS, backfill_due_dates, sweep_overdue_steps
+
+
+class Command(BaseCommand):
+    help = 'Auto-approve, skip or escalate overdue approval steps'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Steps handled per transaction')
+        parser.add_argument('--max-seconds', type=float, default=DEFAULT_MAX_SECONDS,
+                            help='Stop starting new batches after this many seconds')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep sweeping until interrupted')
+        parser.add_argument('--interval', type=float, default=60,
+                            help='Seconds between sweeps with --loop')
+        parser.add_argument('--backfill', action='store_true',
+                            help='First give due dates to pending steps that have none')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            count = backfill_due_dates(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Set due dates on {count} pending step(s)"))
+        while True:
+            summary = sweep_overdue_steps(
+                batch_size=options['batch_size'],
+                max_seconds=options['max_seconds'],
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"Auto-approved {summary['auto_approved']}, skipped {summary['skipped']}, "
+                f"escalated {summary['escalated']} (no target for {summary['unescalated']}) in {summary['batches']} batch(es)"
+                + (' (time budget reached)' if summary['timed_out'] else '')
+            ))
+            if not options['loop']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
@@ -27,7 +27,6 @@ class AppAccessRestrictionMiddleware(MiddlewareMixin):
             return None
 
         profile = getattr(user, "profile", None)
-        allowed_apps = profile.allowed_apps.values_list("code", flat=True) if profile else []
 
         # Extract the app label from the URL
         path_parts = request.path.strip("/").split("/")
@@ -37,7 +36,7 @@ class AppAccessRestrictionMiddleware(MiddlewareMixin):
         app_name = path_parts[0]
 
         # Only enforce restriction for known apps
-        if app_name in self.ALLOWED_APPS and app_name not in allowed_apps:
+        if app_name in self.ALLOWED_APPS and not (profile and profile.has_app_access(app_name)):
             # Redirect to a safe page (e.g., dashboard or home)
             return redirect(reverse("home"))
 
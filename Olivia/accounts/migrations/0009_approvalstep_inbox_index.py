@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HumanResource', '0018_rename_updated_at_employee_modified_at_and_more'),
+        ('accounts', '0008_update_org_level_data'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='approvalstep',
+            index=models.Index(fields=['assigned_to', 'status', 'approval_level'], name='approvalstep_inbox_idx'),
+        ),
+    ]
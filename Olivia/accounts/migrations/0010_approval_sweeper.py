@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HumanResource', '0018_rename_updated_at_employee_modified_at_and_more'),
+        ('accounts', '0009_approvalstep_inbox_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='approvallog',
+            name='action',
+            field=models.CharField(choices=[('submitted', 'Submitted'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('returned', 'Returned'), ('cancelled', 'Cancelled'), ('delegated', 'Delegated'), ('escalated', 'Escalated'), ('skipped', 'Skipped'), ('commented', 'Commented'), ('viewed', 'Viewed')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='approvalstep',
+            index=models.Index(fields=['status', 'due_date'], name='approvalstep_due_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_approval_sweeper'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApprovalDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('app', models.CharField(max_length=50)),
+                ('request_type', models.CharField(max_length=50)),
+                ('approval_level', models.IntegerField()),
+                ('decided_count', models.IntegerField(default=0)),
+                ('approved_count', models.IntegerField(default=0)),
+                ('rejected_count', models.IntegerField(default=0)),
+                ('skipped_count', models.IntegerField(default=0)),
+                ('escalated_count', models.IntegerField(default=0)),
+                ('total_decision_seconds', models.BigIntegerField(default=0)),
+                ('decision_histogram', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-date', 'app', 'request_type', 'approval_level'],
+                'unique_together': {('date', 'app', 'request_type', 'approval_level')},
+            },
+        ),
+    ]
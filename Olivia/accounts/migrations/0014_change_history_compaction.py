@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_cache_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeHistoryCompaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('compacted_before', models.DateTimeField()),
+                ('rows_removed', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Change history compactions',
+                'ordering': ['-compacted_before'],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HumanResource', '0018_rename_updated_at_employee_modified_at_and_more'),
+        ('accounts', '0014_change_history_compaction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='employee',
+            field=models.OneToOneField(blank=True, help_text='Employee record this login approves as', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='profile', to='HumanResource.employee'),
+        ),
+    ]
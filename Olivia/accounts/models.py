@@ -100,6 +100,11 @@ class Profile(models.Model):
     organizational_level = models.ForeignKey(OrganizationalLevel, on_delete=models.SET_NULL, null=True, blank=True)
     # Custom permissions override (if needed to deviate from organizational level)
     custom_permissions = models.ManyToManyField(Permission, blank=True)
+    # Set by an administrator; approvals act as this employee
+    employee = models.OneToOneField(
+        'HumanResource.Employee', on_delete=models.SET_NULL, null=True, blank=True, related_name='profile',
+        help_text="Employee record this login approves as",
+    )
 
     def __str__(self):
         return self.user.username
@@ -364,6 +369,10 @@ class ApprovalStep(models.Model):
     class Meta:
         ordering = ['workflow', 'approval_level']
         unique_together = ('workflow', 'approval_level')
+        indexes = [
+            models.Index(fields=['assigned_to', 'status', 'approval_level'], name='approvalstep_inbox_idx'),
+            models.Index(fields=['status', 'due_date'], name='approvalstep_due_idx'),
+        ]
     
     def __str__(self):
         return f"{self.workflow.request_title} - Level {self.approval_level} - {self.get_status_display()}"
@@ -382,6 +391,7 @@ class ApprovalLog(models.Model):
         ('cancelled', 'Cancelled'),
         ('delegated', 'Delegated'),
         ('escalated', 'Escalated'),
+        ('skipped', 'Skipped'),
         ('commented', 'Commented'),
         ('viewed', 'Viewed'),
     ]
@@ -408,3 +418,77 @@ class ApprovalLog(models.Model):
     def __str__(self):
         actor_name = self.actor.username if self.actor else "System"
         return f"{actor_name} - {self.get_action_display()} - {self.workflow.request_title}"
+
+
+class ApprovalDailyStat(models.Model):
+    """
+    Daily rollup of decided approval steps per app / request type / level.
+    Filled incrementally by the rollup_approval_stats command so SLA
+    dashboards never scan ApprovalStep or ApprovalLog.
+    """
+    date = models.DateField()
+    app = models.CharField(max_length=50)
+    request_type = models.CharField(max_length=50)
+    approval_level = models.IntegerField()
+
+    decided_count = models.IntegerField(default=0)
+    approved_count = models.IntegerField(default=0)
+    rejected_count = models.IntegerField(default=0)
+    skipped_count = models.IntegerField(default=0)
+    escalated_count = models.IntegerField(default=0)
+
+    # Time from the step becoming current to its decision
+    total_decision_seconds = models.BigIntegerField(default=0)
+    # Cumulative counts of decisions within each SLA_BUCKET_HOURS bound
+    decision_histogram = models.JSONField(default=list, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date', 'app', 'request_type', 'approval_level']
+        unique_together = ('date', 'app', 'request_type', 'approval_level')
+
+    def __str__(self):
+        return f"{self.date} - {self.app}/{self.request_type} L{self.approval_level}: {self.decided_count}"
+
+
+class ChangeHistory(models.Model):
+    """
+    Append-only field-level change log for models that declare
+    ``history_fields``. Written in batches by utils.history.
+    """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    field_name = models.CharField(max_length=100)
+    old_value = models.TextField(null=True, blank=True)
+    new_value = models.TextField(null=True, blank=True)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='change_history')
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-changed_at', '-id']
+        verbose_name_plural = "Change history"
+        indexes = [
+            models.Index(fields=['content_type', 'object_id', 'changed_at'], name='changehistory_object_idx'),
+            models.Index(fields=['changed_at'], name='changehistory_changed_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.content_type.model}#{self.object_id}.{self.field_name}: {self.old_value} -> {self.new_value}"
+
+
+class ChangeHistoryCompaction(models.Model):
+    """
+    One compact_change_history run. The next run only rescans history
+    from the latest ``compacted_before`` on.
+    """
+    compacted_before = models.DateTimeField()
+    rows_removed = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-compacted_before']
+        verbose_name_plural = "Change history compactions"
+
+    def __str__(self):
+        return f"Compacted before {self.compacted_before:%Y-%m-%d %H:%M} ({self.rows_removed} removed)"
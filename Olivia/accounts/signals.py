@@ -1,7 +1,10 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Profile, AppAccess
+from .models import Profile, AppAccess, ApprovalAuthority, ApproverAssignment
+from .approval_routing import invalidate_routing_table
+from HumanResource.models import Employee
 
 User = get_user_model()
 
@@ -13,4 +16,9 @@ def assign_all_apps_to_superuser(sender, instance, created, **kwargs):
         profile.allowed_apps.set(all_apps)
 
 
-
+@receiver([post_save, post_delete], sender=ApprovalAuthority)
+@receiver([post_save, post_delete], sender=ApproverAssignment)
+@receiver(post_delete, sender=Employee)  # delegate_to is cleared by SET_NULL without signals
+def rebuild_approval_routing(sender, **kwargs):
+    # After commit, or another worker could rebuild from the old rows under the new version
+    transaction.on_commit(invalidate_routing_table)
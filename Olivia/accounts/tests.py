@@ -1,3 +1,407 @@
-from django.test import TestCase
+import json
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from HumanResource.models import Employee
+from utils.pagination import encode_cursor
+
+from . import approval_routing
+from .approval_analytics import SLA_BUCKET_HOURS, histogram_percentile, rollup_approval_stats
+from .approval_routing import ROUTING_VERSION_CACHE_KEY, get_routing_table, invalidate_routing_table
+from .approval_sweeper import backfill_due_dates, sweep_overdue_steps
+from .approval_utils import (
+    PENDING_COUNT_CACHE_KEY, get_employee_for_user, get_pending_count_for_employee, initiate_approval_workflow,
+    invalidate_pending_counts,
+)
+from .models import (
+    ApprovalAuthority, ApprovalDailyStat, ApprovalLog, ApprovalStep, ApproverAssignment, OrganizationalLevel, Profile,
+)
+
+
+class ApprovalFixtureMixin:
+    """Two-level humanresource/leave chain: ``first`` approves level 1, ``second`` level 2"""
+
+    @classmethod
+    def setUpTestData(cls):
+        level, _ = OrganizationalLevel.objects.get_or_create(name='Test Manager', defaults={'level': 3})
+        cls.requestor = cls.employee('REQ1', 'requestor@example.com')
+        cls.first = cls.employee('APP1', 'first@example.com')
+        cls.second = cls.employee('APP2', 'second@example.com')
+        cls.authorities = [
+            ApprovalAuthority.objects.create(
+                app='humanresource', request_type='leave', approval_level=approval_level,
+                required_organizational_level=level,
+            )
+            for approval_level in (1, 2)
+        ]
+        for employee, authority in zip((cls.first, cls.second), cls.authorities):
+            ApproverAssignment.objects.create(employee=employee, approval_authority=authority)
+
+    @classmethod
+    def employee(cls, staffid, email):
+        return Employee.objects.create(staffid=staffid, full_name=staffid, department='Operations', email=email)
+
+    @classmethod
+    def linked_user(cls, employee, username=None):
+        user = User.objects.create_user(username or f'user-{employee.staffid}', password='pw')
+        Profile.objects.create(user=user, employee=employee)
+        return user
+
+    def setUp(self):
+        # The routing table lives in process memory across test rollbacks
+        invalidate_routing_table()
+
+    def submit(self, count=1):
+        return [
+            initiate_approval_workflow(
+                User.objects.create_user(f'request-{User.objects.count()}'),
+                'humanresource', 'leave', self.requestor, f'Leave {i}',
+            )
+            for i in range(count)
+        ]
+
+
+class EmployeeLinkTests(ApprovalFixtureMixin, TestCase):
+    def test_only_admin_link_resolves(self):
+        # Self-registered accounts can pick any username and email
+        impostor = User.objects.create_user(self.first.staffid, email=self.first.email, password='pw')
+        self.assertIsNone(get_employee_for_user(impostor))
+
+        self.assertEqual(get_employee_for_user(self.linked_user(self.first)), self.first)
+
+
+class ApprovalInboxTests(ApprovalFixtureMixin, TestCase):
+    def test_inbox_lists_own_current_steps(self):
+        workflows = self.submit(3)
+        self.client.force_login(self.linked_user(self.first))
+
+        response = self.client.get('/accounts/api/approvals/inbox/')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([row['workflow_id'] for row in body['data']], [w.pk for w in reversed(workflows)])
+        self.assertEqual(body['pending_count'], 3)
+        self.assertIsNone(body['next_cursor'])
+
+    def test_other_approvers_steps_not_visible(self):
+        self.submit(2)
+        # Level 2 is not current yet, so the second approver has nothing waiting
+        self.client.force_login(self.linked_user(self.second))
+
+        self.assertEqual(self.client.get('/accounts/api/approvals/inbox/').json()['data'], [])
+        self.assertEqual(self.client.get('/accounts/api/approvals/pending-count/').json(), {'count': 0})
+
+    def test_unlinked_user_sees_nothing(self):
+        self.submit()
+        impostor = User.objects.create_user(self.first.staffid, email=self.first.email, password='pw')
+        self.client.force_login(impostor)
+
+        self.assertEqual(self.client.get('/accounts/api/approvals/inbox/').status_code, 403)
+        self.assertEqual(self.client.get('/accounts/api/approvals/pending-count/').json(), {'count': 0})
+
+    def test_tampered_cursor_is_400(self):
+        self.client.force_login(self.linked_user(self.first))
+
+        response = self.client.get('/accounts/api/approvals/inbox/', {'cursor': encode_cursor(['soon', 1])})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Invalid cursor'})
+
+    def test_pending_count_follows_decisions(self):
+        workflows = self.submit(2)
+        self.client.force_login(self.linked_user(self.first))
+        self.assertEqual(self.client.get('/accounts/api/approvals/pending-count/').json(), {'count': 2})
+
+        step = ApprovalStep.objects.get(workflow=workflows[0], approval_level=1)
+        self.client.post(
+            '/accounts/api/approvals/bulk-decision/',
+            json.dumps({'step_ids': [step.pk], 'decision': 'approve'}), content_type='application/json',
+        )
+
+        self.assertEqual(self.client.get('/accounts/api/approvals/pending-count/').json(), {'count': 1})
+        self.client.force_login(self.linked_user(self.second))
+        self.assertEqual(self.client.get('/accounts/api/approvals/pending-count/').json(), {'count': 1})
+
+
+class PendingCountCacheTests(ApprovalFixtureMixin, TestCase):
+    def key(self):
+        return PENDING_COUNT_CACHE_KEY.format(employee_id=self.first.pk)
+
+    def test_database_cache_not_used(self):
+        self.submit(2)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_pending_count_for_employee(self.first), 2)
+        self.assertIsNone(cache.get(self.key()))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_shared_memory_cache_used(self):
+        self.submit(2)
+        with mock.patch('accounts.approval_utils.shared_memory_cache', return_value=True):
+            self.assertEqual(get_pending_count_for_employee(self.first), 2)
+            with self.assertNumQueries(0):
+                self.assertEqual(get_pending_count_for_employee(self.first), 2)
+
+            invalidate_pending_counts([self.first.pk])
+            self.assertIsNone(cache.get(self.key()))
+
+
+class BulkDecisionTests(ApprovalFixtureMixin, TestCase):
+    def decide(self, user, step_ids, decision='approve'):
+        self.client.force_login(user)
+        return self.client.post(
+            '/accounts/api/approvals/bulk-decision/',
+            json.dumps({'step_ids': step_ids, 'decision': decision}), content_type='application/json',
+        )
+
+    def step(self, workflow, level):
+        return ApprovalStep.objects.get(workflow=workflow, approval_level=level)
+
+    def statuses(self):
+        return dict(ApprovalStep.objects.values_list('pk', 'status'))
+
+    def test_eligibility_rules(self):
+        mine, decided, skipped, other = self.submit(4)
+        first, second = self.linked_user(self.first), self.linked_user(self.second)
+        self.decide(first, [self.step(decided, 1).pk])
+        ApprovalStep.objects.filter(pk=self.step(skipped, 1).pk).update(status='skipped')
+        before = self.statuses()
+
+        response = self.decide(first, [
+            self.step(mine, 1).pk,
+            self.step(decided, 1).pk,     # already approved
+            self.step(skipped, 1).pk,     # skipped
+            self.step(other, 2).pk,       # someone else's step
+            999999,
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], {
+            str(self.step(mine, 1).pk): {'success': True, 'workflow_status': 'pending'},
+            str(self.step(decided, 1).pk): {'success': False, 'error': 'Not eligible to decide this step'},
+            str(self.step(skipped, 1).pk): {'success': False, 'error': 'Not eligible to decide this step'},
+            str(self.step(other, 2).pk): {'success': False, 'error': 'Not eligible to decide this step'},
+            '999999': {'success': False, 'error': 'Approval step not found'},
+        })
+        after = self.statuses()
+        self.assertEqual(after.pop(self.step(mine, 1).pk), 'approved')
+        before.pop(self.step(mine, 1).pk)
+        self.assertEqual(after, before)
+
+        # Level 2 of ``other`` is assigned to the second approver but not current yet
+        response = self.decide(second, [self.step(other, 2).pk], 'reject')
+        self.assertFalse(response.json()['results'][str(self.step(other, 2).pk)]['success'])
+        self.assertEqual(self.step(other, 2).status, 'pending')
+
+        response = self.decide(second, [self.step(mine, 2).pk], 'reject')
+        self.assertEqual(
+            response.json()['results'][str(self.step(mine, 2).pk)],
+            {'success': True, 'workflow_status': 'rejected'},
+        )
+
+    def test_unlinked_user_cannot_decide(self):
+        workflow, = self.submit()
+        impostor = User.objects.create_user(self.first.staffid, email=self.first.email, password='pw')
+
+        response = self.decide(impostor, [self.step(workflow, 1).pk])
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.step(workflow, 1).status, 'pending')
+
+
+class RoutingTableTests(ApprovalFixtureMixin, TestCase):
+    def test_invalidation_waits_for_commit(self):
+        version = cache.get(ROUTING_VERSION_CACHE_KEY, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ApprovalAuthority.objects.filter(pk=self.authorities[1].pk).get().save()
+            self.assertEqual(cache.get(ROUTING_VERSION_CACHE_KEY, 0), version)
+
+        self.assertEqual(cache.get(ROUTING_VERSION_CACHE_KEY), version + 1)
+
+    def test_steady_state_submit_queries(self):
+        self.submit()
+        request_object = User.objects.create_user('request-object')
+
+        # Savepoint, workflow, steps, submission log, release; no cache read
+        with self.assertNumQueries(5):
+            initiate_approval_workflow(request_object, 'humanresource', 'leave', self.requestor, 'Leave')
+
+    def test_version_polled_on_database_cache(self):
+        table = get_routing_table()
+        # Another process bumps the version
+        cache.set(ROUTING_VERSION_CACHE_KEY, cache.get(ROUTING_VERSION_CACHE_KEY, 0) + 1, None)
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_routing_table(), table)
+        with mock.patch.object(approval_routing, 'ROUTING_VERSION_POLL_INTERVAL', 0):
+            self.assertIsNot(get_routing_table(), table)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_version_read_every_time_from_memory_cache(self):
+        table = get_routing_table()
+        cache.set(ROUTING_VERSION_CACHE_KEY, cache.get(ROUTING_VERSION_CACHE_KEY, 0) + 1, None)
+
+        self.assertIsNot(get_routing_table(), table)
+
+
+class ApprovalSweeperTests(ApprovalFixtureMixin, TestCase):
+    def configure_first_level(self, **fields):
+        ApprovalAuthority.objects.filter(pk=self.authorities[0].pk).update(**fields)
+        invalidate_routing_table()
+
+    def first_step(self, workflow):
+        return ApprovalStep.objects.get(workflow=workflow, approval_level=1)
+
+    def test_auto_approve_then_not_swept_again(self):
+        self.configure_first_level(auto_approve_after_days=2)
+        workflow, = self.submit()
+        self.assertAlmostEqual(
+            self.first_step(workflow).due_date, workflow.submitted_at + timedelta(days=2),
+            delta=timedelta(seconds=1),
+        )
+        later = timezone.now() + timedelta(days=3)
+
+        summary = sweep_overdue_steps(now=later)
+
+        self.assertEqual(summary['auto_approved'], 1)
+        self.assertEqual(self.first_step(workflow).status, 'approved')
+        workflow.refresh_from_db()
+        self.assertEqual((workflow.current_status, workflow.current_approval_level), ('pending', 2))
+        logs = ApprovalLog.objects.count()
+
+        summary = sweep_overdue_steps(now=later)
+
+        self.assertEqual(summary['auto_approved'] + summary['skipped'] + summary['escalated'], 0)
+        self.assertEqual(summary['batches'], 0)
+        self.assertEqual(ApprovalLog.objects.count(), logs)
+
+    def test_skip_gets_a_default_deadline(self):
+        self.configure_first_level(can_skip_if_unavailable=True)
+        workflow, = self.submit()
+        self.assertIsNotNone(self.first_step(workflow).due_date)
+
+        self.assertEqual(sweep_overdue_steps(now=timezone.now() + timedelta(days=1))['skipped'], 0)
+        summary = sweep_overdue_steps(now=timezone.now() + timedelta(days=4))
+
+        self.assertEqual(summary['skipped'], 1)
+        self.assertEqual(self.first_step(workflow).status, 'skipped')
+        self.assertEqual(ApprovalLog.objects.filter(workflow=workflow, action='skipped').count(), 1)
+
+    def test_no_deadline_by_default(self):
+        workflow, = self.submit()
+
+        self.assertIsNone(self.first_step(workflow).due_date)
+        self.assertEqual(sweep_overdue_steps(now=timezone.now() + timedelta(days=365))['batches'], 0)
+
+    def test_backfill_stamps_open_steps(self):
+        # Submitted while the authority set no deadline
+        workflows = self.submit(2)
+        self.configure_first_level(can_skip_if_unavailable=True)
+
+        call_command('sweep_approvals', '--backfill', '--max-seconds', '0', stdout=StringIO())
+
+        for workflow in workflows:
+            self.assertAlmostEqual(
+                self.first_step(workflow).due_date, workflow.submitted_at + timedelta(days=3),
+                delta=timedelta(seconds=1),
+            )
+        # Level 2 is not current yet
+        self.assertIsNone(ApprovalStep.objects.get(workflow=workflows[0], approval_level=2).due_date)
+        self.assertEqual(backfill_due_dates(), 0)
+
+
+class ApprovalAnalyticsTests(ApprovalFixtureMixin, TestCase):
+    url = '/accounts/api/approvals/metrics/'
+    day = datetime(2026, 5, 10, 10, tzinfo=dt_timezone.utc)
+
+    def decide(self, workflow, level, status, hours, started_at=None):
+        started_at = started_at or self.day - timedelta(hours=hours)
+        if level == 1:
+            ApprovalStep.objects.filter(workflow=workflow).update(assigned_at=started_at)
+        ApprovalStep.objects.filter(workflow=workflow, approval_level=level).update(
+            status=status, action_date=started_at + timedelta(hours=hours),
+        )
+
+    def decide_day(self):
+        workflows = self.submit(3)
+        for workflow, status, hours in zip(workflows, ('approved', 'rejected', 'approved'), (0.5, 3, 30)):
+            self.decide(workflow, 1, status, hours)
+        # Level 2 is timed from the level 1 decision, not from submission
+        self.decide(workflows[0], 2, 'approved', 2, started_at=self.day)
+        return workflows
+
+    def stats(self):
+        return list(ApprovalDailyStat.objects.order_by('approval_level').values(
+            'date', 'approval_level', 'decided_count', 'approved_count', 'rejected_count',
+            'total_decision_seconds', 'decision_histogram',
+        ))
+
+    def test_histogram_percentile(self):
+        #          1h 2h 4h 8h 12h 24h 48h ...
+        histogram = [1, 1, 2, 2, 2, 2, 3] + [3] * (len(SLA_BUCKET_HOURS) - 7)
+
+        self.assertIsNone(histogram_percentile(histogram, 0, 0.5))
+        # Inside the first bucket, interpolated from zero
+        self.assertEqual(histogram_percentile(histogram, 3, 0.2), 0.6)
+        # Exactly on a bucket edge
+        self.assertEqual(histogram_percentile(histogram, 3, 1 / 3), 1.0)
+        # Empty (1h, 2h] bucket skipped, interpolated inside (2h, 4h]
+        self.assertEqual(histogram_percentile(histogram, 3, 0.5), 3.0)
+        self.assertEqual(histogram_percentile(histogram, 3, 0.9), 40.8)
+        # Slower than the last bucket
+        self.assertEqual(histogram_percentile([0] * len(SLA_BUCKET_HOURS), 2, 0.5), float(SLA_BUCKET_HOURS[-1]))
+
+    def test_rollup_same_day_is_idempotent(self):
+        workflows = self.decide_day()
+        day = self.day.date()
+
+        self.assertEqual(rollup_approval_stats(since=day, until=day), 2)
+        first = self.stats()
+        self.assertEqual(first[0]['decided_count'], 3)
+        self.assertEqual((first[0]['approved_count'], first[0]['rejected_count']), (2, 1))
+        self.assertEqual(first[0]['total_decision_seconds'], int(33.5 * 3600))
+        self.assertEqual(first[0]['decision_histogram'][:7], [1, 1, 2, 2, 2, 2, 3])
+        self.assertEqual(first[1]['total_decision_seconds'], 2 * 3600)
+
+        self.assertEqual(rollup_approval_stats(since=day, until=day), 2)
+        self.assertEqual(rollup_approval_stats(until=day), 2)
+        self.assertEqual(self.stats(), first)
+
+        # A later decision that day replaces the day's rows instead of adding to them
+        self.decide(workflows[1], 2, 'approved', 1, started_at=self.day)
+        rollup_approval_stats(until=day)
+        self.assertEqual(ApprovalDailyStat.objects.count(), 2)
+        self.assertEqual(self.stats()[1]['decided_count'], 2)
+
+    def test_metrics_view(self):
+        self.decide_day()
+        rollup_approval_stats(since=self.day.date(), until=self.day.date())
+        self.client.force_login(User.objects.create_user('ops', password='pw', is_staff=True))
+
+        body = self.client.get(self.url, {'date_from': '2026-05-01', 'date_to': '2026-05-31'}).json()
+
+        level_1 = body['by_level'][0]
+        self.assertEqual((level_1['decided'], level_1['median_hours'], level_1['p90_hours']), (3, 3.0, 40.8))
+        self.assertEqual(body['per_day'], [{'date': '2026-05-10', 'decided': 4, 'approved': 3, 'rejected': 1}])
+
+    def test_metrics_date_validation(self):
+        self.client.force_login(User.objects.create_user('ops', password='pw', is_staff=True))
+
+        for params in (
+            {'date_from': '2026-05-02', 'date_to': '2026-05-01'},
+            # 367 days, counting both ends
+            {'date_from': '2025-01-01', 'date_to': '2026-01-02'},
+            {'date_from': '2026-13-01'},
+        ):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+        self.assertEqual(self.client.get(self.url, {'date_from': '2025-01-01', 'date_to': '2026-01-01'}).status_code, 200)
+        self.assertEqual(self.client.get(self.url, {'date_from': '2026-05-01', 'date_to': '2026-05-01'}).status_code, 200)
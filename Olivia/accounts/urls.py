@@ -1,5 +1,6 @@
 from django.urls import path
 from . import views
+from . import approval_views
 
 app_name = 'accounts'
 
@@ -15,6 +16,12 @@ urlpatterns = [
 
     path('api/assign-org-level/', views.assign_org_level_to_user, name='api_assign_org_level'),
 
+    # Approvals
+    path('api/approvals/inbox/', approval_views.approval_inbox, name='api_approval_inbox'),
+    path('api/approvals/pending-count/', approval_views.approval_pending_count, name='api_approval_pending_count'),
+    path('api/approvals/bulk-decision/', approval_views.approval_bulk_decision, name='api_approval_bulk_decision'),
+    path('api/approvals/metrics/', approval_views.approval_sla_metrics, name='api_approval_sla_metrics'),
+
     # Web admin UI
     path('admin/levels/', views.admin_org_levels, name='admin_org_levels'),
     path('admin/levels/<int:pk>/', views.admin_org_level_edit, name='admin_org_level_edit'),
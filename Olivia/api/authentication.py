@@ -0,0 +1,109 @@
+"""
+Token authentication with a shared-cache hot path.
+
+A token key maps (in the cache) to its user id, creation time and a small
+user snapshot, so an authenticated mobile request normally costs no query.
+Revoking a token or deactivating its user deletes the entry, which only
+reaches every worker through a shared cache. The cache is only used when it
+is shared and in memory (Redis / Memcached): a process-local cache would
+miss invalidations, and a database cache hit costs the same one query as
+the token lookup itself, so in both cases tokens are read from the database.
+The user is rebuilt with only the snapshot fields loaded; any other field is
+fetched on first access, and ``save()`` only writes the loaded fields.
+
+Settings:
+    API_TOKEN_CACHE_TIMEOUT   seconds a token stays cached (default 300)
+    API_TOKEN_TTL             seconds before a token expires (default None: never)
+    API_TOKEN_ROTATE_AFTER    seconds after which login issues a fresh token (default None)
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from utils.cache import shared_memory_cache
+
+
+SNAPSHOT_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+
+def _cache_key(key):
+    # Never use the raw token as a cache key
+    return 'api:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def _setting_delta(name):
+    seconds = getattr(settings, name, None)
+    return timedelta(seconds=seconds) if seconds else None
+
+
+def token_expired(created, now=None):
+    ttl = _setting_delta('API_TOKEN_TTL')
+    return bool(ttl and created + ttl <= (now or timezone.now()))
+
+
+def token_due_for_rotation(token, now=None):
+    rotate_after = _setting_delta('API_TOKEN_ROTATE_AFTER')
+    return token_expired(token.created, now) or bool(rotate_after and token.created + rotate_after <= (now or timezone.now()))
+
+
+def _user_from_snapshot(snapshot):
+    # from_db() expects values in concrete field order; the rest stay deferred
+    names = [f.attname for f in User._meta.concrete_fields if f.attname in snapshot]
+    return User.from_db(DEFAULT_DB_ALIAS, names, [snapshot[name] for name in names])
+
+
+def invalidate_token(key):
+    """Drop a token from the cache (call whenever it is deleted or its user changes)"""
+    if shared_memory_cache():
+        cache.delete(_cache_key(key))
+
+
+def issue_token(user):
+    """Return the user's token, replacing it when expired or due for rotation"""
+    token = Token.objects.filter(user=user).first()
+    if token is not None and token_due_for_rotation(token):
+        invalidate_token(token.key)
+        token.delete()
+        token = None
+    if token is None:
+        token = Token.objects.create(user=user)
+    return token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that serves token → user lookups from the shared cache"""
+
+    def authenticate_credentials(self, key):
+        use_cache = shared_memory_cache()
+        cache_key = _cache_key(key)
+        entry = cache.get(cache_key) if use_cache else None
+        if entry is None:
+            token = Token.objects.select_related('user').filter(key=key).first()
+            if token is None:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            user = token.user
+            entry = {
+                'created': token.created.isoformat(),
+                'user': {name: getattr(user, name) for name in SNAPSHOT_FIELDS},
+            }
+            if use_cache:
+                cache.set(cache_key, entry, getattr(settings, 'API_TOKEN_CACHE_TIMEOUT', 300))
+        else:
+            user = _user_from_snapshot(entry['user'])
+
+        if token_expired(parse_datetime(entry['created'])):
+            invalidate_token(key)
+            Token.objects.filter(key=key).delete()
+            raise exceptions.AuthenticationFailed('Token has expired.')
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return (user, key)
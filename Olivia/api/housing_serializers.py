@@ -0,0 +1,79 @@
+from rest_framework import serializers
+
+from Housing.models import Unit, Reservation, CheckInCheckOut
+
+
+class SparseFieldsetMixin:
+    """Limit output to the comma-separated ``?fields=`` list (``id`` is always kept)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        requested = request.query_params.get('fields') if request else None
+        if requested:
+            wanted = {name.strip() for name in requested.split(',') if name.strip()} | {'id'}
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+
+class UnitSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Unit
+        fields = [
+            'id', 'unit_number', 'bed_number', 'unit_location', 'zone', 'accomodation_type',
+            'area', 'block', 'building', 'floor', 'occupancy_status', 'room_physical_status',
+            'actual_type', 'current_type', 'modified_date',
+        ]
+        read_only_fields = fields
+
+
+class StayRecordSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CheckInCheckOut
+        fields = ['id', 'actual_checkin_datetime', 'actual_checkout_datetime']
+
+
+class ReservationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    housing_user_name = serializers.CharField(source='housing_user.username', read_only=True)
+    unit_number = serializers.CharField(source='unit.unit_number', read_only=True, default=None)
+    company_name = serializers.CharField(source='company.company_name', read_only=True, default=None)
+    checkins = StayRecordSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Reservation
+        fields = [
+            'id', 'housing_user', 'housing_user_name', 'unit', 'unit_number', 'unit_location_code',
+            'accomodation_type', 'company', 'company_name', 'uua_number', 'govt_id_number', 'neom_id',
+            'mobile_number', 'intended_checkin_date', 'intended_checkout_date', 'occupancy_status',
+            'remarks', 'checkins', 'modified_date',
+        ]
+        read_only_fields = fields
+
+
+class CheckInCheckOutSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    housing_user_name = serializers.CharField(source='reservation.housing_user.username', read_only=True)
+    unit_number = serializers.CharField(source='reservation.unit.unit_number', read_only=True, default=None)
+
+    class Meta:
+        model = CheckInCheckOut
+        fields = [
+            'id', 'reservation', 'housing_user_name', 'unit_number', 'actual_checkin_datetime',
+            'actual_checkout_datetime', 'actual_stay_duration', 'remarks', 'modified_date',
+        ]
+        read_only_fields = ['id', 'actual_stay_duration', 'modified_date']
+
+    def validate(self, attrs):
+        checked_in = attrs.get('actual_checkin_datetime', getattr(self.instance, 'actual_checkin_datetime', None))
+        checked_out = attrs.get('actual_checkout_datetime', getattr(self.instance, 'actual_checkout_datetime', None))
+        if checked_in and checked_out and checked_out < checked_in:
+            raise serializers.ValidationError({'actual_checkout_datetime': 'Check-out cannot be before check-in.'})
+        return attrs
+
+
+class StayEventSerializer(serializers.Serializer):
+    """One offline check-in/check-out event uploaded to /api/housing/sync/"""
+    key = serializers.CharField(max_length=64)
+    type = serializers.ChoiceField(choices=['checkin', 'checkout'])
+    reservation = serializers.IntegerField(min_value=1)
+    at = serializers.DateTimeField()
+    remarks = serializers.CharField(required=False, allow_blank=True, default='')
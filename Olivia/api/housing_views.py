@@ -0,0 +1,235 @@
+"""
+Housing endpoints for the mobile app: units, reservations and check-in/out.
+
+Lists are cursor-paginated by id. Pass ``?since=<ISO timestamp>`` to get only
+rows modified after it (delta sync) and store the ``server_time`` of the
+first page as the next ``since``. ``?fields=a,b`` trims each row to the
+listed fields.
+
+Every endpoint needs housing app access (or staff), see api.permissions.
+"""
+from django.db import IntegrityError
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from Housing.models import Unit, Reservation, CheckInCheckOut
+from Housing.services import apply_stay_events, apply_stay_status
+from utils.db import write_transaction
+from .housing_serializers import (
+    UnitSerializer, ReservationSerializer, CheckInCheckOutSerializer, StayRecordSerializer, StayEventSerializer
+)
+from .permissions import HasHousingAccess
+
+
+SYNC_MAX_EVENTS = 500
+# Server changes returned inline by the sync endpoint, per model
+SYNC_CHANGES_LIMIT = 500
+
+
+class SyncCursorPagination(CursorPagination):
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.server_time = timezone.now()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'server_time': self.server_time.isoformat(),
+            'results': data,
+        })
+
+
+def _csv_param(request, name):
+    value = request.query_params.get(name)
+    return [v.strip() for v in value.split(',') if v.strip()] if value else []
+
+
+def _requested_fields(request):
+    return set(_csv_param(request, 'fields'))
+
+
+def _parse_since(value, param='since'):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValidationError({param: 'Expected an ISO 8601 timestamp.'})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class HousingSyncViewSet(viewsets.GenericViewSet):
+    """Shared ``?since=`` delta filter and ``?fields=`` handling"""
+    pagination_class = SyncCursorPagination
+    permission_classes = [IsAuthenticated, HasHousingAccess]
+
+    def filter_since(self, queryset):
+        since = self.request.query_params.get('since')
+        if not since:
+            return queryset
+        return queryset.filter(modified_date__gt=_parse_since(since))
+
+    def wants(self, field):
+        fields = _requested_fields(self.request)
+        return not fields or field in fields
+
+
+class UnitViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, HousingSyncViewSet):
+    """Units. Filters: occupancy_status, zone, area, building (comma lists), unit_number."""
+    serializer_class = UnitSerializer
+
+    def get_queryset(self):
+        units = self.filter_since(Unit.objects.all())
+        for name in ('occupancy_status', 'zone', 'area', 'building'):
+            values = _csv_param(self.request, name)
+            if values:
+                units = units.filter(**{f'{name}__in': values})
+        unit_number = self.request.query_params.get('unit_number')
+        if unit_number:
+            units = units.filter(unit_number__icontains=unit_number)
+        return units
+
+
+class ReservationViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, HousingSyncViewSet):
+    """
+    Reservations with their check-in/out records.
+    Filters: occupancy_status (comma list), unit, checkin_from, checkin_to (YYYY-MM-DD).
+    """
+    serializer_class = ReservationSerializer
+
+    @staticmethod
+    def base_queryset(with_checkins=True):
+        reservations = Reservation.objects.select_related('housing_user', 'unit', 'company')
+        if with_checkins:
+            reservations = reservations.prefetch_related(Prefetch(
+                'checkins',
+                queryset=CheckInCheckOut.objects.only(*StayRecordSerializer.Meta.fields, 'reservation_id'),
+            ))
+        return reservations
+
+    def get_queryset(self):
+        reservations = self.filter_since(self.base_queryset(with_checkins=self.wants('checkins')))
+
+        params = self.request.query_params
+        statuses = _csv_param(self.request, 'occupancy_status')
+        if statuses:
+            reservations = reservations.filter(occupancy_status__in=statuses)
+        if params.get('unit'):
+            reservations = reservations.filter(unit_id=params['unit'])
+        if params.get('checkin_from'):
+            reservations = reservations.filter(intended_checkin_date__gte=params['checkin_from'])
+        if params.get('checkin_to'):
+            reservations = reservations.filter(intended_checkin_date__lte=params['checkin_to'])
+        return reservations
+
+
+class CheckInCheckOutViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin,
+                             mixins.UpdateModelMixin, HousingSyncViewSet):
+    """
+    Check-in/out records. Creating or updating one moves the reservation and
+    unit to Occupied / Checked Out + Vacant Dirty, as the web form does.
+    Filters: reservation, open=1 (checked in, not yet out).
+    """
+    serializer_class = CheckInCheckOutSerializer
+
+    @staticmethod
+    def base_queryset():
+        return CheckInCheckOut.objects.select_related('reservation__housing_user', 'reservation__unit')
+
+    def get_queryset(self):
+        checkins = self.filter_since(self.base_queryset())
+        params = self.request.query_params
+        if params.get('reservation'):
+            checkins = checkins.filter(reservation_id=params['reservation'])
+        if params.get('open') in ('1', 'true'):
+            checkins = checkins.filter(actual_checkin_datetime__isnull=False, actual_checkout_datetime__isnull=True)
+        return checkins
+
+    def _save_with_status(self, serializer):
+        with write_transaction():
+            checkin = serializer.save()
+            apply_stay_status(checkin.reservation, checkin.actual_checkin_datetime, checkin.actual_checkout_datetime)
+
+    def perform_create(self, serializer):
+        self._save_with_status(serializer)
+
+    def perform_update(self, serializer):
+        self._save_with_status(serializer)
+
+
+def _changes_since(queryset, serializer_class, since, request):
+    rows = list(queryset.filter(modified_date__gt=since).order_by('modified_date', 'id')[:SYNC_CHANGES_LIMIT + 1])
+    truncated = len(rows) > SYNC_CHANGES_LIMIT
+    return serializer_class(rows[:SYNC_CHANGES_LIMIT], many=True, context={'request': request}).data, truncated
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, HasHousingAccess])
+def housing_sync(request):
+    """
+    Offline check-in/check-out sync.
+
+    Body: {"device_id": "...", "sync_token": "<from last sync>",
+           "events": [{"key": "<uuid>", "type": "checkin"|"checkout",
+                       "reservation": 12, "at": "<ISO time>", "remarks": ""}]}
+
+    Events are applied in one transaction; keys already seen return their
+    stored outcome, so a batch can be replayed safely. The response carries
+    per-event results, reservations / units / check-ins changed on the server
+    since ``sync_token`` and the next ``sync_token``. When ``truncated`` is
+    set, fetch the rest from the list endpoints with ``since``.
+    """
+    events = request.data.get('events') or []
+    if not isinstance(events, list):
+        return Response({'error': '`events` must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(events) > SYNC_MAX_EVENTS:
+        return Response({'error': f'At most {SYNC_MAX_EVENTS} events per sync'}, status=status.HTTP_400_BAD_REQUEST)
+
+    results, valid = {}, []
+    for index, raw in enumerate(events):
+        serializer = StayEventSerializer(data=raw)
+        if serializer.is_valid():
+            data = serializer.validated_data
+            valid.append({
+                'key': data['key'], 'type': data['type'], 'reservation_id': data['reservation'],
+                'at': data['at'], 'remarks': data['remarks'],
+            })
+        else:
+            key = raw.get('key') if isinstance(raw, dict) else None
+            results[str(key or f'#{index}')] = {'result': 'invalid', 'errors': serializer.errors}
+
+    since = request.data.get('sync_token')
+    since = _parse_since(since, 'sync_token') if since else None
+    sync_token = timezone.now()
+
+    if valid:
+        device_id = str(request.data.get('device_id') or '')[:100]
+        try:
+            outcomes = apply_stay_events(valid, device_id=device_id, user=request.user)
+        except IntegrityError:
+            # A concurrent upload of the same batch won the race; its events are now known
+            outcomes = apply_stay_events(valid, device_id=device_id, user=request.user)
+        results.update(outcomes)
+
+    response = {'results': results, 'sync_token': sync_token.isoformat(), 'truncated': False}
+    if since is not None:
+        for name, queryset, serializer_class in (
+            ('reservations', ReservationViewSet.base_queryset(), ReservationSerializer),
+            ('units', Unit.objects.all(), UnitSerializer),
+            ('checkins', CheckInCheckOutViewSet.base_queryset(), CheckInCheckOutSerializer),
+        ):
+            response[name], truncated = _changes_since(queryset, serializer_class, since, request)
+            response['truncated'] = response['truncated'] or truncated
+    return Response(response)
@@ -0,0 +1,24 @@
+"""
+Management command to delete mobile API tokens past API_TOKEN_TTL.
+Run with: python manage.py purge_expired_tokens  (e.g. nightly from cron)
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+
+class Command(BaseCommand):
+    help = 'Delete API tokens older than API_TOKEN_TTL'
+
+    def handle(self, *args, **options):
+        ttl = getattr(settings, 'API_TOKEN_TTL', None)
+        if not ttl:
+            self.stdout.write('API_TOKEN_TTL is not set; tokens never expire')
+            return
+
+        # post_delete (api.signals) drops each token from the cache
+        deleted = Token.objects.filter(created__lte=timezone.now() - timedelta(seconds=ttl)).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired token(s)'))
@@ -0,0 +1,27 @@
+"""
+Permissions for the mobile API.
+
+DRF views skip AppAccessRestrictionMiddleware (it only knows the web URL
+prefixes), and any account can register through /api/auth/register/, so
+endpoints exposing app data check app access themselves.
+"""
+from rest_framework.permissions import BasePermission
+
+
+class HasAppAccess(BasePermission):
+    """Staff, superusers, or users whose profile grants access to ``app``"""
+    app = None
+    message = 'You do not have access to this application.'
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        if user.is_staff or user.is_superuser:
+            return True
+        profile = getattr(user, 'profile', None)
+        return profile is not None and profile.has_app_access(self.app)
+
+
+class HasHousingAccess(HasAppAccess):
+    app = 'housing'
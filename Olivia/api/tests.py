@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from accounts.models import AppAccess, Profile
+
+from .authentication import CachedTokenAuthentication, _cache_key, invalidate_token
+
+
+HOUSING_ENDPOINTS = (
+    '/api/housing/units/',
+    '/api/housing/reservations/',
+    '/api/housing/checkins/',
+)
+
+
+class HousingAccessTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def register(self, username):
+        response = self.client.post('/api/auth/register/', {
+            'username': username, 'email': f'{username}@example.com',
+            'password': 'S3cure-pass!', 'password2': 'S3cure-pass!',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {response.data['token']}")
+        return User.objects.get(username=username)
+
+    def test_self_registered_user_is_forbidden(self):
+        self.register('stranger')
+
+        for url in HOUSING_ENDPOINTS:
+            self.assertEqual(self.client.get(url).status_code, 403, url)
+        self.assertEqual(self.client.post('/api/housing/checkins/', {}, format='json').status_code, 403)
+        self.assertEqual(self.client.post('/api/housing/sync/', {'events': []}, format='json').status_code, 403)
+
+    def test_housing_access_allowed(self):
+        user = self.register('warden')
+        profile, _ = Profile.objects.get_or_create(user=user)
+        profile.allowed_apps.add(AppAccess.objects.create(name='housing'))
+
+        for url in HOUSING_ENDPOINTS:
+            self.assertEqual(self.client.get(url).status_code, 200, url)
+        self.assertEqual(self.client.post('/api/housing/sync/', {'events': []}, format='json').status_code, 200)
+
+    def test_staff_allowed(self):
+        self.client.force_authenticate(User.objects.create_user('ops', is_staff=True))
+
+        for url in HOUSING_ENDPOINTS:
+            self.assertEqual(self.client.get(url).status_code, 200, url)
+
+    def test_anonymous_rejected(self):
+        for url in HOUSING_ENDPOINTS:
+            self.assertEqual(self.client.get(url).status_code, 401, url)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('courier', password='pw')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def authenticate(self):
+        user, _ = CachedTokenAuthentication().authenticate_credentials(self.token.key)
+        return user
+
+    def test_database_cache_not_used(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(), self.user)
+        self.assertIsNone(cache.get(_cache_key(self.token.key)))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_shared_memory_cache_used(self):
+        with mock.patch('api.authentication.shared_memory_cache', return_value=True):
+            self.authenticate()
+            with self.assertNumQueries(0):
+                self.assertEqual(self.authenticate().username, 'courier')
+
+            invalidate_token(self.token.key)
+            with self.assertNumQueries(1):
+                self.authenticate()
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_not_used(self):
+        self.authenticate()
+        with self.assertNumQueries(1):
+            self.authenticate()
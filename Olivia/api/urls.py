@@ -1,11 +1,20 @@
-from django.urls import path
-from . import views
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+from . import views, housing_views
 
 app_name = 'api'
 
+router = DefaultRouter()
+router.register('housing/units', housing_views.UnitViewSet, basename='housing-unit')
+router.register('housing/reservations', housing_views.ReservationViewSet, basename='housing-reservation')
+router.register('housing/checkins', housing_views.CheckInCheckOutViewSet, basename='housing-checkin')
+
 urlpatterns = [
     path('auth/register/', views.register_view, name='register'),
     path('auth/login/', views.login_view, name='login'),
     path('auth/logout/', views.logout_view, name='logout'),
     path('auth/profile/', views.user_profile_view, name='profile'),
+    path('auth/token/refresh/', views.token_refresh_view, name='token_refresh'),
+    path('housing/sync/', housing_views.housing_sync, name='housing-sync'),
+    path('', include(router.urls)),
 ]
@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from .authentication import invalidate_token, issue_token
 from .serializers import UserSerializer, RegisterSerializer, LoginSerializer
 
 @api_view(['POST'])
@@ -14,7 +15,7 @@ def register_view(request):
     serializer = RegisterSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.save()
-        token, created = Token.objects.get_or_create(user=user)
+        token = issue_token(user)
         return Response({
             'token': token.key,
             'user': UserSerializer(user).data
@@ -32,7 +33,7 @@ def login_view(request):
         user = authenticate(username=username, password=password)
         
         if user:
-            token, created = Token.objects.get_or_create(user=user)
+            token = issue_token(user)
             return Response({
                 'token': token.key,
                 'user': UserSerializer(user).data
@@ -45,11 +46,21 @@ def login_view(request):
 def logout_view(request):
     """Logout user by deleting their token"""
     try:
-        request.user.auth_token.delete()
+        if isinstance(request.auth, str):
+            invalidate_token(request.auth)
+        Token.objects.filter(user_id=request.user.pk).delete()
         return Response({'message': 'Successfully logged out'}, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def token_refresh_view(request):
+    """Replace the caller's token with a new one"""
+    Token.objects.filter(user_id=request.user.pk).delete()
+    token = Token.objects.create(user_id=request.user.pk)
+    return Response({'token': token.key})
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_profile_view(request):
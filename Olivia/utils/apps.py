@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class UtilsConfig(AppConfig):
+    name = 'utils'
+    verbose_name = 'Shared utilities'
+
+    def ready(self):
+        # Connects tune_sqlite to connection_created
+        import utils.db  # noqa: F401
@@ -0,0 +1,134 @@
+"""
+Request-scoped audit fields.
+
+AuditUserMiddleware records the requesting user in a context variable, and
+AuditMixin / AuditManager fill ``created_by`` / ``modified_by`` from it on
+``save()``, ``bulk_create()`` and ``bulk_update()``, so views and import
+paths don't have to set them by hand. Outside a request (management
+commands, scripts) wrap the work in ``with audit_user(user):``.
+
+Models that list ``history_fields`` also get field-level change history
+on the same hooks (see utils.history).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import models
+from django.http import HttpRequest
+from django.utils import timezone
+
+from .history import collect_changes, history_batch, record_changes, take_snapshot
+
+
+_current_user = ContextVar('audit_user', default=None)
+
+
+def get_current_user():
+    """The authenticated user for the current request/context, or None"""
+    user = _current_user.get()
+    # The middleware stores the request: request.user is lazy, and DRF replaces
+    # it after token authentication, so it is only read here, on an audited write
+    if isinstance(user, HttpRequest):
+        user = getattr(user, 'user', None)
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return None
+    return user
+
+
+@contextmanager
+def audit_user(user):
+    """Attribute audited writes inside the block to ``user``"""
+    token = _current_user.set(user)
+    try:
+        yield user
+    finally:
+        _current_user.reset(token)
+
+
+class AuditUserMiddleware:
+    """Expose request.user to audited models for the duration of the request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _current_user.set(request)
+        try:
+            with history_batch():
+                return self.get_response(request)
+        finally:
+            _current_user.reset(token)
+
+
+def _stamp(objs, user, creating):
+    for obj in objs:
+        if creating and obj.created_by_id is None:
+            obj.created_by = user
+        obj.modified_by = user
+
+
+class AuditQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        user = get_current_user()
+        if user is not None:
+            _stamp(objs, user, creating=True)
+        created = super().bulk_create(objs, *args, **kwargs)
+        if self.model.history_fields:
+            for obj in created:
+                take_snapshot(obj)
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        # bulk_update skips auto_now, so the batch gets one timestamp here
+        objs = list(objs)
+        user = get_current_user()
+        now = timezone.now()
+        for obj in objs:
+            obj.modified_date = now
+        fields = list(fields)
+        extra = ['modified_date']
+        if user is not None:
+            _stamp(objs, user, creating=False)
+            extra.append('modified_by')
+        fields.extend(name for name in extra if name not in fields)
+        updated = super().bulk_update(objs, fields, *args, **kwargs)
+        if self.model.history_fields:
+            record_changes(collect_changes(objs, fields, user), using=self.db)
+        return updated
+
+
+AuditManager = models.Manager.from_queryset(AuditQuerySet)
+
+
+class AuditMixin:
+    """Fills created_by / modified_by on save() from the current audit user"""
+
+    # Fields whose changes are written to ChangeHistory
+    history_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if cls.history_fields:
+            take_snapshot(instance)
+        return instance
+
+    def save(self, *args, **kwargs):
+        user = get_current_user()
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        if user is not None:
+            _stamp([self], user, creating=adding)
+        if update_fields:
+            extra = ['modified_date'] + (['modified_by'] if user is not None else [])
+            kwargs['update_fields'] = list(update_fields) + [
+                name for name in extra if name not in update_fields
+            ]
+        super().save(*args, **kwargs)
+
+        if self.history_fields:
+            if adding:
+                take_snapshot(self)
+            else:
+                record_changes(collect_changes([self], kwargs.get('update_fields'), user), using=self._state.db)
@@ -0,0 +1,44 @@
+"""
+Cache helpers.
+
+Invalidation through the "default" cache only reaches other worker processes
+when that cache is shared between them (database, Redis, Memcached).
+Code that relies on invalidation for correctness checks shared_cache()
+first and skips the cache when it is process-local.
+
+A hit in the database cache is still a query, so caching a value that is
+itself one query away saves nothing there. Token lookups and pending
+approval counts are only cached when shared_memory_cache() holds (Redis or
+Memcached); the routing table version is polled less often on the database
+cache (see accounts.approval_routing).
+"""
+from django.conf import settings
+
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+DATABASE_BACKENDS = (
+    'django.core.cache.backends.db.DatabaseCache',
+)
+
+
+def _backend(alias):
+    return settings.CACHES.get(alias, {}).get('BACKEND', PROCESS_LOCAL_BACKENDS[0])
+
+
+def shared_cache(alias='default'):
+    """Whether the cache at ``alias`` is shared between processes"""
+    return _backend(alias) not in PROCESS_LOCAL_BACKENDS
+
+
+def database_cache(alias='default'):
+    """Whether every read of the cache at ``alias`` is a database query"""
+    return _backend(alias) in DATABASE_BACKENDS
+
+
+def shared_memory_cache(alias='default'):
+    """Whether the cache at ``alias`` is shared between processes and kept outside the database"""
+    return shared_cache(alias) and not database_cache(alias)
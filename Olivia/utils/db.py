@@ -0,0 +1,107 @@
+"""
+Database helpers: read-replica routing and SQLite tuning.
+
+Settings add a ``replica`` alias when DB_REPLICA_HOST is set. Reads go there
+only inside ``replica_reads()`` or a view decorated with ``@read_replica``.
+Only exports use it: list pages reload right after a create or edit, and
+replica lag would hide the change, so they stay on the primary along with
+anything else that reads its own writes. Writes always go to the primary.
+Without a replica configured both are no-ops.
+
+On SQLite every new connection gets settings.SQLITE_PRAGMAS (WAL journal,
+synchronous=NORMAL, busy timeout, mmap and page cache), applied from the
+connection_created signal. UtilsConfig.ready() connects the receiver, so
+'utils' must stay in INSTALLED_APPS.
+
+Bulk and import paths open their transaction with write_transaction(). On
+SQLite that issues BEGIN IMMEDIATE, which takes the write lock up front
+and waits out busy_timeout. A deferred BEGIN that reads and then writes
+can instead fail straight away with "database is locked" when another
+writer got there first.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+REPLICA_ALIAS = 'replica'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+@contextmanager
+def replica_reads():
+    """Route ORM reads inside the block to the replica"""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def read_replica(view):
+    """View decorator for read-only export views that tolerate replica lag"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with replica_reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and REPLICA_ALIAS in settings.DATABASES:
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Also catches saving an instance that was loaded from the replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA_ALIAS}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA_ALIAS:
+            return False
+        return None
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@contextmanager
+def write_transaction(using=None):
+    """
+    transaction.atomic() for write-heavy blocks. An outermost block on SQLite
+    starts with BEGIN IMMEDIATE; everywhere else it is a plain atomic().
+    """
+    connection = connections[using or DEFAULT_DB_ALIAS]
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+
+    # Connecting resets transaction_mode from OPTIONS, so connect first
+    connection.ensure_connection()
+    previous = connection.transaction_mode
+    connection.transaction_mode = 'IMMEDIATE'
+    try:
+        with transaction.atomic(using=using):
+            connection.transaction_mode = previous
+            yield
+    finally:
+        connection.transaction_mode = previous
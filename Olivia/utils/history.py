@@ -0,0 +1,238 @@
+"""
+Field-level change history.
+
+Models opt in by listing ``history_fields`` (see utils.audit.AuditMixin).
+Values are snapshotted when a row is loaded; after ``save()`` or
+``bulk_update()`` the changed fields become ChangeHistory rows.
+
+A save inside a transaction writes its rows in that same transaction, so
+the data and its history commit or roll back together. Autocommit saves
+have already committed; their rows are collected per request by
+AuditUserMiddleware (or ``with history_batch():``) and written with one
+bulk_create when it ends, or straight away outside a batch. A failure on
+that path is logged rather than raised, as the data change it describes
+cannot be undone any more. ``QuerySet.update()`` bypasses model instances
+and is not tracked.
+"""
+import datetime
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+HISTORY_BATCH_SIZE = 1000
+
+_request_buffer = ContextVar('change_history_buffer', default=None)
+
+
+def _to_text(value):
+    if value is None:
+        return None
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return format(value.normalize(), 'f')
+    return str(value)
+
+
+def take_snapshot(instance):
+    """Remember the loaded values of the instance's tracked fields"""
+    loaded = instance.__dict__
+    instance._history_snapshot = {
+        name: _to_text(loaded[name]) for name in instance.history_fields if name in loaded
+    }
+
+
+def collect_changes(instances, fields=None, user=None):
+    """
+    Diff tracked fields against each instance's snapshot, refresh the
+    snapshots, and return unsaved ChangeHistory rows.
+    """
+    from django.contrib.contenttypes.models import ContentType
+    from accounts.models import ChangeHistory
+
+    rows = []
+    now = timezone.now()
+    content_types = {}
+    for instance in instances:
+        snapshot = getattr(instance, '_history_snapshot', None)
+        if snapshot is None:
+            continue
+        names = instance.history_fields if fields is None else [f for f in instance.history_fields if f in fields]
+        for name in names:
+            if name not in snapshot:
+                continue
+            new = _to_text(getattr(instance, name))
+            old = snapshot[name]
+            if new == old:
+                continue
+            model = type(instance)
+            if model not in content_types:
+                content_types[model] = ContentType.objects.get_for_model(model)
+            rows.append(ChangeHistory(
+                content_type=content_types[model],
+                object_id=instance.pk,
+                field_name=name,
+                old_value=old,
+                new_value=new,
+                changed_by=user,
+                changed_at=now,
+            ))
+            snapshot[name] = new
+    return rows
+
+
+def _write(rows, using):
+    from accounts.models import ChangeHistory
+
+    if rows:
+        ChangeHistory.objects.using(using).bulk_create(rows, batch_size=HISTORY_BATCH_SIZE)
+
+
+def _write_committed(rows, using):
+    """Write rows for changes that are already committed; log instead of raising"""
+    try:
+        _write(rows, using)
+    except Exception:
+        logger.exception('Could not write %d change history row(s) to %r', len(rows), using)
+
+
+def record_changes(rows, using='default'):
+    """Write ChangeHistory rows with the current transaction, or queue them for the batch"""
+    if not rows:
+        return
+    if connections[using].in_atomic_block:
+        # Same transaction as the change: a rollback (or a failed write) takes both
+        _write(rows, using)
+        return
+    pending = _request_buffer.get()
+    if pending is not None:
+        pending.append((rows, using))
+    else:
+        _write_committed(rows, using)
+
+
+@contextmanager
+def history_batch():
+    """Write history recorded outside transactions once, when the block ends"""
+    token = _request_buffer.set([])
+    try:
+        yield
+    finally:
+        pending = _request_buffer.get()
+        _request_buffer.reset(token)
+        by_alias = {}
+        for rows, using in pending:
+            by_alias.setdefault(using, []).extend(rows)
+        for using, rows in by_alias.items():
+            _write_committed(rows, using)
+
+
+def history_for(model, object_id=None, field_name=None):
+    """ChangeHistory for a model (or model instance), newest first"""
+    from django.contrib.contenttypes.models import ContentType
+    from accounts.models import ChangeHistory
+
+    if object_id is None and not isinstance(model, type):
+        object_id = model.pk
+    content_type = ContentType.objects.get_for_model(model)
+    history = ChangeHistory.objects.filter(content_type=content_type)
+    if object_id is not None:
+        history = history.filter(object_id=object_id)
+    if field_name:
+        history = history.filter(field_name=field_name)
+    return history.select_related('changed_by')
+
+
+# =======================================================
+# RETENTION / COMPACTION
+# =======================================================
+
+def purge_history(before, batch_size=HISTORY_BATCH_SIZE * 5):
+    """Delete history older than ``before`` in id batches; returns rows deleted"""
+    from accounts.models import ChangeHistory
+
+    deleted = 0
+    while True:
+        ids = list(
+            ChangeHistory.objects.filter(changed_at__lt=before)
+            .order_by('changed_at').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += ChangeHistory.objects.filter(id__in=ids).delete()[0]
+
+
+def _collapse_day(rows):
+    """Merge the runs in one day's rows (sorted by object, field, time); returns rows removed"""
+    from accounts.models import ChangeHistory
+
+    to_delete, to_update = [], []
+    run, run_key = [], None
+    for row in rows + [None]:
+        key = row[1:4] if row is not None else None
+        if key != run_key:
+            if len(run) > 1:
+                # Keep one row per run, even when it ends where it started (A -> B -> A)
+                first, last = run[0], run[-1]
+                to_update.append(ChangeHistory(id=last[0], old_value=first[4]))
+                to_delete.extend(r[0] for r in run[:-1])
+            run, run_key = [], key
+        run.append(row)
+
+    removed = 0
+    with transaction.atomic():
+        if to_update:
+            ChangeHistory.objects.bulk_update(to_update, ['old_value'], batch_size=HISTORY_BATCH_SIZE)
+        for start in range(0, len(to_delete), HISTORY_BATCH_SIZE):
+            batch = to_delete[start:start + HISTORY_BATCH_SIZE]
+            removed += ChangeHistory.objects.filter(id__in=batch).delete()[0]
+    return removed
+
+
+def collapse_history(before, since=None):
+    """
+    Merge same-day changes of one field of one object into a single row
+    (first old value, last new value, last author) for history in
+    [since, before). ``since`` is widened to the start of its day, so a day
+    split across two runs still ends up as one row. Works one day at a time
+    and writes each day before reading the next. Returns rows removed.
+    """
+    from accounts.models import ChangeHistory
+
+    history = ChangeHistory.objects.filter(changed_at__lt=before)
+    if since is not None:
+        cursor = timezone.localtime(since).replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+        cursor = history.order_by('changed_at').values_list('changed_at', flat=True).first()
+        if cursor is None:
+            return 0
+        cursor = timezone.localtime(cursor).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    removed = 0
+    while cursor < before:
+        # Skip straight to the next day that has history
+        next_at = history.filter(changed_at__gte=cursor).order_by('changed_at').values_list(
+            'changed_at', flat=True
+        ).first()
+        if next_at is None:
+            break
+        day_start = timezone.localtime(next_at).replace(hour=0, minute=0, second=0, microsecond=0)
+        day_end = timezone.make_aware(
+            datetime.datetime.combine(day_start.date() + datetime.timedelta(days=1), datetime.time()),
+            day_start.tzinfo,
+        )
+        rows = list(
+            history.filter(changed_at__gte=day_start, changed_at__lt=day_end)
+            .order_by('content_type_id', 'object_id', 'field_name', 'changed_at', 'id')
+            .values_list('id', 'content_type_id', 'object_id', 'field_name', 'old_value')
+        )
+        removed += _collapse_day(rows)
+        cursor = day_end
+    return removed
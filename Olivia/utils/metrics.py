@@ -0,0 +1,207 @@
+"""
+Per-view request instrumentation.
+
+RequestMetricsMiddleware counts the queries and DB time of each request
+with a connection execute_wrapper. It also times the whole request and
+measures the response size, and files all of it under the resolved view
+name. With DEBUG on, or for staff users, responses also get a Server-Timing
+header (db / app), so the numbers show up in the browser's network panel.
+
+Totals are kept in process memory and served in Prometheus text format by
+metrics_view (/metrics/) to staff users, or to requests carrying
+"Authorization: Bearer <METRICS_TOKEN>". With several worker processes
+each one reports its own counters.
+
+QUERY_BUDGETS maps view names to the most queries a request may run, with
+QUERY_BUDGET_DEFAULT for every other view. A request over budget is logged
+with its query count. With QUERY_BUDGET_RAISE on (e.g. override_settings
+in a test) it raises QueryBudgetExceeded instead, so an N+1 fails the test
+that hits it.
+"""
+import hmac
+import logging
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+UNRESOLVED_VIEW = '<unresolved>'
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class _ViewStats:
+    __slots__ = ('requests', 'queries', 'db_seconds', 'seconds', 'response_bytes', 'over_budget', 'buckets')
+
+    def __init__(self):
+        self.requests = {}
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.seconds = 0.0
+        self.response_bytes = 0
+        self.over_budget = 0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def record(view, method, status, queries, db_seconds, seconds, response_bytes, over_budget=False):
+    with _stats_lock:
+        stats = _stats.get(view)
+        if stats is None:
+            stats = _stats[view] = _ViewStats()
+        key = (method, status)
+        stats.requests[key] = stats.requests.get(key, 0) + 1
+        stats.queries += queries
+        stats.db_seconds += db_seconds
+        stats.seconds += seconds
+        stats.response_bytes += response_bytes
+        stats.over_budget += over_budget
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                stats.buckets[i] += 1
+
+
+def reset():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus():
+    """All recorded totals in Prometheus text exposition format"""
+    with _stats_lock:
+        snapshot = sorted(_stats.items())
+        lines = [
+            '# HELP olivia_http_requests_total Requests handled, by view, method and status.',
+            '# TYPE olivia_http_requests_total counter',
+        ]
+        for view, stats in snapshot:
+            for (method, status), count in sorted(stats.requests.items()):
+                lines.append(
+                    f'olivia_http_requests_total{{view="{_label(view)}",method="{method}",status="{status}"}} {count}'
+                )
+
+        lines += [
+            '# HELP olivia_http_request_duration_seconds Request wall time, by view.',
+            '# TYPE olivia_http_request_duration_seconds histogram',
+        ]
+        for view, stats in snapshot:
+            view = _label(view)
+            total = sum(stats.requests.values())
+            for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                lines.append(f'olivia_http_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {count}')
+            lines.append(f'olivia_http_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {total}')
+            lines.append(f'olivia_http_request_duration_seconds_sum{{view="{view}"}} {stats.seconds:.6f}')
+            lines.append(f'olivia_http_request_duration_seconds_count{{view="{view}"}} {total}')
+
+        for name, kind, help_text, attr, fmt in (
+            ('olivia_db_queries_total', 'counter', 'SQL queries run, by view.', 'queries', '{}'),
+            ('olivia_db_query_duration_seconds_total', 'counter', 'Time spent in SQL, by view.', 'db_seconds', '{:.6f}'),
+            ('olivia_http_response_size_bytes_total', 'counter', 'Response body bytes, by view.', 'response_bytes', '{}'),
+            ('olivia_query_budget_exceeded_total', 'counter', 'Requests over their query budget, by view.', 'over_budget', '{}'),
+        ):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+            for view, stats in snapshot:
+                lines.append(f'{name}{{view="{_label(view)}"}} ' + fmt.format(getattr(stats, attr)))
+    return '\n'.join(lines) + '\n'
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED_VIEW
+    if match.url_name:
+        return match.view_name
+    func = getattr(match.func, 'view_class', None) or getattr(match.func, 'cls', None) or match.func
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def query_budget(view):
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    return budgets.get(view, getattr(settings, 'QUERY_BUDGET_DEFAULT', None))
+
+
+class _QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+def _is_staff(request):
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_authenticated and user.is_staff
+
+
+class RequestMetricsMiddleware:
+    """Record query count, DB time, total time and response size per view"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        timer = _QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            response = self.get_response(request)
+        seconds = time.perf_counter() - started
+
+        view = view_name(request)
+        budget = query_budget(view)
+        over_budget = budget is not None and timer.count > budget
+        if response.streaming:
+            size = int(response.get('Content-Length') or 0)
+        else:
+            size = len(response.content)
+        record(view, request.method, response.status_code, timer.count, timer.seconds, seconds, size, over_budget)
+
+        if settings.DEBUG or _is_staff(request):
+            response['Server-Timing'] = (
+                f'db;dur={timer.seconds * 1000:.1f};desc="{timer.count} queries", app;dur={seconds * 1000:.1f}'
+            )
+        if over_budget:
+            message = f'{view} ran {timer.count} queries (budget {budget}) for {request.method} {request.path}'
+            if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+def metrics_view(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    authorized = (
+        (token and hmac.compare_digest(
+            request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode(),
+        ))
+        or _is_staff(request)
+    )
+    if not authorized:
+        return HttpResponseForbidden()
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,107 @@
+import base64
+import datetime
+import json
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def get_page_size(request, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Read ``page_size`` from the query string, clamped to ``1..maximum``"""
+    try:
+        page_size = int(request.GET.get('page_size', default))
+    except (TypeError, ValueError):
+        page_size = default
+    return max(1, min(page_size, maximum))
+
+
+def _to_json(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values):
+    """Encode the ordering values of the last row into an opaque token"""
+    raw = json.dumps([_to_json(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a token produced by ``encode_cursor``; raises ValueError when invalid"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def _row_value(row, field):
+    if isinstance(row, dict):
+        return row[field]
+    return getattr(row, field)
+
+
+def _cursor_value(model, name, value):
+    """Coerce a decoded cursor value to the field's type; ValueError when it doesn't fit"""
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        # Annotation: left to the database
+        return value
+    try:
+        value = field.to_python(value)
+    except (ValidationError, TypeError):
+        raise ValueError('Invalid cursor')
+    if value is None and not field.null:
+        raise ValueError('Invalid cursor')
+    return value
+
+
+def keyset_paginate(queryset, ordering, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Seek-paginate ``queryset`` by ``ordering`` (e.g. ``['-date', '-id']``).
+
+    The last ordering field must be unique so rows are never skipped or
+    repeated. Only ``page_size + 1`` rows are fetched, so the cost of a page
+    does not grow with how deep the client has scrolled. Values in the cursor
+    beyond the ordering fields are ignored, so callers may append their own
+    state (e.g. a running total) when re-encoding it.
+
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is None on the last page.
+    A malformed or tampered cursor raises ValueError.
+    """
+    fields = [(f[1:], True) if f.startswith('-') else (f, False) for f in ordering]
+    queryset = queryset.order_by(*ordering)
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) < len(fields):
+            raise ValueError('Invalid cursor')
+        values = [_cursor_value(queryset.model, name, value) for (name, _), value in zip(fields, values)]
+        # (a, b) after (x, y)  ==>  a > x OR (a = x AND b > y), per direction
+        seek = Q()
+        for i, (name, descending) in enumerate(fields):
+            clause = Q(**{f'{name}__lt' if descending else f'{name}__gt': values[i]})
+            for j, (prev_name, _) in enumerate(fields[:i]):
+                clause &= Q(**{prev_name: values[j]})
+            seek |= clause
+        queryset = queryset.filter(seek)
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor([_row_value(last, name) for name, _ in fields])
+    return rows, next_cursor
@@ -0,0 +1,427 @@
+import os
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, router, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import ChangeHistory
+from Housing.models import CompanyGroup, Unit, UnitAllocation, UserCompany
+
+from . import metrics
+from .audit import AuditUserMiddleware, audit_user
+from .db import REPLICA_ALIAS, ReplicaRouter, replica_reads
+from .history import collapse_history, history_for, purge_history
+from .metrics import QueryBudgetExceeded
+from .pagination import encode_cursor, keyset_paginate
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True, METRICS_TOKEN='secret', DEBUG=False)
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('ops', password='pw', is_staff=True)
+
+    def setUp(self):
+        metrics.reset()
+
+    @override_settings(QUERY_BUDGETS={'metrics': 1}, QUERY_BUDGET_RAISE=True)
+    def test_over_budget_raises(self):
+        self.client.force_login(self.staff)
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'metrics ran'):
+            self.client.get('/metrics/')
+
+    @override_settings(QUERY_BUDGETS={'metrics': 1}, QUERY_BUDGET_RAISE=False)
+    def test_over_budget_logged_and_counted(self):
+        self.client.force_login(self.staff)
+        with self.assertLogs('utils.metrics', 'WARNING'):
+            self.assertEqual(self.client.get('/metrics/').status_code, 200)
+        self.assertIn('olivia_query_budget_exceeded_total{view="metrics"} 1', metrics.render_prometheus())
+
+    @override_settings(QUERY_BUDGETS={'metrics': 20}, QUERY_BUDGET_RAISE=True)
+    def test_within_budget_passes(self):
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get('/metrics/').status_code, 200)
+
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        response = self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('olivia_http_requests_total', response.content.decode())
+
+    def test_server_timing_only_for_staff(self):
+        self.assertNotIn('Server-Timing', self.client.get('/metrics/'))
+        self.client.force_login(self.staff)
+        self.assertIn('queries', self.client.get('/metrics/')['Server-Timing'])
+
+    @override_settings(DEBUG=True)
+    def test_server_timing_in_debug(self):
+        self.assertIn('Server-Timing', self.client.get('/metrics/'))
+
+
+class AuditUserTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', password='pw')
+        cls.bob = User.objects.create_user('bob', password='pw')
+
+    def request(self, user, view):
+        request = RequestFactory().post('/')
+        request.user = user
+        return AuditUserMiddleware(view)(request)
+
+    def stamps(self, *groups):
+        return list(CompanyGroup.objects.filter(company_name__in=groups).order_by('company_name').values_list(
+            'company_name', 'created_by__username', 'modified_by__username',
+        ))
+
+    def test_request_user_stamped_on_save(self):
+        def create(request):
+            CompanyGroup.objects.create(company_name='Saved')
+            return HttpResponse()
+
+        def rename(request):
+            group = CompanyGroup.objects.get(company_name='Saved')
+            group.company_name = 'Renamed'
+            group.save(update_fields=['company_name'])
+            return HttpResponse()
+
+        self.request(self.alice, create)
+        self.assertEqual(self.stamps('Saved'), [('Saved', 'alice', 'alice')])
+        self.request(self.bob, rename)
+        self.assertEqual(self.stamps('Renamed'), [('Renamed', 'alice', 'bob')])
+
+    def test_request_user_stamped_on_bulk_create_and_update(self):
+        def create(request):
+            CompanyGroup.objects.bulk_create([CompanyGroup(company_name=name) for name in ('B1', 'B2')])
+            return HttpResponse()
+
+        def update(request):
+            groups = list(CompanyGroup.objects.filter(company_name__in=['B1', 'B2']))
+            for group in groups:
+                group.company_name += 'x'
+            CompanyGroup.objects.bulk_update(groups, ['company_name'])
+            return HttpResponse()
+
+        self.request(self.alice, create)
+        self.assertEqual(self.stamps('B1', 'B2'), [('B1', 'alice', 'alice'), ('B2', 'alice', 'alice')])
+        self.request(self.bob, update)
+        self.assertEqual(self.stamps('B1x', 'B2x'), [('B1x', 'alice', 'bob'), ('B2x', 'alice', 'bob')])
+
+    def test_no_user_outside_a_request(self):
+        group = CompanyGroup.objects.create(company_name='Script')
+        group.save()
+        CompanyGroup.objects.bulk_create([CompanyGroup(company_name='Bulk')])
+        CompanyGroup.objects.bulk_update([group], ['company_name'])
+
+        def anonymous(request):
+            CompanyGroup.objects.create(company_name='Anonymous')
+            return HttpResponse()
+
+        self.request(AnonymousUser(), anonymous)
+        self.assertEqual(self.stamps('Script', 'Bulk', 'Anonymous'), [
+            ('Anonymous', None, None), ('Bulk', None, None), ('Script', None, None),
+        ])
+
+    def test_audit_user_block(self):
+        with audit_user(self.bob):
+            CompanyGroup.objects.create(company_name='Command')
+        CompanyGroup.objects.create(company_name='After')
+
+        self.assertEqual(self.stamps('After', 'Command'), [('After', None, None), ('Command', 'bob', 'bob')])
+
+
+class ChangeHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('clerk', password='pw')
+        cls.unit = Unit.objects.create(unit_number='U1', occupancy_status='Vacant', zone='NZ')
+        group = CompanyGroup.objects.create(company_name='Group')
+        cls.allocation = UnitAllocation.objects.create(
+            allocation_type='UUA', uua_number='UUA-1', company_group=group,
+            company=UserCompany.objects.create(company_name='Company', company_group=group),
+            start_date=date(2026, 1, 1), end_date=date(2026, 6, 30), a_rooms_beds='2/2',
+        )
+
+    def test_only_tracked_fields_with_old_and_new_values(self):
+        unit = Unit.objects.get(pk=self.unit.pk)
+        unit.occupancy_status = 'Assigned'
+        unit.zone = 'CZ'
+        with audit_user(self.user):
+            unit.save()
+            unit.save()
+
+        row, = history_for(unit)
+        self.assertEqual((row.field_name, row.old_value, row.new_value), ('occupancy_status', 'Vacant', 'Assigned'))
+        self.assertEqual(row.changed_by, self.user)
+
+        allocation = UnitAllocation.objects.get(pk=self.allocation.pk)
+        allocation.end_date = date(2026, 12, 31)
+        allocation.a_rooms_beds = '3/4'
+        UnitAllocation.objects.bulk_update([allocation], ['end_date', 'a_rooms_beds'])
+
+        changes = {row.field_name: (row.old_value, row.new_value) for row in history_for(allocation)}
+        self.assertEqual(changes, {
+            'end_date': ('2026-06-30', '2026-12-31'),
+            'a_rooms_beds': ('2/2', '3/4'),
+        })
+
+    def test_rolled_back_change_leaves_no_history(self):
+        unit = Unit.objects.get(pk=self.unit.pk)
+        unit.occupancy_status = 'Assigned'
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            unit.save()
+            raise RuntimeError
+
+        self.assertFalse(history_for(unit).exists())
+
+    def test_failed_history_write_rolls_back_the_change(self):
+        unit = Unit.objects.get(pk=self.unit.pk)
+        unit.occupancy_status = 'Assigned'
+        with mock.patch('utils.history._write', side_effect=RuntimeError('disk full')):
+            with self.assertRaisesMessage(RuntimeError, 'disk full'), transaction.atomic():
+                unit.save()
+
+        self.assertEqual(Unit.objects.get(pk=unit.pk).occupancy_status, 'Vacant')
+
+
+class ChangeHistoryRetentionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.content_type = ContentType.objects.get_for_model(Unit)
+
+    def add(self, changed_at, old, new, object_id=1, field_name='occupancy_status'):
+        return ChangeHistory.objects.create(
+            content_type=self.content_type, object_id=object_id, field_name=field_name,
+            old_value=old, new_value=new, changed_at=changed_at,
+        )
+
+    def test_purge_history(self):
+        now = datetime(2026, 6, 1, tzinfo=timezone.utc)
+        for days in range(5):
+            self.add(now - timedelta(days=days * 100), 'a', 'b')
+
+        self.assertEqual(purge_history(now - timedelta(days=150), batch_size=1), 3)
+        self.assertEqual(purge_history(now - timedelta(days=150)), 0)
+        self.assertEqual(ChangeHistory.objects.count(), 2)
+
+    def test_collapse_history(self):
+        day = datetime(2026, 5, 4, 8, tzinfo=timezone.utc)
+        self.add(day, 'Vacant', 'Reserved')
+        self.add(day + timedelta(hours=1), 'Reserved', 'Assigned')
+        self.add(day + timedelta(hours=2), 'Assigned', 'Occupied')
+        # A round trip in one day still leaves one row
+        self.add(day, 'A', 'B', object_id=2)
+        self.add(day + timedelta(hours=1), 'B', 'A', object_id=2)
+        # Other days, objects and fields stay apart
+        self.add(day + timedelta(days=1), 'Occupied', 'Vacant')
+        self.add(day, 'x', 'y', field_name='start_date')
+        self.add(day - timedelta(days=1), 'Vacant', 'Vacant')
+
+        removed = collapse_history(day + timedelta(days=3), since=day + timedelta(hours=12))
+
+        self.assertEqual(removed, 3)
+        rows = sorted(
+            ChangeHistory.objects.values_list('object_id', 'field_name', 'old_value', 'new_value', 'changed_at')
+        )
+        self.assertEqual(rows, [
+            (1, 'occupancy_status', 'Occupied', 'Vacant', day + timedelta(days=1)),
+            (1, 'occupancy_status', 'Vacant', 'Occupied', day + timedelta(hours=2)),
+            (1, 'occupancy_status', 'Vacant', 'Vacant', day - timedelta(days=1)),
+            (1, 'start_date', 'x', 'y', day),
+            (2, 'occupancy_status', 'A', 'A', day + timedelta(hours=1)),
+        ])
+        self.assertEqual(collapse_history(day + timedelta(days=3)), 0)
+
+
+class ChangeHistoryBatchTests(TransactionTestCase):
+    """Autocommit saves (no surrounding transaction), as in a plain view"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('clerk', password='pw')
+        self.units = [Unit.objects.create(unit_number=f'U{i}', occupancy_status='Vacant') for i in range(3)]
+
+    def request(self, view):
+        request = RequestFactory().post('/')
+        request.user = self.user
+        return AuditUserMiddleware(view)(request)
+
+    def test_one_insert_per_request(self):
+        def view(request):
+            for status in ('Reserved', 'Assigned'):
+                for unit in Unit.objects.filter(unit_number__startswith='U'):
+                    unit.occupancy_status = status
+                    unit.save()
+            # Nothing is written until the request ends
+            self.assertFalse(ChangeHistory.objects.exists())
+            return HttpResponse()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.request(view)
+
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "accounts_changehistory"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(ChangeHistory.objects.count(), 6)
+        self.assertEqual(set(ChangeHistory.objects.values_list('changed_by', flat=True)), {self.user.pk})
+
+    def test_failed_batch_write_is_logged(self):
+        def view(request):
+            unit = Unit.objects.get(pk=self.units[0].pk)
+            unit.occupancy_status = 'Assigned'
+            unit.save()
+            return HttpResponse()
+
+        with mock.patch('utils.history._write', side_effect=RuntimeError('disk full')), \
+                self.assertLogs('utils.history', 'ERROR') as logs:
+            response = self.request(view)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Could not write 1 change history row(s)', logs.output[0])
+        self.assertEqual(Unit.objects.get(pk=self.units[0].pk).occupancy_status, 'Assigned')
+
+
+class KeysetPaginateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        content_type = ContentType.objects.get_for_model(Unit)
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        # Several rows share field_name and changed_at, so only id breaks the tie
+        ChangeHistory.objects.bulk_create([
+            ChangeHistory(
+                content_type=content_type, object_id=i, field_name='abc'[i % 3],
+                changed_at=start + timedelta(days=i % 4), new_value=str(i),
+            )
+            for i in range(14)
+        ])
+
+    def walk(self, ordering, page_size):
+        rows, cursor, pages = [], None, 0
+        while True:
+            page, cursor = keyset_paginate(ChangeHistory.objects.all(), ordering, cursor, page_size)
+            rows.extend(row.pk for row in page)
+            pages += 1
+            if cursor is None:
+                return rows, pages
+
+    def test_pages_match_full_ordering(self):
+        for ordering in (['-changed_at', '-id'], ['changed_at', 'id'], ['field_name', '-changed_at', 'id'],
+                         ['-field_name', 'changed_at', '-id']):
+            expected = list(ChangeHistory.objects.order_by(*ordering).values_list('pk', flat=True))
+            for page_size in (1, 3, 5, 14):
+                rows, pages = self.walk(ordering, page_size)
+                self.assertEqual(rows, expected, (ordering, page_size))
+                # An exactly full last page still ends with next_cursor=None
+                self.assertEqual(pages, -(-14 // page_size), (ordering, page_size))
+
+    def test_values_page(self):
+        page, cursor = keyset_paginate(ChangeHistory.objects.values('id', 'changed_at'), ['-changed_at', '-id'],
+                                       page_size=20)
+        self.assertEqual(len(page), 14)
+        self.assertIsNone(cursor)
+
+    def test_invalid_cursors(self):
+        ordering = ['-changed_at', '-id']
+        for cursor in ('%%%', encode_cursor({'id': 1}), encode_cursor(['2026-01-01T00:00:00+00:00']),
+                       encode_cursor(['yesterday', 5]), encode_cursor(['2026-01-01T00:00:00+00:00', 'five']),
+                       encode_cursor([None, 5]), encode_cursor([['nested'], 5])):
+            with self.assertRaisesMessage(ValueError, 'Invalid cursor'):
+                keyset_paginate(ChangeHistory.objects.all(), ordering, cursor)
+
+
+class ReplicaRoutingTests(TestCase):
+    """The replica alias only exists in settings here; reads still run on the primary"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', password='pw')
+        Unit.objects.create(unit_number='U1', occupancy_status='Vacant Ready', zone='NZ')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.routed = []
+        route = ReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            # Record the decision, then let the query run on the primary
+            self.routed.append((model._meta.app_label, route(router, model, **hints)))
+
+        patches = [
+            mock.patch.dict(settings.DATABASES, {REPLICA_ALIAS: settings.DATABASES['default']}),
+            mock.patch.object(ReplicaRouter, 'db_for_read', spy),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_router(self):
+        router.db_for_read(Unit)
+        with replica_reads():
+            router.db_for_read(Unit)
+            self.assertEqual(router.db_for_write(Unit), 'default')
+        self.assertEqual(self.routed, [('Housing', None), ('Housing', REPLICA_ALIAS)])
+        self.assertFalse(ReplicaRouter().allow_migrate(REPLICA_ALIAS, 'Housing'))
+
+    def test_exports_read_from_replica(self):
+        for name in ('export_units', 'allocation_export', 'reservation_export'):
+            self.routed.clear()
+            response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200, name)
+            # Session and user lookups in middleware run before the view
+            housing = {alias for app, alias in self.routed if app == 'Housing'}
+            self.assertEqual(housing, {REPLICA_ALIAS}, name)
+
+    def test_list_pages_stay_on_primary(self):
+        for name in ('units_list', 'allocation', 'reservation'):
+            self.routed.clear()
+            self.assertEqual(self.client.get(reverse(name)).status_code, 200, name)
+            self.assertTrue(self.routed, name)
+            self.assertNotIn(REPLICA_ALIAS, {alias for _, alias in self.routed}, name)
+
+    def test_no_replica_configured(self):
+        del settings.DATABASES[REPLICA_ALIAS]
+        with replica_reads():
+            router.db_for_read(Unit)
+        self.assertEqual(self.routed, [('Housing', None)])
+
+
+class SQLitePragmaTests(TestCase):
+    def pragma(self, conn, name):
+        with conn.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_applied_on_new_connection(self):
+        with tempfile.TemporaryDirectory() as directory:
+            conn = DatabaseWrapper({**connection.settings_dict, 'NAME': os.path.join(directory, 'pragmas.sqlite3')})
+            try:
+                conn.ensure_connection()
+                self.assertEqual(self.pragma(conn, 'journal_mode'), 'wal')
+                self.assertEqual(self.pragma(conn, 'synchronous'), 1)  # NORMAL
+                self.assertEqual(self.pragma(conn, 'busy_timeout'), settings.SQLITE_PRAGMAS['busy_timeout'])
+                self.assertEqual(self.pragma(conn, 'cache_size'), -32000)
+                self.assertEqual(self.pragma(conn, 'temp_store'), 2)  # MEMORY
+            finally:
+                conn.close()
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234})
+    def test_follows_settings(self):
+        with tempfile.TemporaryDirectory() as directory:
+            conn = DatabaseWrapper({**connection.settings_dict, 'NAME': os.path.join(directory, 'pragmas.sqlite3')})
+            try:
+                conn.ensure_connection()
+                self.assertEqual(self.pragma(conn, 'busy_timeout'), 1234)
+                self.assertEqual(self.pragma(conn, 'journal_mode'), 'delete')
+            finally:
+                conn.close()
+
+    def test_test_connection_tuned(self):
+        self.assertEqual(self.pragma(connection, 'busy_timeout'), settings.SQLITE_PRAGMAS['busy_timeout'])